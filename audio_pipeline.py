@@ -0,0 +1,379 @@
+"""
+audio_pipeline.py – uppladdat ljud → kort, komprimerat tal för Whisper
+
+/ask skrev tidigare uppladdningen till en .mp4, körde ffmpeg blockerande
+till en .wav och skickade hela filen i full längd och samplingstakt. Här,
+helt i minnet och utan att blockera event-loopen:
+
+• Tak: uppladdningar över MAX_UPLOAD_BYTES avvisas innan något avkodas
+  (och räknas under strömningen om storleken inte är känd); ljud längre än
+  MAX_DURATION_S avvisas – avkodningen stannar vid taket
+• Containern känns igen på magiska bytes. Små uppladdningar i format som
+  Whisper tar emot direkt (≤ PASSTHROUGH_MAX_BYTES) skickas som de är
+• Övrigt strömmas genom ffmpeg (asyncio-subprocess, stdin/stdout):
+  1. avkodning till PCM, mono 16 kHz
+  2. röstaktivitet (VAD) per 30 ms-ram: energi över brusgolvet → tal;
+     tystnad före första och efter sista talramen klipps bort (med marginal);
+     syns inget golv att jämföra med skickas ljudet oklippt
+  3. kodning till Opus i Ogg med låg bitrate
+• Inget tal alls (allt under SPEECH_FLOOR_DBFS) → AudioError (422) utan anrop till Whisper
+• Undantag från pipe-vägen: MP4/M4A/QuickTime med moov-boxen efter mdat (så
+  sparar t.ex. iOS) går inte att avkoda från en icke-sökbar pipe; de
+  spoolas till en temporär fil som ffmpeg får som sökbar input
+• metrics: bytes in/ut, sparade bytes, klippt tid och latens per steg och
+  per request (GET /audio_metrics)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import tempfile
+import time
+from collections import deque
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+
+FFMPEG = "ffmpeg"
+FFMPEG_TIMEOUT_S = 60.0
+CHUNK = 64 * 1024
+SNIFF_BYTES = 64
+BOX_SCAN_BYTES = 64 * 1024              # så långt letas moov/mdat i ISO-BMFF-filer
+
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+MAX_DURATION_S = 60.0
+PASSTHROUGH_MAX_BYTES = 96 * 1024       # mindre än så lönar sig inte ffmpeg-varvet
+
+SAMPLE_RATE = 16000
+OPUS_BITRATE = "16k"
+
+# VAD
+FRAME_S = 0.03
+SPEECH_MARGIN_DB = 12.0                 # över brusgolvet (10:e percentilen)
+SPEECH_FLOOR_DBFS = -50.0               # aldrig tal under detta
+PAD_S = 0.2                             # behålls före/efter talet
+
+RECENT = 50                             # requests som visas i metrics
+
+# ISO-BMFF-containrar som spoolas till fil om moov ligger efter mdat
+SPOOL_IF_MOOV_LAST = {"mp4", "m4a", "mov"}
+
+# container → filnamn som Whisper-API:t godtar (det går på filändelsen)
+ACCEPTED = {
+    "wav": "audio.wav",
+    "mp3": "audio.mp3",
+    "mp4": "audio.mp4",
+    "m4a": "audio.m4a",
+    "webm": "audio.webm",
+    "ogg": "audio.ogg",
+    "flac": "audio.flac",
+}
+
+
+class AudioError(Exception):
+    def __init__(self, message: str, status: int = 400, reason: str = "invalid"):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+
+
+def sniff_container(head: bytes) -> Optional[str]:
+    """Container ur de första bytena, eller None om den är okänd"""
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[:4] == b"fLaC":
+        return "flac"
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[:3] == b"ID3" or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0
+                              and head[1] & 0x06 != 0):
+        return "mp3"                        # ID3-tagg eller MPEG-ramsynk (layer ≠ 0)
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        # EBML: webm eller annan Matroska – bara webm godtas
+        return "webm" if b"webm" in head[:SNIFF_BYTES] else "mkv"
+    if head[4:8] == b"ftyp":
+        brand = head[8:12]
+        if brand in (b"M4A ", b"M4B "):
+            return "m4a"
+        if brand in (b"3gp4", b"3gp5", b"3g2a") or brand.startswith(b"qt"):
+            return "mov"                    # iPhone .mov/.3gp → transkodas (se moov_first)
+        return "mp4"
+    if head[:4] == b"#!AM":
+        return "amr"
+    if head[:4] == b"caff":
+        return "caf"
+    return None
+
+
+def moov_first(data: bytes) -> Optional[bool]:
+    """
+    Går ISO-BMFF-toppboxarna i data: True om moov kommer före mdat
+    (strömbar), False om mdat kommer först, None om ingen av dem syns.
+    """
+    pos = 0
+    while pos + 8 <= len(data):
+        size = int.from_bytes(data[pos:pos + 4], "big")
+        kind = data[pos + 4:pos + 8]
+        if kind == b"moov":
+            return True
+        if kind == b"mdat":
+            return False
+        if size == 1:                       # 64-bitars storlek efter typen
+            if pos + 16 > len(data):
+                return None
+            size = int.from_bytes(data[pos + 8:pos + 16], "big")
+        if size < 8:                        # 0 = resten av filen, eller trasig box
+            return None
+        pos += size
+    return None
+
+
+# ------------------------------------------------------------
+#  VAD
+# ------------------------------------------------------------
+def speech_bounds(pcm: np.ndarray, rate: int = SAMPLE_RATE) -> Optional[Tuple[int, int]]:
+    """
+    (start, slut) i samplingar för talet i int16-PCM, inklusive PAD_S
+    marginal, eller None om inget tal hittas. En ram är tal om dess energi
+    ligger SPEECH_MARGIN_DB över brusgolvet och över SPEECH_FLOOR_DBFS.
+    Når ingen ram över brusgolvet men ljudet ändå ligger över
+    SPEECH_FLOOR_DBFS (push-to-talk utan tystnad, högt bakgrundsbrus) går
+    det inte att skilja tal från golv → hela ljudet behålls.
+    """
+    frame = int(rate * FRAME_S)
+    n = len(pcm) // frame
+    if n == 0:
+        return None
+    frames = pcm[: n * frame].astype(np.float32).reshape(n, frame) / 32768.0
+    db = 10.0 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+    threshold = max(float(np.percentile(db, 10)) + SPEECH_MARGIN_DB, SPEECH_FLOOR_DBFS)
+    speech = np.flatnonzero(db > threshold)
+    if len(speech) == 0:
+        return (0, len(pcm)) if db.max() > SPEECH_FLOOR_DBFS else None
+    pad = int(PAD_S * rate)
+    start = max(0, int(speech[0]) * frame - pad)
+    end = min(len(pcm), (int(speech[-1]) + 1) * frame + pad)
+    return start, end
+
+
+# ------------------------------------------------------------
+#  FFMPEG ÖVER PIPES
+# ------------------------------------------------------------
+async def _run_ffmpeg(args: List[str], chunks: Optional[AsyncIterator[bytes]]) -> bytes:
+    """
+    Kör ffmpeg med chunks på stdin → stdout. stdin matas i en egen task
+    medan stdout läses, så att ingen av pipe-buffertarna kan låsa. Utan
+    chunks läser ffmpeg sin input från en fil i args.
+    """
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            FFMPEG, "-hide_banner", "-loglevel", "error", "-nostdin", *args,
+            stdin=asyncio.subprocess.PIPE if chunks is not None else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+    except OSError as e:
+        raise AudioError(f"FFmpeg error: {e}", status=500, reason="ffmpeg") from e
+
+    async def feed():
+        if chunks is None:
+            return
+        try:
+            async for chunk in chunks:
+                proc.stdin.write(chunk)
+                await proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass                            # ffmpeg slutade läsa (fel eller -t nådd)
+        finally:
+            proc.stdin.close()
+
+    async def run():
+        _, out, err = await asyncio.gather(feed(), proc.stdout.read(), proc.stderr.read())
+        await proc.wait()
+        return out, err
+
+    try:
+        out, err = await asyncio.wait_for(run(), FFMPEG_TIMEOUT_S)
+    except asyncio.TimeoutError as e:
+        raise AudioError(f"FFmpeg timeout after {FFMPEG_TIMEOUT_S:g} s",
+                         status=500, reason="ffmpeg") from e
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+    if proc.returncode != 0 or not out:
+        msg = err.decode("utf-8", "replace").strip().splitlines()
+        raise AudioError(f"FFmpeg error: {msg[-1] if msg else f'exit {proc.returncode}'}")
+    return out
+
+
+async def _upload_chunks(head: bytes, upload, counter: List[int]) -> AsyncIterator[bytes]:
+    """head + resten av uppladdningen i bitar; avbryter över MAX_UPLOAD_BYTES"""
+    chunk = head
+    while chunk:
+        counter[0] += len(chunk)
+        if counter[0] > MAX_UPLOAD_BYTES:
+            raise AudioError(f"Audio upload larger than {MAX_UPLOAD_BYTES // 1024} KB.",
+                             status=413, reason="too_large")
+        yield chunk
+        chunk = await upload.read(CHUNK)
+
+
+async def _once(data: bytes) -> AsyncIterator[bytes]:
+    for i in range(0, len(data), CHUNK):
+        yield data[i:i + CHUNK]
+
+
+async def decode(head: bytes, upload, counter: List[int], seekable: bool = False) -> np.ndarray:
+    """
+    Uppladdning → int16-PCM mono 16 kHz, högst MAX_DURATION_S (+ en ram).
+    seekable: spoola till en temporär fil först (MP4 med moov sist).
+    """
+    output = ["-vn", "-ac", "1", "-ar", str(SAMPLE_RATE),
+              "-t", f"{MAX_DURATION_S + FRAME_S:g}", "-f", "s16le", "pipe:1"]
+    if not seekable:
+        out = await _run_ffmpeg(["-i", "pipe:0", *output],
+                                _upload_chunks(head, upload, counter))
+    else:
+        with tempfile.NamedTemporaryFile(suffix=".mp4") as f:
+            async for chunk in _upload_chunks(head, upload, counter):
+                f.write(chunk)
+            f.flush()
+            out = await _run_ffmpeg(["-i", f.name, *output], None)
+    return np.frombuffer(out[: len(out) // 2 * 2], dtype="<i2")
+
+
+async def encode(pcm: np.ndarray) -> bytes:
+    """int16-PCM mono 16 kHz → Ogg/Opus"""
+    return await _run_ffmpeg([
+        "-f", "s16le", "-ar", str(SAMPLE_RATE), "-ac", "1", "-i", "pipe:0",
+        "-c:a", "libopus", "-b:a", OPUS_BITRATE, "-application", "voip",
+        "-f", "ogg", "pipe:1",
+    ], _once(pcm.astype("<i2").tobytes()))
+
+
+# ------------------------------------------------------------
+#  METRICS
+# ------------------------------------------------------------
+class AudioMetrics:
+    def __init__(self, recent: int = RECENT):
+        self.counters = {"requests": 0, "passthrough": 0, "processed": 0,
+                         "bytes_in": 0, "bytes_out": 0,
+                         "audio_s_in": 0.0, "audio_s_out": 0.0,
+                         "prepare_ms_total": 0.0, "transcribe_ms_total": 0.0}
+        self.rejected: Dict[str, int] = {}
+        self.recent = deque(maxlen=recent)
+
+    def reject(self, reason: str) -> None:
+        self.counters["requests"] += 1
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+
+    def record(self, info: Dict) -> None:
+        """En lyckad request: info från prepare_audio (+ transcribe_ms)"""
+        c = self.counters
+        c["requests"] += 1
+        c["passthrough" if info["mode"] == "passthrough" else "processed"] += 1
+        c["bytes_in"] += info["bytes_in"]
+        c["bytes_out"] += info["bytes_out"]
+        c["audio_s_in"] += info.get("duration_in_s") or 0.0
+        c["audio_s_out"] += info.get("duration_out_s") or 0.0
+        c["prepare_ms_total"] += info["prepare_ms"]
+        c["transcribe_ms_total"] += info.get("transcribe_ms") or 0.0
+        self.recent.append(info)
+
+    def stats(self) -> Dict:
+        c = self.counters
+        done = c["passthrough"] + c["processed"]
+        return {
+            "requests": c["requests"],
+            "passthrough": c["passthrough"],
+            "processed": c["processed"],
+            "rejected": dict(self.rejected),
+            "bytes_in": c["bytes_in"],
+            "bytes_out": c["bytes_out"],
+            "bytes_saved": c["bytes_in"] - c["bytes_out"],
+            "saved_pct": round(100.0 * (1 - c["bytes_out"] / c["bytes_in"]), 1) if c["bytes_in"] else None,
+            "audio_s_trimmed": round(c["audio_s_in"] - c["audio_s_out"], 2),
+            "avg_prepare_ms": round(c["prepare_ms_total"] / done, 1) if done else None,
+            "avg_transcribe_ms": round(c["transcribe_ms_total"] / done, 1) if done else None,
+            "recent": list(self.recent),
+        }
+
+
+metrics = AudioMetrics()
+
+
+# ------------------------------------------------------------
+#  PUBLIKT
+# ------------------------------------------------------------
+async def _read_head(upload, n: int) -> bytes:
+    head = b""
+    while len(head) < n:
+        chunk = await upload.read(n - len(head))
+        if not chunk:
+            break
+        head += chunk
+    return head
+
+
+async def prepare_audio(upload) -> Tuple[bytes, str, Dict]:
+    """
+    UploadFile → (bytes, filnamn, info) att skicka till transkribering.
+    info har bytes in/ut, längd före/efter klippning och tid per steg;
+    lägg till transcribe_ms och skicka till metrics.record(). Avvisade
+    uppladdningar räknas här och kastar AudioError (status 400/413/422).
+    """
+    try:
+        return await _prepare(upload)
+    except AudioError as e:
+        metrics.reject(e.reason)
+        raise
+
+
+async def _prepare(upload) -> Tuple[bytes, str, Dict]:
+    t0 = time.perf_counter()
+    size = getattr(upload, "size", None)
+    if size is not None and size > MAX_UPLOAD_BYTES:
+        raise AudioError(f"Audio upload larger than {MAX_UPLOAD_BYTES // 1024} KB.",
+                         status=413, reason="too_large")
+    head = await _read_head(upload, SNIFF_BYTES)
+    if not head:
+        raise AudioError("Empty audio upload.", reason="empty")
+    container = sniff_container(head)
+
+    if container in ACCEPTED and size is not None and size <= PASSTHROUGH_MAX_BYTES:
+        data = head + await upload.read()
+        return data, ACCEPTED[container], {
+            "mode": "passthrough", "container": container,
+            "bytes_in": len(data), "bytes_out": len(data),
+            "duration_in_s": None, "duration_out_s": None,
+            "prepare_ms": round((time.perf_counter() - t0) * 1000, 1),
+        }
+
+    seekable = False
+    if container in SPOOL_IF_MOOV_LAST:
+        head += await _read_head(upload, BOX_SCAN_BYTES - len(head))
+        seekable = moov_first(head) is not True
+    counter = [0]
+    pcm = await decode(head, upload, counter, seekable)
+    t_decode = time.perf_counter()
+    if len(pcm) > MAX_DURATION_S * SAMPLE_RATE:
+        raise AudioError(f"Audio longer than {MAX_DURATION_S:g} s.", status=413,
+                         reason="too_long")
+    bounds = speech_bounds(pcm)
+    t_vad = time.perf_counter()
+    if bounds is None:
+        raise AudioError("No speech detected in audio.", status=422, reason="no_speech")
+    speech = pcm[bounds[0]:bounds[1]]
+    data = await encode(speech)
+    t_encode = time.perf_counter()
+    return data, "audio.ogg", {
+        "mode": "processed", "container": container or "unknown",
+        "bytes_in": counter[0], "bytes_out": len(data),
+        "duration_in_s": round(len(pcm) / SAMPLE_RATE, 2),
+        "duration_out_s": round(len(speech) / SAMPLE_RATE, 2),
+        "decode_ms": round((t_decode - t0) * 1000, 1),
+        "vad_ms": round((t_vad - t_decode) * 1000, 1),
+        "encode_ms": round((t_encode - t_vad) * 1000, 1),
+        "prepare_ms": round((t_encode - t0) * 1000, 1),
+    }
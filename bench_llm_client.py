@@ -0,0 +1,171 @@
+"""
+bench_llm_client.py – genomströmning för /ask med N samtidiga sessioner
+
+Startar en fejkad OpenAI-upstream (aiohttp, egen tråd) som svarar på
+/chat/completions efter --latency sekunder och kör sedan /ask i processen
+(httpx + ASGITransport, ingen uvicorn) med --sessions samtidiga sessioner:
+
+• async   – make_episode.app, dvs. llm_client (aiohttp, delad pool)
+• blocking – samma sorts endpoint men med synkrona openai.ChatCompletion.create
+  (som /ask var innan) → event-loopen står still under varje anrop
+
+    python bench_llm_client.py --sessions 50 --requests 4 --latency 0.5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import threading
+import time
+
+from aiohttp import web
+from fastapi import FastAPI, Request
+
+ANSWER = "Fold preflop and save the blinds for a better spot."
+
+
+# ------------------------------------------------------------
+#  FEJKAD UPSTREAM
+# ------------------------------------------------------------
+def fake_upstream(latency: float) -> web.Application:
+    async def chat(request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        await asyncio.sleep(latency)
+        if not body.get("stream"):
+            return web.json_response({"choices": [{"message": {"role": "assistant",
+                                                               "content": ANSWER}}]})
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await resp.prepare(request)
+        for word in ANSWER.split(" "):
+            chunk = {"choices": [{"delta": {"content": word + " "}}]}
+            await resp.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        await resp.write(b"data: [DONE]\n\n")
+        return resp
+
+    async def transcribe(request: web.Request) -> web.Response:
+        await request.post()
+        await asyncio.sleep(latency)
+        return web.json_response({"text": "Should I call with pocket fives?"})
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat)
+    app.router.add_post("/v1/audio/transcriptions", transcribe)
+    return app
+
+
+def start_upstream(latency: float) -> str:
+    """Kör upstream i en egen tråd (egen loop) → bas-URL"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    ready = threading.Event()
+
+    def serve():
+        loop = asyncio.new_event_loop()
+        runner = web.AppRunner(fake_upstream(latency), access_log=None)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port, backlog=1024).start())
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=serve, daemon=True).start()
+    ready.wait()
+    return f"http://127.0.0.1:{port}/v1"
+
+
+# ------------------------------------------------------------
+#  BASLINJE: BLOCKERANDE OPENAI I EN ASYNC-ENDPOINT
+# ------------------------------------------------------------
+def blocking_app(base_url: str):
+    import openai
+
+    openai.api_key = "sk-bench"
+    openai.api_base = base_url
+    app = FastAPI()
+
+    @app.post("/ask")
+    async def ask(request: Request):
+        data = await request.json()
+        response = openai.ChatCompletion.create(
+            model="gpt-4-turbo",
+            messages=[{"role": "user", "content": data["text"]}],
+            max_tokens=150,
+        )
+        return {"answer": response["choices"][0]["message"]["content"]}
+
+    return app
+
+
+# ------------------------------------------------------------
+#  LAST
+# ------------------------------------------------------------
+async def run_load(app, sessions: int, requests: int, llm=None) -> dict:
+    import httpx
+
+    latencies = []
+    errors = 0
+
+    async def session(i: int, client: httpx.AsyncClient):
+        nonlocal errors
+        for _ in range(requests):
+            t0 = time.perf_counter()
+            r = await client.post("/ask", json={"text": "Should I call with pocket fives?"},
+                                  headers={"X-Session-ID": f"bench-{i}", "X-Skill-Level": "3"})
+            latencies.append(time.perf_counter() - t0)
+            if r.status_code != 200:
+                errors += 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench",
+                                 timeout=600) as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(session(i, client) for i in range(sessions)))
+        wall = time.perf_counter() - t0
+    if llm is not None:
+        await llm.close()                   # sessionen hör till den här loopen
+    latencies.sort()
+    n = len(latencies)
+    return {
+        "requests": n,
+        "errors": errors,
+        "wall_s": round(wall, 2),
+        "req_per_s": round(n / wall, 1),
+        "p50_s": round(statistics.median(latencies), 3),
+        "p95_s": round(latencies[int(0.95 * (n - 1))], 3),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark: /ask med samtidiga sessioner")
+    ap.add_argument("--sessions", type=int, default=50)
+    ap.add_argument("--requests", type=int, default=4, help="anrop per session")
+    ap.add_argument("--latency", type=float, default=0.5, help="upstream-svarstid (s)")
+    ap.add_argument("--skip-blocking", action="store_true")
+    args = ap.parse_args()
+
+    base_url = start_upstream(args.latency)
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+    os.environ.setdefault("LLM_MAX_CONCURRENCY", str(max(args.sessions, 1)))
+
+    import make_episode
+
+    print(f"{args.sessions} sessioner × {args.requests} anrop, upstream {args.latency:g} s")
+    runs = [("async", make_episode.app)]
+    if not args.skip_blocking:
+        runs.append(("blocking", blocking_app(base_url)))
+    for name, app in runs:
+        result = asyncio.run(run_load(app, args.sessions, args.requests,
+                                      make_episode.llm if name == "async" else None))
+        print(f"{name:9s} " + "  ".join(f"{k} {v}" for k, v in result.items()))
+        if name == "async":
+            print(f"{'':9s} llm_stats {make_episode.llm.stats()}")
+
+
+if __name__ == "__main__":
+    main()
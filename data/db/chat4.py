@@ -28,6 +28,8 @@ from typing import Iterable, Sequence
 
 import openai, pandas as pd
 
+from combos import combos_for
+
 # --------------------------------------------------------------------------- #
 #  CONFIG                                                                     #
 # --------------------------------------------------------------------------- #
@@ -60,8 +62,6 @@ RAISE_RE = re.compile(
     re.I,
 )
 
-SUITS = ["c", "d", "h", "s"]
-
 COMBO_RE = re.compile(r"\b([2-9TJQKA][cdhs]\s*[2-9TJQKA][cdhs])\b", re.I)
 HAND_RE  = re.compile(r"\b([2-9TJQKA]{2}[so]?|([2-9TJQKA])\2)\b", re.I)
 POS_RE   = re.compile(
@@ -169,42 +169,8 @@ def encode_action_sequence(actions: Iterable[str]) -> str:
 
 
 def combos_for_hand(code: str) -> list[str]:
-    code = code.lower().replace(" ", "")
-
-    # exakt combo, t.ex. 6d5s
-    if len(code) == 4 and code[1] in "cdhs" and code[3] in "cdhs":
-        r1, s1, r2, s2 = code[0], code[1], code[2], code[3]
-        return [f"{r1.upper()}{s1}{r2.upper()}{s2}"]
-
-    code = code.upper()
-    if len(code) == 2:  # par eller odef. suited/off
-        a, b = code
-        if a == b:      # pocket par
-            return [
-                f"{a}{s1}{b}{s2}"
-                for i, s1 in enumerate(SUITS)
-                for s2 in SUITS[i + 1 :]
-            ]
-        suited  = [f"{a}{s}{b}{s}" for s in SUITS]
-        offsuit = [
-            f"{a}{s1}{b}{s2}"
-            for s1 in SUITS
-            for s2 in SUITS
-            if s1 != s2
-        ]
-        return suited + offsuit
-
-    if len(code) == 3:  # AKs / AKo
-        a, b, flag = code
-        if flag == "S":
-            return [f"{a}{s}{b}{s}" for s in SUITS]
-        return [
-            f"{a}{s1}{b}{s2}"
-            for s1 in SUITS
-            for s2 in SUITS
-            if s1 != s2
-        ]
-    return []
+    """Handkod (6d5s, AKs, AKo, AK, QQ, AhKx) → kanoniska kombos, se combos.py"""
+    return combos_for(code)
 
 
 # --------------------------------------------------------------------------- #
@@ -9,8 +9,8 @@ Nyheter i denna version
 -----------------------
 • Fångar fler uttryck: *raises, raised, 3-bet, limp, open…*
 • Tillåter **raise utan belopp**  → kodas som »R« (generisk size).
-• Fuzzy-sök: noder där actionsekvensen innehåller valfri raise hittas med
-  LIKE även om databasen lagrar "R2.5", "R3" osv.
+• Fuzzy-sök: noder där actionsekvensen innehåller valfri raise hittas via
+  trädets trie (tree_index.py) även om databasen lagrar "R2.5", "R3" osv.
 • Kortare fallback-frågor om hand/position saknas.
 • Skyddar procentsiffrorna från att ändras av GPT-polish.
 • Stöder kortalias f/c/x/k och kan returnera upp till 2500 tokens.
@@ -26,8 +26,16 @@ import os, re, sys, time, sqlite3, json
 from pathlib import Path
 from typing import Iterable, Sequence
 
+import numpy as np
 import openai, pandas as pd
 
+import queries
+from combos import COMBOS, class_name, combos_for, hand_indices
+from equity import EquityTable, load_equity
+from range_pack import PACK_PATH, PackNode, RangePack, load_pack
+from reach import REACH_PATH, ReachTable, load_reach
+from tree_index import ActionTrie
+
 # --------------------------------------------------------------------------- #
 #  CONFIG                                                                     #
 # --------------------------------------------------------------------------- #
@@ -61,9 +69,10 @@ RAISE_RE = re.compile(
     re.I,
 )
 
-SUITS = ["c", "d", "h", "s"]
+# belopp efter en raise: "2.5", "3bb", "8x"
+RAISE_SIZE_RE = re.compile(r"(\d+(?:\.\d+)?)(?:bb|x)?")
 
-COMBO_RE = re.compile(r"\b([2-9TJQKA][cdhs]\s*[2-9TJQKA][cdhs])\b", re.I)
+COMBO_RE = re.compile(r"\b([2-9TJQKA][cdhsx]\s*[2-9TJQKA][cdhsx])\b", re.I)
 HAND_RE  = re.compile(r"\b([2-9TJQKA]{2}[so]?|([2-9TJQKA])\2)\b", re.I)
 POS_RE   = re.compile(
     r"\b(utg|hj|co|btn|sb|bb|low ?jack|hijack|cutoff|button|small blind|big blind)\b",
@@ -88,69 +97,76 @@ def canonize_pos(conn: sqlite3.Connection, raw: str | None) -> str | None:
     """Map any alias to its canonical position (table position_alias)."""
     if raw is None:
         return None
-    row = conn.execute(
-        """
-        SELECT canonical
-        FROM position_alias
-        WHERE REPLACE(UPPER(alias),' ','') = REPLACE(UPPER(?),' ','')
-        """,
-        (raw,),
-    ).fetchone()
+    row = conn.execute(queries.CANON_POS, (raw,)).fetchone()
     return row[0] if row else raw.upper()
 
 
-def node_id_for(pos: str, seq: str, conn: sqlite3.Connection) -> int | None:
+def node_id_for(pos: str, seq: str,
+                trie: ActionTrie) -> tuple[int | None, list[tuple[str, str]]]:
+    """
+    Slår upp noden i trädets trie (O(djup)). Raise-storlekar som saknas i
+    trädet knäpps till närmaste storlek; en generisk 'R' blir den mest
+    spelade. Returnerar (node_id, [(begärd, använd), …]).
+    """
+    hit = trie.snap(pos, seq)
+    return (hit.node.node_id if hit.node else None), hit.mapping
+
+
+def describe_mapping(mapping: list[tuple[str, str]]) -> str:
+    """[('R3.0', 'R2.5'), ('R', 'R9.0')] → rad som visas under Actions-blocket"""
+    parts = [f"{'raise' if asked == 'R' else asked} → {used}" for asked, used in mapping]
+    return "Size mapping (closest size in the tree): " + ", ".join(parts)
+
+
+def describe_equity(eq: EquityTable, reach: ReachTable, node_id: int,
+                    pos: str, hand_code: str) -> str | None:
     """
-    Om sekvensen innehåller en generisk 'R' utan tal, leta efter den första
-    noden vars action_sequence matchar med valfri raise-storlek.
+    Handens all-in-equity mot varje motståndares reach-range i noden.
+    Spelare som inte agerat än (full range) hoppas över.
     """
-    if "R" in seq and not re.search(r"R\d", seq):
-        like = seq.replace("R", "R%")          # 'PF:F-R' ⇒ 'PF:F-R%'
-        row = conn.execute(
-            "SELECT id FROM nodes "
-            "WHERE position = ? AND action_sequence LIKE ? "
-            "ORDER BY id LIMIT 1",
-            (pos, like),
-        ).fetchone()
-    else:
-        row = conn.execute(
-            "SELECT id FROM nodes "
-            "WHERE position = ? AND action_sequence = ?",
-            (pos, seq),
-        ).fetchone()
-    return row[0] if row else None
+    if not hand_indices(hand_code).size:
+        return None
+    parts = []
+    for villain in reach.players(node_id) or ():
+        w = reach.weights(node_id, villain)
+        if villain == pos or w.min() >= 1.0:
+            continue
+        e = eq.node_equity(reach, node_id, pos, villain, hand=hand_code)
+        if e is not None:
+            parts.append(f"{villain} ({w.sum():.0f} combos) {e * 100:.1f} %")
+    return "Equity vs range: " + ", ".join(parts) if parts else None
 
 
 # --------------------------------------------------------------------------- #
 #  PARSERS                                                                    #
 # --------------------------------------------------------------------------- #
 def parse_actions(text: str) -> Sequence[str]:
-    """Returnera kanoniska tokens: fold, call, check, raise <size?>"""
+    """
+    Returnera kanoniska tokens: fold, call, check, raise <size?>
+
+    >>> parse_actions("UTG opens 2.5, HJ 3bet 8")
+    ['raise 2.5', 'raise 8.0']
+    >>> parse_actions("raise to 3bb, fold, call")
+    ['raise 3.0', 'fold', 'call']
+    """
     acts: list[str] = []
     tokens = text.lower().replace(",", " ").replace("-", " ").replace(";", " ").replace("after", " ").split()
     i = 0
     while i < len(tokens):
         t = tokens[i].strip(" \"'""''")
-        # Kolla om token är en känd action
         canon = ACTION_ALIAS.get(t)
+        # raise med belopp direkt efter ("opens 2.5", "3bet 8", "raise to 3bb")
+        # → storleken följer med, annars blir det en generisk raise
+        if canon == "raise":
+            j = i + 1 + (i + 1 < len(tokens) and tokens[i + 1] == "to")
+            m = RAISE_SIZE_RE.fullmatch(tokens[j]) if j < len(tokens) else None
+            if m:
+                acts.append(f"raise {float(m.group(1))}")
+                i = j + 1
+                continue
+        # Kolla om token är en känd action
         if canon:
             acts.append(canon)
-            i += 1
-            continue
-        # Kolla om det är en raise med siffra direkt efter
-        if t in {"raise", "raises", "raised", "open", "opens", "3bet", "3-bet", "4bet", "4-bet"}:
-            # Kolla om nästa token är en siffra
-            if i + 1 < len(tokens):
-                try:
-                    size = float(tokens[i+1].replace(",", "."))
-                    acts.append(f"raise {size}")
-                    i += 2
-                    continue
-                except ValueError:
-                    pass
-            acts.append("raise")
-            i += 1
-            continue
         i += 1
     return acts
 
@@ -170,42 +186,8 @@ def encode_action_sequence(actions: Iterable[str]) -> str:
 
 
 def combos_for_hand(code: str) -> list[str]:
-    code = code.lower().replace(" ", "")
-
-    # exakt combo, t.ex. 6d5s
-    if len(code) == 4 and code[1] in "cdhs" and code[3] in "cdhs":
-        r1, s1, r2, s2 = code[0], code[1], code[2], code[3]
-        return [f"{r1.upper()}{s1}{r2.upper()}{s2}"]
-
-    code = code.upper()
-    if len(code) == 2:  # par eller odef. suited/off
-        a, b = code
-        if a == b:      # pocket par
-            return [
-                f"{a}{s1}{b}{s2}"
-                for i, s1 in enumerate(SUITS)
-                for s2 in SUITS[i + 1 :]
-            ]
-        suited  = [f"{a}{s}{b}{s}" for s in SUITS]
-        offsuit = [
-            f"{a}{s1}{b}{s2}"
-            for s1 in SUITS
-            for s2 in SUITS
-            if s1 != s2
-        ]
-        return suited + offsuit
-
-    if len(code) == 3:  # AKs / AKo
-        a, b, flag = code
-        if flag == "S":
-            return [f"{a}{s}{b}{s}" for s in SUITS]
-        return [
-            f"{a}{s1}{b}{s2}"
-            for s1 in SUITS
-            for s2 in SUITS
-            if s1 != s2
-        ]
-    return []
+    """Handkod (6d5s, AKs, AKo, AK, QQ, AhKx) → kanoniska kombos, se combos.py"""
+    return combos_for(code)
 
 
 # --------------------------------------------------------------------------- #
@@ -217,16 +199,25 @@ def query_ranges(conn: sqlite3.Connection, node_id: int,
         return pd.DataFrame(columns=["action", "combo", "frequency"])
     qs = ",".join("?" * len(combos))
     return pd.read_sql_query(
-        f"""
-        SELECT action, combo, frequency
-        FROM ranges
-        WHERE node_id = ? AND combo IN ({qs})
-        """,
+        queries.RANGES_FOR_COMBOS.format(qs=qs),
         conn,
         params=[node_id, *combos],
     )
 
 
+def query_pack(pack: RangePack, node: PackNode,
+               idx: np.ndarray) -> pd.DataFrame:
+    """Samma format som query_ranges, men som heltals-gather ur range pack."""
+    freqs = pack.frequencies(node, idx)
+    rows = [
+        (action, COMBOS[i], float(f))
+        for i, row in zip(idx, freqs)
+        for action, f in zip(node.actions, row)
+        if f > 0
+    ]
+    return pd.DataFrame(rows, columns=["action", "combo", "frequency"])
+
+
 def summarise(df: pd.DataFrame) -> str:
     """Returnera blocket 'Actions:' med alla actions + medelfrekvens."""
     if df.empty:
@@ -242,6 +233,26 @@ def summarise(df: pd.DataFrame) -> str:
     return "Actions:\n  " + "\n  ".join(lines)
 
 
+def summarise_class(conn: sqlite3.Connection, node_id: int,
+                    hand_code: str) -> str | None:
+    """
+    Handklass (AKs / AKo / QQ) → 'Actions:'-blocket direkt ur den
+    förberäknade tabellen class_strategy. None om koden inte är en klass
+    eller om tabellen saknas (äldre DB) → anroparen räknar själv.
+    """
+    hand_class = class_name(hand_code)
+    if hand_class is None:
+        return None
+    try:
+        rows = conn.execute(queries.CLASS_STRATEGY, (node_id, hand_class)).fetchall()
+    except sqlite3.OperationalError:
+        return None
+    if not rows:
+        return None
+    lines = [f"{a.upper():<4}: {f*100:.1f} %" for a, f in rows]
+    return "Actions:\n  " + "\n  ".join(lines)
+
+
 # --------------------------------------------------------------------------- #
 #  LOGGING                                                                    #
 # --------------------------------------------------------------------------- #
@@ -318,6 +329,10 @@ def main() -> None:
     openai.api_key = os.environ["OPENAI_API_KEY"]
 
     conn = db()
+    pack = load_pack(PACK_PATH)          # None → SQL-fallback
+    trie = ActionTrie.from_pack(pack) if pack else ActionTrie.from_db(conn)
+    reach = load_reach(REACH_PATH)       # None → ingen equity-rad
+    eq    = load_equity()
     print("\nPoker Range Assistant – type 'exit' to quit\n")
 
     chat_history = []  # Spara (roll, text) för hela konversationen
@@ -382,12 +397,22 @@ def main() -> None:
             draft = ("Could not detect both hand and position. "
                      "Example: 'AKs CO after fold, fold' or '6d5s UTG'.")
         else:
-            node = node_id_for(pos_can, seq, conn)
-            if node:
-                df    = query_ranges(conn, node, combos_for_hand(hand_code))
-                draft = summarise(df)
-            else:
+            node, mapping = node_id_for(pos_can, seq, trie)
+            pnode = pack.by_id(node) if pack is not None and node else None
+
+            if not node:
                 draft = f"No node found for {pos_can} after sequence {seq}."
+            elif (draft := summarise_class(conn, node, hand_code)) is None:
+                if pnode is not None:
+                    df = query_pack(pack, pnode, hand_indices(hand_code))
+                else:
+                    df = query_ranges(conn, node, combos_for_hand(hand_code))
+                draft = summarise(df)
+            if node and mapping and draft.startswith("Actions:"):
+                draft += "\n" + describe_mapping(mapping)
+            if node and reach and eq and draft.startswith("Actions:") \
+                    and (line := describe_equity(eq, reach, node, pos_can, hand_code)):
+                draft += "\n" + line
 
         # ------------------------------------------------------------------ #
         #  GPT POLISH                                                        #
@@ -414,6 +439,8 @@ def main() -> None:
         chat_history.append(("assistant", final_ans))
 
     conn.close()
+    if pack is not None:
+        pack.close()
     print("Good-bye!")
 
 
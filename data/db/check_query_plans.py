@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""
+check_query_plans.py – regressionskontroll av frågeplanerna i poker_ranges.db
+
+• Kopierar databasen till minnet och kör migrate() (samma som --migrate)
+• Kör EXPLAIN QUERY PLAN på varje fråga i queries.QUERIES
+• Misslyckas (exit 1) om någon fråga faller tillbaka på en SCAN
+
+Frågor markerade som hel-tabell-läsning i queries.py (trädet vid start,
+GROUP BY över alla noder) får skanna.
+
+    python check_query_plans.py [poker_ranges.db]
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import sys
+from pathlib import Path
+
+from create_db2 import migrate
+from queries import QUERIES
+
+ROOT_DIR = Path(__file__).resolve().parent
+DB_PATH  = ROOT_DIR / "poker_ranges.db"
+
+
+def query_plan(conn: sqlite3.Connection, sql: str) -> list[str]:
+    params = [None] * sql.count("?")
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def plan_ok(plan: list[str], full_ok: bool) -> bool:
+    return full_ok or not any(step.startswith("SCAN ") for step in plan)
+
+
+def check(conn: sqlite3.Connection) -> list[str]:
+    """Returnerar namnen på frågor med dålig plan (tom lista = allt OK)."""
+    bad = []
+    for name, (sql, full_ok) in QUERIES.items():
+        plan = query_plan(conn, sql)
+        ok = plan_ok(plan, full_ok)
+        print(f"{'OK ' if ok else 'FEL'}  {name:<26} {' | '.join(plan)}")
+        if not ok:
+            bad.append(name)
+    return bad
+
+
+if __name__ == "__main__":
+    db_path = Path(sys.argv[1]) if len(sys.argv) > 1 else DB_PATH
+    if not db_path.exists():
+        sys.exit(f"Database not found: {db_path}")
+
+    src  = sqlite3.connect(db_path)
+    conn = sqlite3.connect(":memory:")
+    src.backup(conn)
+    src.close()
+    migrate(conn)
+
+    bad = check(conn)
+    conn.close()
+    if bad:
+        sys.exit(f"\n{len(bad)} fråga(or) faller tillbaka på SCAN: {', '.join(bad)}")
+    print(f"\n✓ Alla {len(QUERIES)} frågor använder index.")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+check_reach_sync.py – regressionskontroll: inkrementell --sync av reach-filen
+ska ge samma vikter som en full omräkning
+
+• Kopierar data/tree till en temporär katalog och bygger DB + pack + reach
+• Raderar noden med högst id (dess id får inte återanvändas) och lägger
+  till en ny nod, kör sync_tree + build_pack + update_reach(changed=…)
+  precis som create_db2.py --sync
+• Jämför reach-filen med compute_reach() utan old/changed: samma noder,
+  spelare, partial-flagga och vikter – annars exit 1
+
+    python check_reach_sync.py [data/tree]
+"""
+
+from __future__ import annotations
+
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from create_db2 import build_aggregates, decode_folder_name, import_tree, init_db, sync_tree
+from range_pack import RangePack, build_pack
+from reach import ReachTable, compute_reach, update_reach
+
+ROOT_DIR = Path(__file__).resolve().parent
+TREE_DIR = ROOT_DIR.parent / "tree"
+
+NEW_FOLDER = "fffc_sb"          # finns inte i trädet; läggs till vid sync
+
+
+def diff(table: ReachTable, pack: RangePack) -> list[str]:
+    """Skillnader mellan reach-filen och en full omräkning (tom = lika)"""
+    full, _ = compute_reach(pack)
+    bad = []
+    if set(full) != {n.id for n in table}:
+        bad.append(f"noder skiljer: {sorted(set(full) ^ {n.id for n in table})}")
+    for node_id, (reach, partial) in sorted(full.items()):
+        n = table.node(node_id)
+        if n is None:
+            continue
+        players = n.players
+        if players != tuple(reach) or n.partial != partial:
+            bad.append(f"nod {node_id}: {players} partial={n.partial}, "
+                       f"full {tuple(reach)} partial={partial}")
+        elif not all(np.array_equal(n.weights[i], reach[p]) for i, p in enumerate(players)):
+            bad.append(f"nod {node_id}: vikterna skiljer")
+    return bad
+
+
+def run(tree: Path) -> list[str]:
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        work = tmp / "tree"
+        shutil.copytree(tree, work)
+        db_path = tmp / "poker_ranges.db"
+        pack_path, reach_path = db_path.with_suffix(".pack"), db_path.with_suffix(".reach")
+
+        conn = init_db(db_path)
+        import_tree(work, conn)
+        build_aggregates(conn)
+        build_pack(conn, pack_path)
+        update_reach(pack_path, reach_path)
+
+        # radera noden med högst id, lägg till en ny (kopia av en befintlig fil)
+        last_id, last_folder = conn.execute(
+            "SELECT id, folder_name FROM nodes ORDER BY id DESC LIMIT 1").fetchone()
+        src = next(p for p in sorted(work.iterdir())
+                   if p.is_dir() and p.name != last_folder
+                   and decode_folder_name(p.name)[1] == NEW_FOLDER.rsplit("_", 1)[1])
+        shutil.rmtree(work / last_folder)
+        shutil.copytree(src, work / NEW_FOLDER)
+
+        changed, deleted = sync_tree(work, conn)
+        build_pack(conn, pack_path, reuse=set(changed))
+        update_reach(pack_path, reach_path, changed=set(changed))
+        conn.close()
+        print(f"sync: raderade {last_folder} (id {last_id}), "
+              f"la till {NEW_FOLDER} → ändrade id {changed}, raderade id {deleted}")
+
+        bad = []
+        if last_id in changed:
+            bad.append(f"id {last_id} återanvänt för {NEW_FOLDER}")
+        pack, table = RangePack(pack_path), ReachTable(reach_path)
+        bad += diff(table, pack)
+        table.close()
+        pack.close()
+        return bad
+
+
+if __name__ == "__main__":
+    tree = Path(sys.argv[1]) if len(sys.argv) > 1 else TREE_DIR
+    if not tree.is_dir():
+        sys.exit(f"Tree not found: {tree}")
+    bad = run(tree)
+    for line in bad:
+        print(f"FEL  {line}")
+    if bad:
+        sys.exit(f"\n{len(bad)} skillnad(er) mellan inkrementell och full reach")
+    print("✓ Inkrementell reach = full omräkning")
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+"""
+combos.py – kanonisk numrering av alla 1326 starthänder
+
+• kort-index  = rank*4 + suit           (2c = 0 … As = 51)
+• kombo-index = hi*(hi-1)/2 + lo        (hi > lo, 0 … 1325)
+• kanonisk sträng = högsta kortet först ('8s7d', '2d2c') – samma
+  orientering som träd-JSON:en använder
+
+Förberäknade tabeller mappar strängar (båda orienteringarna), handklasser
+(AKs / AKo / AK / QQ) och suit-mönster (AhKx, Ax2x …) till index-arrayer,
+så att varje uppslag blir en heltals-gather i stället för strängmatchning.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+
+import numpy as np
+
+# ------------------------------------------------------------
+#  KORT
+# ------------------------------------------------------------
+RANKS = "23456789TJQKA"
+SUITS = "cdhs"
+WILDCARD_SUITS = "x*?"
+
+CARDS: tuple[str, ...] = tuple(r + s for r in RANKS for s in SUITS)
+CARD_INDEX = {c: i for i, c in enumerate(CARDS)}
+
+
+def card_index(card: str) -> int:
+    """'Td' / 'td' / '10d' → 33"""
+    card = card.strip()
+    if card[:2] == "10":
+        card = "T" + card[2:]
+    return CARD_INDEX[card[0].upper() + card[1].lower()]
+
+
+# ------------------------------------------------------------
+#  KOMBOS
+# ------------------------------------------------------------
+N_COMBOS = 1326
+
+_PAIRS = [(hi, lo) for hi in range(52) for lo in range(hi)]
+
+COMBO_CARDS = np.array(_PAIRS, dtype=np.int8)     # (1326, 2)
+COMBO_CARDS.flags.writeable = False
+
+COMBOS: tuple[str, ...] = tuple(CARDS[hi] + CARDS[lo] for hi, lo in _PAIRS)
+
+COMBO_INDEX: dict[str, int] = {}
+for _i, (_hi, _lo) in enumerate(_PAIRS):
+    COMBO_INDEX[CARDS[_hi] + CARDS[_lo]] = _i
+    COMBO_INDEX[CARDS[_lo] + CARDS[_hi]] = _i       # omvänd orientering
+
+
+def combo_id(c1: int, c2: int) -> int:
+    """Två kort-index (valfri ordning) → kombo-index"""
+    hi, lo = (c1, c2) if c1 > c2 else (c2, c1)
+    return hi * (hi - 1) // 2 + lo
+
+
+def combo_index(combo: str) -> int:
+    """'8s7d' / '7d8s' / '8S 7D' → samma index (KeyError om okänd)"""
+    c = combo.replace(" ", "")
+    return COMBO_INDEX[c[0].upper() + c[1].lower() + c[2].upper() + c[3].lower()]
+
+
+def canonical(combo: str) -> str:
+    """'7d8s' → '8s7d'"""
+    return COMBOS[combo_index(combo)]
+
+
+# ------------------------------------------------------------
+#  HANDKLASSER (13×13-grid, A högst upp till vänster)
+#   rad i, kol j   (0 = A … 12 = 2)
+#   i == j → par, i < j → suited, i > j → offsuit
+# ------------------------------------------------------------
+_DESC = RANKS[::-1]
+
+
+def _class_name(i: int, j: int) -> str:
+    if i == j:
+        return _DESC[i] * 2
+    hi, lo = min(i, j), max(i, j)
+    return _DESC[hi] + _DESC[lo] + ("s" if i < j else "o")
+
+
+HAND_CLASSES: tuple[str, ...] = tuple(
+    _class_name(i, j) for i in range(13) for j in range(13)
+)
+CLASS_INDEX = {name: k for k, name in enumerate(HAND_CLASSES)}
+
+
+def _combo_class(hi: int, lo: int) -> int:
+    ri, rj = 12 - hi // 4, 12 - lo // 4            # rad/kol i griden
+    if ri == rj:
+        return ri * 13 + rj
+    if hi % 4 == lo % 4:
+        return ri * 13 + rj                         # suited: ri < rj
+    return rj * 13 + ri                             # offsuit: rad > kol
+
+
+COMBO_CLASS = np.array(
+    [_combo_class(hi, lo) for hi, lo in _PAIRS], dtype=np.int16
+)                                                  # (1326,) → 0 … 168
+COMBO_CLASS.flags.writeable = False
+
+CLASS_COMBOS: tuple[np.ndarray, ...] = tuple(
+    np.flatnonzero(COMBO_CLASS == k) for k in range(len(HAND_CLASSES))
+)
+CLASS_SIZE = np.array([len(ix) for ix in CLASS_COMBOS], dtype=np.int16)
+
+# kort-mask: CARD_BLOCKS[kort] = bool-array över kombos som innehåller kortet
+CARD_BLOCKS = np.zeros((52, N_COMBOS), dtype=bool)
+CARD_BLOCKS[COMBO_CARDS[:, 0], np.arange(N_COMBOS)] = True
+CARD_BLOCKS[COMBO_CARDS[:, 1], np.arange(N_COMBOS)] = True
+CARD_BLOCKS.flags.writeable = False
+
+
+# ------------------------------------------------------------
+#  UPPSLAG
+# ------------------------------------------------------------
+def _readonly(idx) -> np.ndarray:
+    arr = np.asarray(sorted(set(idx)), dtype=np.intp)
+    arr.flags.writeable = False
+    return arr
+
+
+def _pattern_indices(code: str) -> np.ndarray:
+    """'AhKx' / 'AxAx' / 'Ks2?' → alla kombos som matchar mönstret"""
+    r1, s1, r2, s2 = code[0].upper(), code[1].lower(), code[2].upper(), code[3].lower()
+    suits1 = SUITS if s1 in WILDCARD_SUITS else s1
+    suits2 = SUITS if s2 in WILDCARD_SUITS else s2
+    return _readonly(
+        COMBO_INDEX[r1 + a + r2 + b]
+        for a in suits1 for b in suits2
+        if r1 + a != r2 + b
+    )
+
+
+@lru_cache(maxsize=None)
+def hand_indices(code: str) -> np.ndarray:
+    """
+    Handkod → sorterad (read-only) array med kombo-index.
+
+        '6d5s'       exakt kombo (valfri orientering)
+        'AhKx'       suit-mönster (x, * eller ? = valfri suit)
+        'AKs' 'AKo'  handklass
+        'AK'         suited + offsuit
+        'QQ'         pocket par
+    Okänd kod → tom array.
+    """
+    c = code.replace(" ", "")
+    if c[:2] == "10":
+        c = "T" + c[2:]
+    try:
+        if len(c) == 4 and c[1].lower() in SUITS + WILDCARD_SUITS \
+                and c[3].lower() in SUITS + WILDCARD_SUITS:
+            return _pattern_indices(c)
+
+        c = c.upper()
+        if len(c) == 2:
+            if c[0] == c[1]:
+                return CLASS_COMBOS[CLASS_INDEX[c]]
+            hi, lo = sorted(c, key=RANKS.index, reverse=True)
+            return _readonly(np.concatenate([
+                CLASS_COMBOS[CLASS_INDEX[f"{hi}{lo}s"]],
+                CLASS_COMBOS[CLASS_INDEX[f"{hi}{lo}o"]],
+            ]))
+        if len(c) == 3 and c[2] in "SO":
+            hi, lo = sorted(c[:2], key=RANKS.index, reverse=True)
+            return CLASS_COMBOS[CLASS_INDEX[f"{hi}{lo}{c[2].lower()}"]]
+    except (KeyError, ValueError):
+        pass
+    return _readonly(())
+
+
+def class_name(code: str) -> str | None:
+    """'aks' / 'KAs' / 'qq' → 'AKs' / 'QQ', None om koden inte är en handklass"""
+    c = code.replace(" ", "").upper()
+    if len(c) == 2 and c[0] == c[1] and c in CLASS_INDEX:
+        return c
+    if len(c) == 3 and c[2] in "SO" and c[0] in RANKS and c[1] in RANKS \
+            and c[0] != c[1]:
+        hi, lo = sorted(c[:2], key=RANKS.index, reverse=True)
+        return f"{hi}{lo}{c[2].lower()}"
+    return None
+
+
+def combos_for(code: str) -> list[str]:
+    """Handkod → kanoniska kombo-strängar"""
+    return [COMBOS[i] for i in hand_indices(code)]
+
+
+def hand_class(combo: str) -> str:
+    """'Kd9d' → 'K9s'"""
+    return HAND_CLASSES[COMBO_CLASS[combo_index(combo)]]
@@ -7,15 +7,32 @@ Bygger poker-databasen poker_ranges.db från katalogstrukturen …\data\tree
 • Avkodar mappnamnet (ex. 'ffr25_btn') → action-sekvens + position
 • Normaliserar positioner med en alias-tabell (UTG = LJ = LowJack …)
 • Lagrar allt i SQLite-tabellerna: nodes, ranges, position_alias
+• --bulk: JSON-parsning i en processpool, executemany i EN transaktion
+  (journal/synchronous-pragmas), index byggs efter laddning + progress
+• Förberäknar aggregat per nod: class_strategy (169 handklasser),
+  node_actions och node_stats (andel per action, VPIP/PFR, antal kombos)
+• --sync: inkrementell omimport styrd av manifest-tabellen (sha256 + mtime
+  per mapp) – bara ändrade noder upsertas, borttagna mappar raderas
 """
 
 import os
+import sys
 import json
+import hashlib
 import re
+import time
 import sqlite3
 import shutil
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import numpy as np
+
+from combos import CLASS_SIZE, COMBO_CLASS, HAND_CLASSES, canonical
+from range_pack import build_pack, node_matrix
+from reach import update_reach
+
 # ------------------------------------------------------------
 #  KONFIGURATION
 # ------------------------------------------------------------
@@ -52,6 +69,74 @@ ALIAS_TO_ORD   = { _sanitize(a): 1 + POSITION_ORDER.index(canon)
                    for canon, lst in POSITION_ALIASES.items()
                    for a in lst }
 
+# index som byggs EFTER laddning (snabbare än att underhålla dem per INSERT)
+# täcker alla frågor i queries.py – verifieras av check_query_plans.py
+INDEXES = [
+    # query_ranges / node_matrix: node_id + combo IN (…), täckande
+    "CREATE INDEX IF NOT EXISTS idx_ranges_node_combo "
+    "ON ranges(node_id, combo, action, frequency)",
+    # viz2.top_combos: node_id + action, ORDER BY frequency DESC, täckande
+    "CREATE INDEX IF NOT EXISTS idx_ranges_node_action_freq "
+    "ON ranges(node_id, action, frequency DESC, combo)",
+    # viz2.get_nodes_for_position: position, ORDER BY action_sequence
+    "CREATE INDEX IF NOT EXISTS idx_nodes_pos_seq "
+    "ON nodes(position, action_sequence)",
+    # canonize_pos jämför på normaliserat alias
+    "CREATE INDEX IF NOT EXISTS idx_alias_norm "
+    "ON position_alias(REPLACE(UPPER(alias),' ',''))",
+]
+
+# PRAGMA user_version – höj och lägg till ett steg i migrate() vid schemaändring
+SCHEMA_VERSION = 3
+
+BULK_BATCH = 50_000          # rader per executemany
+
+# ------------------------------------------------------------
+#  AGGREGAT-TABELLER (fylls av build_aggregates)
+# ------------------------------------------------------------
+AGGREGATE_SCHEMA = """
+    -- kombo-viktad frekvens per handklass (AKs, AKo, QQ …)
+    CREATE TABLE IF NOT EXISTS class_strategy (
+        node_id    INTEGER NOT NULL,
+        hand_class TEXT NOT NULL,
+        action     TEXT NOT NULL,
+        frequency  REAL NOT NULL,
+        PRIMARY KEY (node_id, hand_class, action)
+    ) WITHOUT ROWID;
+
+    -- andel av alla kombos som tar respektive action
+    CREATE TABLE IF NOT EXISTS node_actions (
+        node_id INTEGER NOT NULL,
+        action  TEXT NOT NULL,
+        share   REAL NOT NULL,   -- 0 … 1
+        combos  REAL NOT NULL,   -- kombo-viktat antal (= SUM(frequency))
+        PRIMARY KEY (node_id, action)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS node_stats (
+        node_id INTEGER PRIMARY KEY,
+        combos  INTEGER NOT NULL,  -- kombos med data i noden
+        vpip    REAL NOT NULL,     -- andel call + raise
+        pfr     REAL NOT NULL      -- andel raise
+    );
+"""
+
+# ------------------------------------------------------------
+#  MANIFEST (en rad per trädmapp, styr --sync)
+# ------------------------------------------------------------
+MANIFEST_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS manifest (
+        folder_name TEXT PRIMARY KEY,
+        file_path   TEXT NOT NULL,
+        sha256      TEXT NOT NULL,
+        mtime       REAL NOT NULL,
+        size        INTEGER NOT NULL,
+        node_id     INTEGER NOT NULL
+    );
+"""
+
+SYNC_POOL_MIN = 16           # färre ändrade filer än så → parsa i huvudprocessen
+
 # ------------------------------------------------------------
 #  HJÄLPFUNKTIONER
 # ------------------------------------------------------------
@@ -110,7 +195,7 @@ def init_db(db_path: Path) -> sqlite3.Connection:
         );
 
         CREATE TABLE nodes (
-            id              INTEGER PRIMARY KEY,
+            id              INTEGER PRIMARY KEY AUTOINCREMENT,   -- id återanvänds aldrig
             action_sequence TEXT NOT NULL,
             position        TEXT NOT NULL,   -- kanoniskt namn
             folder_name     TEXT NOT NULL,
@@ -127,6 +212,8 @@ def init_db(db_path: Path) -> sqlite3.Connection:
         );
         """
     )
+    c.executescript(AGGREGATE_SCHEMA + MANIFEST_SCHEMA)
+    c.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
 
     # Fyll alias-tabellen
     rows = [(alias, canon, ALIAS_TO_ORD[_sanitize(alias)])
@@ -141,24 +228,107 @@ def init_db(db_path: Path) -> sqlite3.Connection:
     return conn
 
 
+def open_db(db_path: Path) -> sqlite3.Connection:
+    """Öppnar en befintlig databas utan att nollställa den (skapar vid behov)"""
+    if not db_path.exists():
+        return init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    migrate(conn)                                   # äldre DB-filer
+    return conn
+
+
 def canonize_pos(raw_pos: str) -> str:
     """UTG/lj/low jack -> 'UTG' (om känt), annars versalt råvärde"""
     key = _sanitize(raw_pos)
     return ALIAS_TO_CANON.get(key, raw_pos.upper())
 
 
-def import_tree(base_dir: Path, conn: sqlite3.Connection):
-    c = conn.cursor()
-    node_cnt = range_cnt = 0
-
+def scan_tree(base_dir: Path) -> list[tuple[str, str]]:
+    """(mappnamn, sökväg till JSON) för alla mappar med exakt en JSON-fil"""
+    found = []
     for dirpath, _, files in os.walk(base_dir):
         json_files = [f for f in files if f.endswith(".json")]
         if len(json_files) != 1:
             continue                            # hoppa mappar utan exakt en JSON
+        found.append((os.path.basename(dirpath),
+                      os.path.join(dirpath, json_files[0])))
+    return found
+
+
+def file_fingerprint(folder: str, file_path: str) -> dict:
+    """Manifest-fälten (sha256, mtime, size) för en nod-fil"""
+    st = os.stat(file_path)
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return {"folder": folder, "file_path": file_path, "sha256": h.hexdigest(),
+            "mtime": st.st_mtime, "size": st.st_size}
+
+
+def create_indexes(conn: sqlite3.Connection) -> None:
+    for sql in INDEXES:
+        conn.execute(sql)
+    conn.execute("ANALYZE")
+    conn.commit()
 
-        folder    = os.path.basename(dirpath)
-        file_path = os.path.join(dirpath, json_files[0])
 
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Uppgraderar en befintlig DB-fil till SCHEMA_VERSION (idempotent).
+      v1: aggregat- och manifest-tabeller (fylls om de är tomma)
+      v2: täckande index enligt INDEXES, ersätter idx_ranges_node
+      v3: nodes.id AUTOINCREMENT – en raderad nods id (pack/reach-block)
+          får aldrig gå till en ny nod vid --sync
+    Returnerar versionen före migreringen.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version < 1:
+        conn.executescript(AGGREGATE_SCHEMA + MANIFEST_SCHEMA)
+        if conn.execute("SELECT 1 FROM class_strategy LIMIT 1").fetchone() is None:
+            build_aggregates(conn)
+    if version < 2:
+        conn.execute("DROP INDEX IF EXISTS idx_ranges_node")
+        create_indexes(conn)
+    if version < 3:
+        _nodes_autoincrement(conn)
+    if version < SCHEMA_VERSION:
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    return version
+
+
+def _nodes_autoincrement(conn: sqlite3.Connection) -> None:
+    """Bygg om nodes med AUTOINCREMENT (SQLite kan inte ändra kolumnen på plats)"""
+    sql = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'nodes'").fetchone()
+    if sql is None or "AUTOINCREMENT" in sql[0].upper():
+        return
+    conn.executescript(
+        """
+        BEGIN;
+        CREATE TABLE nodes_v3 (
+            id              INTEGER PRIMARY KEY AUTOINCREMENT,
+            action_sequence TEXT NOT NULL,
+            position        TEXT NOT NULL,
+            folder_name     TEXT NOT NULL,
+            file_path       TEXT NOT NULL
+        );
+        INSERT INTO nodes_v3 (id, action_sequence, position, folder_name, file_path)
+            SELECT id, action_sequence, position, folder_name, file_path FROM nodes;
+        DROP TABLE nodes;
+        ALTER TABLE nodes_v3 RENAME TO nodes;
+        COMMIT;
+        """
+    )
+    create_indexes(conn)                            # index på nodes försvann med tabellen
+
+
+def import_tree(base_dir: Path, conn: sqlite3.Connection):
+    c = conn.cursor()
+    node_cnt = range_cnt = 0
+
+    for folder, file_path in scan_tree(base_dir):
         try:
             raw_seq, raw_pos = decode_folder_name(folder)
         except Exception as e:
@@ -180,11 +350,14 @@ def import_tree(base_dir: Path, conn: sqlite3.Connection):
         )
         node_id = c.lastrowid
         node_cnt += 1
+        _upsert_manifest(c, file_fingerprint(folder, file_path), node_id)
 
         # --- ranges ---
         # data = { 'c': {...}, 'f': {...}, ... }
+        # kombos lagras i kanonisk orientering (8s7d, aldrig 7d8s), se combos.py
         for action_code, combos in data.items():
             for combo, freq in combos.items():
+                combo = canonical(combo)
                 c.execute(
                     """
                     INSERT INTO ranges (node_id, action, combo, frequency)
@@ -198,16 +371,329 @@ def import_tree(base_dir: Path, conn: sqlite3.Connection):
     print(f"✓ Import klar – {node_cnt} noder och {range_cnt} handrader insatta.")
 
 
+# ------------------------------------------------------------
+#  BULK-IMPORT
+# ------------------------------------------------------------
+def _parse_node(item: tuple[str, str]) -> dict:
+    """
+    Körs i en worker-process: (mapp, fil) → dict med seq, pos, rader och
+    manifest-fälten sha256/mtime/size ('error' satt om mappen ska hoppas).
+    """
+    folder, file_path = item
+    node = {"folder": folder, "file_path": file_path, "error": None}
+    try:
+        st = os.stat(file_path)
+        with open(file_path, "rb") as f:
+            raw = f.read()
+        raw_seq, raw_pos = decode_folder_name(folder)
+        data = json.loads(raw)
+        node.update(
+            seq=raw_seq,
+            pos=canonize_pos(raw_pos),
+            sha256=hashlib.sha256(raw).hexdigest(),
+            mtime=st.st_mtime,
+            size=st.st_size,
+            rows=[(action_code, canonical(combo), float(freq))
+                  for action_code, combos in data.items()
+                  for combo, freq in combos.items()],
+        )
+    except Exception as e:
+        node["error"] = str(e)
+    return node
+
+
+def _upsert_manifest(c: sqlite3.Cursor, node: dict, node_id: int) -> None:
+    c.execute(
+        "INSERT OR REPLACE INTO manifest "
+        "(folder_name, file_path, sha256, mtime, size, node_id) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (node["folder"], node["file_path"], node["sha256"],
+         node["mtime"], node["size"], node_id),
+    )
+
+
+def _progress(done: int, total: int, rows: int, t0: float) -> None:
+    dt = max(time.perf_counter() - t0, 1e-9)
+    sys.stdout.write(
+        f"\r  {done}/{total} noder · {rows:,} rader · "
+        f"{done / dt:,.0f} noder/s · {rows / dt:,.0f} rader/s"
+    )
+    sys.stdout.flush()
+
+
+def import_tree_bulk(base_dir: Path, conn: sqlite3.Connection,
+                     workers: int | None = None,
+                     batch: int = BULK_BATCH) -> tuple[int, int]:
+    """
+    Snabb import för stora träd:
+      • JSON parsas parallellt i en ProcessPoolExecutor
+      • rader skrivs med executemany i en enda transaktion
+      • journal/synchronous slås av under laddningen, index byggs efteråt
+    Returnerar (antal noder, antal rader).
+    """
+    items = scan_tree(base_dir)
+    total = len(items)
+    node_cnt = range_cnt = 0
+    pending: list[tuple[int, str, str, float]] = []
+
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA cache_size = -262144")        # 256 MB
+    c = conn.cursor()
+
+    t0 = time.perf_counter()
+    c.execute("BEGIN")
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunk = max(1, total // (4 * (workers or os.cpu_count() or 1)))
+            for node in pool.map(_parse_node, items, chunksize=chunk):
+                if node["error"]:
+                    print(f"\n[SKIP] {node['folder']}: {node['error']}")
+                    continue
+
+                c.execute(
+                    "INSERT INTO nodes (action_sequence, position, folder_name, file_path) "
+                    "VALUES (?, ?, ?, ?)",
+                    (node["seq"], node["pos"], node["folder"], node["file_path"]),
+                )
+                node_id = c.lastrowid
+                _upsert_manifest(c, node, node_id)
+                pending.extend((node_id, a, combo, f) for a, combo, f in node["rows"])
+                node_cnt  += 1
+                range_cnt += len(node["rows"])
+
+                if len(pending) >= batch:
+                    c.executemany(
+                        "INSERT INTO ranges (node_id, action, combo, frequency) "
+                        "VALUES (?, ?, ?, ?)", pending)
+                    pending.clear()
+                    _progress(node_cnt, total, range_cnt, t0)
+
+        if pending:
+            c.executemany(
+                "INSERT INTO ranges (node_id, action, combo, frequency) "
+                "VALUES (?, ?, ?, ?)", pending)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.execute("PRAGMA synchronous = FULL")
+        conn.execute("PRAGMA journal_mode = DELETE")
+
+    _progress(node_cnt, total, range_cnt, t0)
+    t1 = time.perf_counter()
+    create_indexes(conn)
+    t2 = time.perf_counter()
+    print(f"\n✓ Bulk-import klar – {node_cnt} noder och {range_cnt} handrader "
+          f"på {t1 - t0:.2f} s (+ index {t2 - t1:.2f} s).")
+    return node_cnt, range_cnt
+
+
+# ------------------------------------------------------------
+#  INKREMENTELL SYNC
+# ------------------------------------------------------------
+def sync_tree(base_dir: Path, conn: sqlite3.Connection,
+              workers: int | None = None) -> tuple[list[int], list[int]]:
+    """
+    Jämför trädet mot manifest-tabellen och
+      • upsertar noder vars fil ändrats (nytt sha256) eller är nya
+      • raderar noder vars mapp försvunnit
+    allt i EN transaktion. mtime+size oförändrade → filen hashas inte ens.
+    Returnerar (ändrade node_id, raderade node_id).
+    """
+    c = conn.cursor()
+    manifest = {
+        folder: (sha, mtime, size, node_id)
+        for folder, sha, mtime, size, node_id in c.execute(
+            "SELECT folder_name, sha256, mtime, size, node_id FROM manifest")
+    }
+    # DB byggd före manifestet → matcha noder på mappnamn
+    node_by_folder = dict(c.execute("SELECT folder_name, id FROM nodes"))
+
+    on_disk = scan_tree(base_dir)
+    touched: list[tuple[str, str]] = []       # mtime/size ändrade → hasha
+    for folder, file_path in on_disk:
+        old = manifest.get(folder)
+        st  = os.stat(file_path)
+        if old and old[1] == st.st_mtime and old[2] == st.st_size:
+            continue
+        touched.append((folder, file_path))
+
+    if len(touched) >= SYNC_POOL_MIN:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parsed = list(pool.map(_parse_node, touched))
+    else:
+        parsed = [_parse_node(item) for item in touched]
+
+    disk_folders = {folder for folder, _ in on_disk}
+    gone = [(folder, node_by_folder.get(folder, m[3]))
+            for folder, m in manifest.items() if folder not in disk_folders]
+    gone += [(folder, node_id) for folder, node_id in node_by_folder.items()
+             if folder not in disk_folders and folder not in manifest]
+
+    changed: list[int] = []
+    deleted: list[int] = []
+    c.execute("BEGIN")
+    try:
+        for folder, node_id in gone:
+            for table in ("ranges", "class_strategy", "node_actions", "node_stats"):
+                c.execute(f"DELETE FROM {table} WHERE node_id = ?", (node_id,))
+            c.execute("DELETE FROM nodes WHERE id = ?", (node_id,))
+            c.execute("DELETE FROM manifest WHERE folder_name = ?", (folder,))
+            deleted.append(node_id)
+
+        for node in parsed:
+            if node["error"]:
+                print(f"[SKIP] {node['folder']}: {node['error']}")
+                continue
+            old = manifest.get(node["folder"])
+            node_id = old[3] if old else node_by_folder.get(node["folder"])
+            if old and old[0] == node["sha256"]:
+                _upsert_manifest(c, node, node_id)   # bara mtime ändrad
+                continue
+
+            if node_id is None:
+                c.execute(
+                    "INSERT INTO nodes (action_sequence, position, folder_name, file_path) "
+                    "VALUES (?, ?, ?, ?)",
+                    (node["seq"], node["pos"], node["folder"], node["file_path"]),
+                )
+                node_id = c.lastrowid
+            else:
+                c.execute(
+                    "UPDATE nodes SET action_sequence = ?, position = ?, file_path = ? "
+                    "WHERE id = ?",
+                    (node["seq"], node["pos"], node["file_path"], node_id),
+                )
+                c.execute("DELETE FROM ranges WHERE node_id = ?", (node_id,))
+            c.executemany(
+                "INSERT INTO ranges (node_id, action, combo, frequency) "
+                "VALUES (?, ?, ?, ?)",
+                [(node_id, a, combo, f) for a, combo, f in node["rows"]],
+            )
+            _upsert_manifest(c, node, node_id)
+            changed.append(node_id)
+
+        build_aggregates(conn, changed, commit=False)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return changed, deleted
+
+
+def build_aggregates(conn: sqlite3.Connection,
+                     node_ids: list[int] | None = None,
+                     commit: bool = True) -> None:
+    """
+    Förberäkna class_strategy, node_actions och node_stats.
+    node_ids=None → alla noder, annars bara de angivna (tidigare rader ersätts).
+    commit=False → anroparen äger transaktionen (används av sync_tree).
+    """
+    c = conn.cursor()
+    if node_ids is None:
+        node_ids = [r[0] for r in c.execute("SELECT id FROM nodes")]
+
+    for node_id in node_ids:
+        for table in ("class_strategy", "node_actions", "node_stats"):
+            c.execute(f"DELETE FROM {table} WHERE node_id = ?", (node_id,))
+
+        actions, mat = node_matrix(conn, node_id)
+        if not actions:
+            continue
+        mat = mat.astype(np.float64)
+
+        # --- 169 handklasser: summa per klass / antal kombos i klassen ---
+        per_class = np.zeros((len(HAND_CLASSES), len(actions)))
+        np.add.at(per_class, COMBO_CLASS, mat)
+        per_class /= CLASS_SIZE[:, None]
+        k, j = np.nonzero(per_class)
+        c.executemany(
+            "INSERT INTO class_strategy (node_id, hand_class, action, frequency) "
+            "VALUES (?, ?, ?, ?)",
+            [(node_id, HAND_CLASSES[a], actions[b], float(per_class[a, b]))
+             for a, b in zip(k, j)],
+        )
+
+        # --- nod-nivå ---
+        n_combos = int(np.count_nonzero(mat.sum(axis=1)))
+        totals   = mat.sum(axis=0)
+        share    = totals / max(n_combos, 1)
+        c.executemany(
+            "INSERT INTO node_actions (node_id, action, share, combos) "
+            "VALUES (?, ?, ?, ?)",
+            [(node_id, a, float(s), float(t))
+             for a, s, t in zip(actions, share, totals)],
+        )
+        vpip = sum(s for a, s in zip(actions, share) if a[0] in "cr")
+        pfr  = sum(s for a, s in zip(actions, share) if a[0] == "r")
+        c.execute(
+            "INSERT INTO node_stats (node_id, combos, vpip, pfr) VALUES (?, ?, ?, ?)",
+            (node_id, n_combos, float(vpip), float(pfr)),
+        )
+
+    if commit:
+        conn.commit()
+
+
 # ------------------------------------------------------------
 #  MAIN
 # ------------------------------------------------------------
 if __name__ == "__main__":
-    BASE_TREE.mkdir(parents=True, exist_ok=True)  # säkerställ att mapp finns
-    DB_DIR.mkdir(parents=True, exist_ok=True)
-
-    conn = init_db(DB_PATH)
-    import_tree(BASE_TREE, conn)
+    ap = argparse.ArgumentParser(description="Bygg poker_ranges.db från data/tree")
+    ap.add_argument("--tree", type=Path, default=BASE_TREE)
+    ap.add_argument("--db",   type=Path, default=DB_PATH)
+    ap.add_argument("--bulk", action="store_true",
+                    help="parallell parsning + batchad import (stora träd)")
+    ap.add_argument("--sync", action="store_true",
+                    help="inkrementellt: importera bara ändrade/nya/borttagna mappar")
+    ap.add_argument("--migrate", action="store_true",
+                    help="uppgradera en befintlig DB-fil (index, aggregat) och avsluta")
+    ap.add_argument("--workers", type=int, default=None,
+                    help="antal processer för --bulk/--sync (default: alla kärnor)")
+    args = ap.parse_args()
+
+    args.tree.mkdir(parents=True, exist_ok=True)  # säkerställ att mapp finns
+    args.db.parent.mkdir(parents=True, exist_ok=True)
+    pack_path = args.db.with_suffix(".pack")
+    reach_path = args.db.with_suffix(".reach")
+
+    if args.migrate:
+        conn = sqlite3.connect(args.db)
+        before = migrate(conn)
+        conn.close()
+        print(f"✓ {args.db}: schema v{before} → v{SCHEMA_VERSION}")
+        sys.exit(0)
+
+    if args.sync:
+        t0 = time.perf_counter()
+        conn = open_db(args.db)
+        changed, deleted = sync_tree(args.tree, conn, workers=args.workers)
+        if changed or deleted or not pack_path.exists():
+            build_pack(conn, pack_path, reuse=set(changed))
+        if changed or deleted or not reach_path.exists():
+            # reach: bara delträden under ändrade noder (full körning om filen saknas)
+            update_reach(pack_path, reach_path,
+                         changed=set(changed) if reach_path.exists() else None)
+        conn.close()
+        print(f"✓ Sync klar på {time.perf_counter() - t0:.2f} s – "
+              f"{len(changed)} noder uppdaterade, {len(deleted)} borttagna.")
+        sys.exit(0)
+
+    conn = init_db(args.db)
+    if args.bulk:
+        import_tree_bulk(args.tree, conn, workers=args.workers)
+    else:
+        import_tree(args.tree, conn)
+        create_indexes(conn)
+    build_aggregates(conn)
+    n_pack = build_pack(conn, pack_path)
     conn.close()
+    update_reach(pack_path, reach_path)
 
-    print(f"\nDatabasen skapad: {DB_PATH}")
+    print(f"\nDatabasen skapad: {args.db}")
+    print(f"Range pack ({n_pack} noder): {pack_path}")
+    print(f"Reach-vikter: {reach_path}")
     print("Alias-tabellen innehåller även 'LJ / LOWJACK' → UTG.\n")
@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+"""
+equity.py – förberäknad preflop-equity (all-in) och range-mot-range-equity
+
+• Bygge (offline): Monte Carlo över slumpade bord, parallellt över kärnor
+  (ProcessPoolExecutor). Varje bord utvärderas för ALLA 1326 kombos på en
+  gång med hand_eval.rank7 och jämförs parvis → vinster W[h, v] och antal
+  bord N[h, v]
+• Suit-symmetri: par (h, v) i samma bana under de 24 suit-permutationerna
+  har samma equity → räknarna slås ihop per bana (mycket lägre varians),
+  och kortkrockar/blockers hanteras exakt på kombo-nivå
+• Lagring bredvid databasen, laddas med np.load(mmap_mode="r"):
+    equity_1326.npy   float32 (1326, 1326), 0 vid kortkrock
+    equity_169.npy    float32 (169, 169), kombo-viktat snitt utan krockar
+• API: range_equity(hero, villain) = (h·E·v) / (h·M·v) där M är
+  krock-masken – samma matrisprodukt för en hand, en range ur
+  hand_range.py eller en reach-vektor ur reach.py
+
+    python equity.py --build [--boards 20000] [--workers N]
+    python equity.py AKs QQ
+    python equity.py AKs "QQ, KK, AA, AKs, AKo"
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import permutations
+from pathlib import Path
+
+import numpy as np
+
+from combos import (CARD_BLOCKS, CLASS_INDEX, COMBO_CARDS, COMBO_CLASS,
+                    HAND_CLASSES, N_COMBOS, class_name)
+from hand_eval import rank7
+from hand_range import Range
+
+# ------------------------------------------------------------
+#  KONFIGURATION
+# ------------------------------------------------------------
+ROOT_DIR    = Path(__file__).resolve().parent
+E1326_PATH  = ROOT_DIR / "equity_1326.npy"
+E169_PATH   = ROOT_DIR / "equity_169.npy"
+
+BOARDS      = 20_000         # bord totalt; varje kombo-par ser ~66 % av dem
+BOARD_BATCH = 32             # bord per utvärderings-anrop
+
+# ------------------------------------------------------------
+#  BYGGE
+# ------------------------------------------------------------
+def _simulate(seed: int, n_boards: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    n_boards slumpade bord → (W2, N), båda (1326, 1326) uint32.
+    W2 = 2·vinster + oavgjorda för h mot v, N = bord där varken h eller v krockar.
+    """
+    rng = np.random.default_rng(seed)
+    w2 = np.zeros((N_COMBOS, N_COMBOS), dtype=np.uint32)
+    cnt = np.zeros((N_COMBOS, N_COMBOS), dtype=np.uint32)
+    gt = np.empty((N_COMBOS, N_COMBOS), dtype=bool)
+    hole = COMBO_CARDS.astype(np.int32)
+    big = np.iinfo(np.int32).max
+    for start in range(0, n_boards, BOARD_BATCH):
+        b = min(BOARD_BATCH, n_boards - start)
+        deck = np.argsort(rng.random((b, 52)), axis=1).astype(np.int32)
+        boards = deck[:, :5]
+        valid = ~CARD_BLOCKS[boards].any(axis=1)                  # (b, 1326)
+        # krockande kombos får två lediga kort (resultatet maskas bort nedan)
+        holes = np.where(valid[..., None], hole, deck[:, None, 5:7])
+        cards = np.concatenate([
+            holes, np.broadcast_to(boards[:, None, :], (b, N_COMBOS, 5)),
+        ], axis=2).reshape(-1, 7)
+        ranks = rank7(cards).astype(np.int32).reshape(b, N_COMBOS)
+        for i in range(b):
+            ok = valid[i]
+            rh = np.where(ok, ranks[i], -1)          # ogiltig hjälte vinner aldrig
+            rv = np.where(ok, ranks[i], big)         # ogiltig skurk kan inte slås
+            np.greater(rh[:, None], rv[None, :], out=gt)
+            w2 += gt
+            w2 += gt
+            np.equal(rh[:, None], rv[None, :], out=gt)
+            w2 += gt
+            np.logical_and(ok[:, None], ok[None, :], out=gt)
+            cnt += gt
+    return w2, cnt
+
+
+def _suit_orbits() -> np.ndarray:
+    """(1326·1326,) bana-id per kombo-par under de 24 suit-permutationerna"""
+    hi = COMBO_CARDS[:, 0].astype(np.int64)
+    lo = COMBO_CARDS[:, 1].astype(np.int64)
+    key = np.full(N_COMBOS * N_COMBOS, np.iinfo(np.int64).max)
+    for perm in permutations(range(4)):
+        p = np.array(perm)
+        a = hi // 4 * 4 + p[hi % 4]
+        b = lo // 4 * 4 + p[lo % 4]
+        hi2, lo2 = np.maximum(a, b), np.minimum(a, b)
+        mapped = hi2 * (hi2 - 1) // 2 + lo2                       # combo_id, vektoriserat
+        np.minimum(key, (mapped[:, None] * N_COMBOS + mapped[None, :]).ravel(), out=key)
+    return np.unique(key, return_inverse=True)[1]
+
+
+def conflict_free() -> np.ndarray:
+    """M[h, v] = 1.0 om h och v inte delar något kort"""
+    b = CARD_BLOCKS.astype(np.float32)
+    return (b.T @ b == 0).astype(np.float32)
+
+
+def class_table(e1326: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """169×169: kombo-viktat snitt över icke-krockande par"""
+    c = np.zeros((N_COMBOS, len(HAND_CLASSES)), dtype=np.float64)
+    c[np.arange(N_COMBOS), COMBO_CLASS] = 1.0
+    num = c.T @ (e1326 * mask) @ c
+    den = c.T @ mask @ c
+    return np.divide(num, den, out=np.full_like(num, np.nan), where=den > 0).astype(np.float32)
+
+
+def build_equity(boards: int = BOARDS, workers: int | None = None,
+                 seed: int = 0, out_dir: Path = ROOT_DIR) -> tuple[Path, Path]:
+    """Kör simuleringen parallellt och skriv equity_1326.npy + equity_169.npy"""
+    n_chunks = max(1, min(boards // BOARD_BATCH, 4 * (workers or 8)))
+    sizes = [boards // n_chunks + (i < boards % n_chunks) for i in range(n_chunks)]
+    seeds = np.random.SeedSequence(seed).generate_state(n_chunks)
+
+    w2 = np.zeros(N_COMBOS * N_COMBOS, dtype=np.uint64)
+    cnt = np.zeros(N_COMBOS * N_COMBOS, dtype=np.uint64)
+    t0 = time.perf_counter()
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for (w, c), n in zip(pool.map(_simulate, seeds.tolist(), sizes), sizes):
+            w2 += w.ravel()
+            cnt += c.ravel()
+            done += n
+            rate = done / (time.perf_counter() - t0)
+            print(f"\r  {done}/{boards} bord ({rate:.0f}/s)", end="", flush=True)
+    print()
+
+    orbit = _suit_orbits()
+    num = np.bincount(orbit, weights=w2)
+    den = np.bincount(orbit, weights=cnt)
+    eq = np.divide(num, 2 * den, out=np.zeros_like(num), where=den > 0)
+    mask = conflict_free()
+    e1326 = (eq[orbit].reshape(N_COMBOS, N_COMBOS) * mask).astype(np.float32)
+    e169 = class_table(e1326, mask)
+
+    out_dir = Path(out_dir)
+    p1326, p169 = out_dir / E1326_PATH.name, out_dir / E169_PATH.name
+    np.save(p1326, e1326)
+    np.save(p169, e169)
+    return p1326, p169
+
+
+# ------------------------------------------------------------
+#  API
+# ------------------------------------------------------------
+def _vec(x) -> np.ndarray:
+    """Range / vikt-vektor / handkod → (1326,) float32"""
+    if isinstance(x, str):
+        x = Range.from_hands(x)
+    if isinstance(x, Range):
+        x = x.w
+    return np.asarray(x, dtype=np.float32)
+
+
+class EquityTable:
+    """Read-only equity-tabeller (mmap) + krock-mask."""
+
+    def __init__(self, e1326_path: Path = E1326_PATH, e169_path: Path = E169_PATH):
+        self.e1326 = np.load(e1326_path, mmap_mode="r")
+        self.e169  = np.load(e169_path, mmap_mode="r")
+        self.mask  = conflict_free()
+
+    def range_equity(self, hero, villain) -> float | None:
+        """Hjältens equity mot skurkens range: (h·E·v) / (h·M·v)"""
+        h, v = _vec(hero), _vec(villain)
+        den = float(h @ self.mask @ v)
+        return float(h @ self.e1326 @ v) / den if den > 0 else None
+
+    def combo_equity(self, villain) -> np.ndarray:
+        """(1326,) equity för varje kombo mot rangen (nan om helt blockerad)"""
+        v = _vec(villain)
+        den = self.mask @ v
+        return np.divide(self.e1326 @ v, den,
+                         out=np.full(N_COMBOS, np.nan, dtype=np.float32),
+                         where=den > 0)
+
+    def class_equity(self, a: str, b: str) -> float | None:
+        """Handklass mot handklass ur 169-tabellen ('AKs', 'QQ')"""
+        ca, cb = class_name(a), class_name(b)
+        if ca is None or cb is None:
+            return None
+        e = float(self.e169[CLASS_INDEX[ca], CLASS_INDEX[cb]])
+        return None if np.isnan(e) else e
+
+    def node_equity(self, reach, node_id: int, hero: str, villain: str,
+                    hand: str | None = None) -> float | None:
+        """
+        Equity i en nod ur reach.py: hjältens reach-range (eller en given
+        hand) mot skurkens reach-range. None om någon av dem foldat.
+        """
+        v = reach.weights(node_id, villain)
+        h = hand if hand is not None else reach.weights(node_id, hero)
+        if v is None or h is None:
+            return None
+        return self.range_equity(h, v)
+
+
+def load_equity(root: Path = ROOT_DIR) -> EquityTable | None:
+    """EquityTable om tabellerna är byggda, annars None."""
+    p1326, p169 = Path(root) / E1326_PATH.name, Path(root) / E169_PATH.name
+    return EquityTable(p1326, p169) if p1326.exists() and p169.exists() else None
+
+
+# ------------------------------------------------------------
+#  MAIN
+# ------------------------------------------------------------
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Preflop-equity: bygg tabellen eller fråga den")
+    ap.add_argument("--build", action="store_true", help="kör Monte Carlo-bygget")
+    ap.add_argument("--boards", type=int, default=BOARDS)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("hands", nargs="*", help="hjälte och skurk, t.ex. AKs QQ")
+    args = ap.parse_args()
+
+    if args.build:
+        t0 = time.perf_counter()
+        paths = build_equity(args.boards, args.workers, args.seed)
+        print(f"✓ {', '.join(map(str, paths))} på {time.perf_counter() - t0:.1f} s")
+        sys.exit(0)
+
+    table = load_equity()
+    if table is None:
+        sys.exit("Equity tables missing – run: python equity.py --build")
+    hero, villain = (args.hands + ["AKs", "QQ"][len(args.hands):])[:2]
+    t0 = time.perf_counter()
+    eq = table.range_equity(hero, villain)
+    dt = (time.perf_counter() - t0) * 1e3
+    if eq is None:
+        sys.exit(f"No non-conflicting combos for {hero} vs {villain}")
+    print(f"{hero} vs {villain}: {eq * 100:.1f} %  ({dt:.2f} ms)")
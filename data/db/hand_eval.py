@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+"""
+hand_eval.py – tabellbaserad utvärdering av 5- och 7-korts händer
+
+• Händer utan flush beror bara på rankerna: en tabell per antal kort
+  (5, 6, 7) indexerad med rank-multimängdens kombinatoriska index, och för
+  7 kort en tabell på summan av additiva rank-nycklar (ingen sortering)
+• Flush: en tabell över flush-färgens 13-bitars rankmask (högst en färg
+  kan ha fem kort av sju); färgräknarna packas i samma nyckelsumma
+• Allt i batch: (n, 5) / (n, 6) / (n, 7) kort-index in → (n,) rank ut,
+  ett par gathers och summor per hand
+• Rank 0 … 7461, större = bättre (7462 olika femkortshänder);
+  category() ger handtypen (0 = high card … 8 = straight flush)
+
+Tabellerna (≈16 MB) byggs vid import på under en sekund ur en
+bitmask-utvärdering av alla femkortshänder. Kort-index enligt combos.py
+(2c = 0 … As = 51).
+
+    from hand_eval import rank7, parse_cards
+    rank7(np.array([parse_cards("AhKh QhJhTh 2c3d")]))
+    python bench_hand_eval.py
+"""
+
+from __future__ import annotations
+
+import sys
+from functools import lru_cache
+from itertools import combinations, combinations_with_replacement
+from math import comb
+
+import numpy as np
+
+from combos import card_index
+
+# ------------------------------------------------------------
+#  KONFIGURATION
+# ------------------------------------------------------------
+N_CLASSES = 7462
+
+CATEGORY_NAMES = (
+    "high card", "pair", "two pair", "three of a kind", "straight",
+    "flush", "full house", "four of a kind", "straight flush",
+)
+# lägsta rank i varje kategori (antal distinkta händer: 1277, 2860, 858,
+# 858, 10, 1277, 156, 156, 10)
+CATEGORY_START = np.cumsum([0, 1277, 2860, 858, 858, 10, 1277, 156, 156])
+
+# BINOM[n, k] = C(n, k) för kombinatoriska index
+BINOM = np.array([[comb(n, k) for k in range(8)] for n in range(19)], dtype=np.int32)
+
+# additiva rank-nycklar: varje 7-korts rank-multimängd får en unik summa
+# (kontrolleras i build_tables) → 7 kort kräver ingen sortering
+RANK_KEYS = np.array([0, 1, 5, 22, 98, 453, 2031, 8698, 22854, 83661,
+                      262349, 636345, 1479181], dtype=np.int64)
+
+# positionerna för varje femkortsdelmängd av k kort
+_SUBSETS = {k: np.array(list(combinations(range(k), 5)), dtype=np.intp)
+            for k in (5, 6, 7)}
+
+
+# ------------------------------------------------------------
+#  TABELLBYGGE (bitmask-utvärdering, körs en gång vid import)
+#   värde = kategori << 20 | fem rank-nibblar, högst först
+# ------------------------------------------------------------
+@lru_cache(maxsize=1)
+def _top_table() -> np.ndarray:
+    """top[mask, k] = de k högsta rankerna i mask packade som nibblar"""
+    top = np.zeros((1 << 13, 6), dtype=np.int32)
+    for m in range(1 << 13):
+        ranks = [r for r in range(12, -1, -1) if m >> r & 1][:5]
+        for k in range(1, 6):
+            top[m, k] = sum(r << (4 * (4 - i)) for i, r in enumerate(ranks[:k]))
+    return top
+
+
+def _straight_table(masks: np.ndarray) -> np.ndarray:
+    """straight[mask] = högsta kortet i stegen (3 = femhöjd), -1 om ingen"""
+    out = np.full(1 << 13, -1, dtype=np.int32)
+    runs = [(0b11111 << lo, lo + 4) for lo in range(9)] + [(0b1000000001111, 3)]
+    for bits, high in sorted(runs, key=lambda t: t[1]):
+        out[(masks & bits) == bits] = high
+    return out
+
+
+def _bitmask_values(cards: np.ndarray) -> np.ndarray:
+    """(n, 5) kort-index → (n,) ordnat (men glest) handvärde"""
+    masks = np.arange(1 << 13)
+    top = _top_table()
+    straight = _straight_table(masks)
+    high = np.where(masks > 0, np.log2(np.maximum(masks, 1)).astype(np.int32), -1)
+    pow2 = 1 << np.arange(13)
+
+    ranks, suits = cards // 4, cards % 4
+    cnt = (ranks[..., None] == np.arange(13)).sum(axis=1)         # (n, 13)
+    any_m  = ((cnt >= 1) * pow2).sum(axis=1)
+    pair_m = ((cnt >= 2) * pow2).sum(axis=1)
+    trip_m = ((cnt >= 3) * pow2).sum(axis=1)
+    quad_m = ((cnt == 4) * pow2).sum(axis=1)
+    is_fl  = (suits == suits[:, :1]).all(axis=1)
+
+    val = np.zeros(len(cards), dtype=np.int32)
+
+    def put(mask, cat, body):
+        nonlocal val
+        val = np.where(mask & (val == 0), (cat << 20) | body, val)
+
+    st = straight[any_m]
+    put(is_fl & (st >= 0), 8, st << 16)
+    q = high[quad_m]
+    put(q >= 0, 7, (q << 16) | (top[any_m & ~(1 << np.maximum(q, 0)), 1] >> 4))
+    t = high[trip_m]
+    p_fh = high[pair_m & ~(1 << np.maximum(t, 0))]
+    put((t >= 0) & (p_fh >= 0), 6, (t << 16) | (p_fh << 12))
+    put(is_fl, 5, top[any_m, 5])
+    put(st >= 0, 4, st << 16)
+    put(t >= 0, 3, (t << 16) | (top[any_m & ~(1 << np.maximum(t, 0)), 2] >> 4))
+    two = top[pair_m, 2]
+    p1, p2 = two >> 16 & 15, two >> 12 & 15
+    two_pair = (pair_m & (pair_m - 1)) != 0                        # ≥ 2 bitar
+    put(two_pair, 2, two | (top[any_m & ~(1 << p1) & ~(1 << p2), 1] >> 8))
+    p = high[pair_m]
+    put(p >= 0, 1, (p << 16) | (top[any_m & ~(1 << np.maximum(p, 0)), 3] >> 4))
+    put(val == 0, 0, top[any_m, 5])
+    return val
+
+
+def _multisets(k: int) -> np.ndarray:
+    """Alla sorterade k-tupler av ranker med högst fyra av varje"""
+    ms = np.array(list(combinations_with_replacement(range(13), k)), dtype=np.int32)
+    ok = (ms[:, :, None] == np.arange(13)).sum(axis=1).max(axis=1) <= 4
+    return ms[ok]
+
+
+def _rank_index(sorted_ranks: np.ndarray) -> np.ndarray:
+    """Sorterade ranker r0 ≤ … ≤ rk-1 → Σ C(r_i + i, i + 1)"""
+    k = sorted_ranks.shape[1]
+    return BINOM[sorted_ranks + np.arange(k), np.arange(1, k + 1)].sum(axis=1)
+
+
+def build_tables() -> tuple[dict[int, np.ndarray], np.ndarray, np.ndarray]:
+    """
+    (rank-tabeller per antal kort, 7-kortstabell på rank-nyckel,
+    flush-tabell), alla med täta ranker. Rank-tabellerna gäller händer utan
+    flush och indexeras med _rank_index resp. Σ RANK_KEYS; flush-tabellen
+    med bitmasken av flush-färgens ranker.
+    """
+    # femkortsvärden: alla rank-mängder utan flush + alla flush-mängder
+    five = _multisets(5)
+    no_flush = _bitmask_values(five * 4 + np.arange(5) % 4)
+    fl_masks = np.array([m for m in range(1 << 13) if bin(m).count("1") == 5])
+    fl_cards = np.array([[r * 4 for r in range(13) if m >> r & 1] for m in fl_masks])
+    flush = _bitmask_values(fl_cards)
+    uniq, dense = np.unique(np.concatenate([no_flush, flush]), return_inverse=True)
+    if len(uniq) != N_CLASSES:
+        raise RuntimeError(f"Fel antal handklasser: {len(uniq)}")
+    dense = dense.astype(np.int16)
+
+    ranks = {5: np.full(comb(17, 5), -1, dtype=np.int16)}
+    ranks[5][_rank_index(five)] = dense[: len(five)]
+    for k in (6, 7):
+        ms = _multisets(k)
+        best = ranks[5][_rank_index(ms[:, _SUBSETS[k]].reshape(-1, 5))]
+        ranks[k] = np.full(comb(12 + k, k), -1, dtype=np.int16)
+        ranks[k][_rank_index(ms)] = best.reshape(len(ms), -1).max(axis=1)
+
+    ms7 = _multisets(7)
+    keys = RANK_KEYS[ms7].sum(axis=1)
+    if len(np.unique(keys)) != len(ms7):
+        raise RuntimeError("RANK_KEYS ger inte unika 7-kortsnycklar")
+    by_key = np.full(keys.max() + 1, -1, dtype=np.int16)
+    by_key[keys] = ranks[7][_rank_index(ms7)]
+
+    flush_lut = np.full(1 << 13, -1, dtype=np.int16)
+    flush_lut[fl_masks] = dense[len(five):]
+    for m in range(1 << 13):
+        if 6 <= bin(m).count("1") <= 7:
+            bits = [1 << r for r in range(13) if m >> r & 1]
+            flush_lut[m] = max(flush_lut[sum(sub)] for sub in combinations(bits, 5))
+    return ranks, by_key, flush_lut
+
+
+# ------------------------------------------------------------
+#  BATCH-API
+# ------------------------------------------------------------
+_RANKS, _RANK7, _FLUSH = build_tables()
+
+# per kort: rank-nyckel << 16 | en 4-bitars räknare per färg
+_CARD_KEY = (RANK_KEYS[np.arange(52) // 4] << 16) | (1 << (4 * (np.arange(52) % 4)))
+
+# färgräknare (4 × 4 bitar) → färgen med minst fem kort, annars -1
+_SUIT_COUNTS = (np.arange(1 << 16)[:, None] >> (4 * np.arange(4))) & 15
+_FLUSH_SUIT = np.where(_SUIT_COUNTS.max(axis=1) >= 5,
+                       _SUIT_COUNTS.argmax(axis=1), -1).astype(np.int8)
+
+
+def rank_best(cards: np.ndarray) -> np.ndarray:
+    """(n, k) kort-index, 5 ≤ k ≤ 7 (valfri ordning, inga dubbletter) → (n,) rank"""
+    c = np.asarray(cards, dtype=np.int32)
+    k = c.shape[1]
+    key = _CARD_KEY[c].sum(axis=1)
+    if k == 7:
+        val = _RANK7[key >> 16]
+    else:
+        val = _RANKS[k][_rank_index(np.sort(c >> 2, axis=1))]
+
+    fsuit = _FLUSH_SUIT[key & 0xFFFF]
+    rows = np.flatnonzero(fsuit >= 0)                           # högst en flush-färg
+    if rows.size:
+        fc = c[rows]
+        bits = np.bitwise_or.reduce(
+            np.where((fc & 3) == fsuit[rows, None], 1 << (fc >> 2), 0), axis=1)
+        val[rows] = _FLUSH[bits]
+    return val
+
+
+def rank5(cards: np.ndarray) -> np.ndarray:
+    """(n, 5) kort-index → (n,) rank"""
+    return rank_best(cards)
+
+
+def rank7(cards: np.ndarray) -> np.ndarray:
+    """(n, 7) kort-index → (n,) rank (större = bättre)"""
+    return rank_best(cards)
+
+
+def category(ranks: np.ndarray | int) -> np.ndarray | int:
+    """rank → handtyp 0 … 8 (index i CATEGORY_NAMES)"""
+    return np.searchsorted(CATEGORY_START, ranks, side="right") - 1
+
+
+# ------------------------------------------------------------
+#  HJÄLPARE FÖR ENSKILDA HÄNDER
+# ------------------------------------------------------------
+def parse_cards(text: str) -> list[int]:
+    """'AhKh Qs-Td,2c' / 'AhKhQsTd2c' → kort-index; ValueError vid okänt kort"""
+    s = "".join(ch for ch in text if ch.isalnum()).replace("10", "T")
+    if len(s) % 2:
+        raise ValueError(f"Ogiltig kortsträng: {text!r}")
+    try:
+        cards = [card_index(s[i : i + 2]) for i in range(0, len(s), 2)]
+    except KeyError as exc:
+        raise ValueError(f"Okänt kort i {text!r}") from exc
+    if len(set(cards)) != len(cards):
+        raise ValueError(f"Dubbla kort i {text!r}")
+    return cards
+
+
+def hand_rank(hole: str, board: str = "") -> int:
+    """En hand: 'AhKh', 'QhJhTh2c3d' → rank"""
+    cards = parse_cards(hole + board)
+    if not 5 <= len(cards) <= 7:
+        raise ValueError("Behöver 5–7 kort totalt")
+    return int(rank_best(np.array([cards]))[0])
+
+
+def describe(rank: int) -> str:
+    """rank → 'flush' osv."""
+    return CATEGORY_NAMES[int(category(rank))]
+
+
+if __name__ == "__main__":
+    hole  = sys.argv[1] if len(sys.argv) > 1 else "AhKh"
+    board = sys.argv[2] if len(sys.argv) > 2 else "QhJhTh2c3d"
+    r = hand_rank(hole, board)
+    print(f"{hole} on {board}: rank {r} ({describe(r)})")
@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+"""
+hand_range.py – range-aritmetik över täta kombo-vektorer
+
+En Range är en vikt-vektor med 1326 float (kombo-index enligt combos.py).
+Allt är NumPy-operationer på hela vektorn:
+
+• normalize, union (max), snitt (min), viktad blend, skalning
+• snitt med en action i en nod  (vikt × nodens frekvens för actionen)
+• blocker-borttagning för kända hålkort/bordkort
+• konvertering till/från 13×13-griden (169 handklasser)
+
+Exempel – UTG:s öppningsrange och händerna HJ 3-bettar mot den:
+
+    pack = RangePack()
+    utg  = Range.from_node(pack.node("UTG", "PF:"), "r25")
+    hj   = Range.from_node(pack.node("HJ", "PF:R2.5"), "r85")
+    print(utg.combos(), hj.to_grid())
+"""
+
+from __future__ import annotations
+
+import sys
+from typing import Iterable
+
+import numpy as np
+
+from combos import (CARD_BLOCKS, CLASS_SIZE, COMBO_CLASS, COMBOS,
+                    HAND_CLASSES, N_COMBOS, card_index, hand_indices)
+
+
+class Range:
+    __slots__ = ("w",)
+
+    def __init__(self, weights: np.ndarray | None = None):
+        if weights is None:
+            weights = np.zeros(N_COMBOS)
+        w = np.asarray(weights, dtype=np.float64)
+        if w.shape != (N_COMBOS,):
+            raise ValueError(f"Range kräver {N_COMBOS} vikter, fick {w.shape}")
+        self.w = w
+
+    # --- konstruktorer --------------------------------------------------
+    @classmethod
+    def full(cls) -> Range:
+        return cls(np.ones(N_COMBOS))
+
+    @classmethod
+    def from_hands(cls, hands: str | Iterable[str]) -> Range:
+        """
+        'AKs, QQ, 76s:0.5, AhKx' → range (vikt 1 om inget ':vikt' anges).
+        Koder enligt combos.hand_indices; okända koder ignoreras.
+        """
+        if isinstance(hands, str):
+            hands = hands.replace(";", ",").split(",")
+        w = np.zeros(N_COMBOS)
+        for item in hands:
+            item = item.strip()
+            if not item:
+                continue
+            code, _, weight = item.partition(":")
+            w[hand_indices(code)] = float(weight) if weight else 1.0
+        return cls(w)
+
+    @classmethod
+    def from_node(cls, node, action: str | None = None) -> Range:
+        """
+        Range ur en nod i range pack (PackNode). action=None → alla kombos
+        som har data i noden; annars frekvensen för actionen per kombo.
+        """
+        if action is None:
+            return cls((node.matrix.sum(axis=1) > 0).astype(np.float64))
+        return cls(node.matrix[:, node.actions.index(action)])
+
+    @classmethod
+    def from_grid(cls, grid: np.ndarray) -> Range:
+        """13×13-grid (rad/kol A…2, suited ovanför diagonalen) → range"""
+        g = np.asarray(grid, dtype=np.float64).reshape(len(HAND_CLASSES))
+        return cls(g[COMBO_CLASS])
+
+    # --- aritmetik ------------------------------------------------------
+    def normalize(self) -> Range:
+        """Vikterna summerar till 1 (tom range förblir tom)"""
+        total = self.w.sum()
+        return Range(self.w / total if total > 0 else self.w.copy())
+
+    def __or__(self, other: Range) -> Range:          # union
+        return Range(np.maximum(self.w, other.w))
+
+    def __and__(self, other: Range) -> Range:         # snitt
+        return Range(np.minimum(self.w, other.w))
+
+    def __add__(self, other: Range) -> Range:
+        return Range(self.w + other.w)
+
+    def __mul__(self, k: float | np.ndarray) -> Range:
+        return Range(self.w * k)
+
+    __rmul__ = __mul__
+
+    def blend(self, other: Range, weight: float = 0.5) -> Range:
+        """(1 - weight) · self + weight · other"""
+        return Range((1.0 - weight) * self.w + weight * other.w)
+
+    def with_action(self, node, action: str) -> Range:
+        """Snitt med en action: vikt × hur ofta kombon tar actionen i noden"""
+        return Range(self.w * node.matrix[:, node.actions.index(action)])
+
+    def remove_blockers(self, cards: Iterable[str | int]) -> Range:
+        """Nollställ alla kombos som innehåller något av korten ('As', 'Kd' …)"""
+        idx = [c if isinstance(c, (int, np.integer)) else card_index(c) for c in cards]
+        if not idx:
+            return Range(self.w.copy())
+        return Range(np.where(CARD_BLOCKS[idx].any(axis=0), 0.0, self.w))
+
+    # --- avläsning ------------------------------------------------------
+    def combos(self) -> float:
+        """Kombo-viktat antal (t.ex. 198.0 för en 15 %-range)"""
+        return float(self.w.sum())
+
+    def share(self) -> float:
+        """Andel av alla 1326 kombos"""
+        return self.combos() / N_COMBOS
+
+    def class_weights(self) -> np.ndarray:
+        """(169,) medelvikt per handklass"""
+        return np.bincount(COMBO_CLASS, weights=self.w,
+                           minlength=len(HAND_CLASSES)) / CLASS_SIZE
+
+    def to_grid(self) -> np.ndarray:
+        """13×13-grid med medelvikt per klass (rad/kol A…2)"""
+        return self.class_weights().reshape(13, 13)
+
+    def top(self, n: int = 10) -> list[tuple[str, float]]:
+        """De n tyngsta handklasserna"""
+        cw = self.class_weights()
+        order = np.argsort(-cw, kind="stable")[:n]
+        return [(HAND_CLASSES[k], float(cw[k])) for k in order if cw[k] > 0]
+
+    def weight(self, hand: str) -> float:
+        """Medelvikt för en handkod ('AKs', '6d5s' …)"""
+        idx = hand_indices(hand)
+        return float(self.w[idx].mean()) if idx.size else 0.0
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.w))
+
+    def __iter__(self):
+        nz = np.flatnonzero(self.w)
+        return ((COMBOS[i], float(self.w[i])) for i in nz)
+
+    def __repr__(self) -> str:
+        return f"<Range {self.combos():.1f} combos ({self.share() * 100:.1f} %)>"
+
+
+def format_grid(grid: np.ndarray) -> str:
+    """13×13-grid som text (procent per klass)"""
+    lines = []
+    for i in range(13):
+        cells = [f"{HAND_CLASSES[i * 13 + j]:>4}{grid[i, j] * 100:4.0f}"
+                 for j in range(13)]
+        lines.append(" ".join(cells))
+    return "\n".join(lines)
+
+
+# ------------------------------------------------------------
+#  MAIN – visa en nods range, t.ex.  python hand_range.py UTG PF: r25
+# ------------------------------------------------------------
+if __name__ == "__main__":
+    from range_pack import RangePack
+
+    args = sys.argv[1:]
+    pos    = args[0] if len(args) > 0 else "UTG"
+    seq    = args[1] if len(args) > 1 else "PF:"
+    action = args[2] if len(args) > 2 else "r25"
+    pack = RangePack()
+    node = pack.node(pos, seq)
+    if node is None:
+        sys.exit(f"No node for {pos} {seq}")
+    r = Range.from_node(node, action)
+    print(f"{pos} {seq} {action}: {r!r}\n")
+    print(format_grid(r.to_grid()))
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""
+queries.py – all SQL som chat6.py, viz2.py och range_pack.py kör mot
+poker_ranges.db, samlad på ett ställe så att check_query_plans.py kan köra
+EXPLAIN QUERY PLAN på exakt samma frågor.
+
+Lägg till nya frågor här (och i QUERIES) i stället för inline i skripten.
+"""
+
+# --- chat6.py ------------------------------------------------------------
+CANON_POS = """
+    SELECT canonical
+    FROM position_alias
+    WHERE REPLACE(UPPER(alias),' ','') = REPLACE(UPPER(?),' ','')
+"""
+
+# tree_index.ActionTrie.from_db – läses en gång vid start
+NODES_ALL = "SELECT id, position, action_sequence, folder_name FROM nodes"
+NODE_ACTIONS_ALL = "SELECT node_id, action, share FROM node_actions"
+
+# {qs} ersätts med rätt antal '?'
+RANGES_FOR_COMBOS = """
+    SELECT action, combo, frequency
+    FROM ranges
+    WHERE node_id = ? AND combo IN ({qs})
+"""
+
+CLASS_STRATEGY = (
+    "SELECT action, frequency FROM class_strategy "
+    "WHERE node_id = ? AND hand_class = ? ORDER BY frequency DESC"
+)
+
+# --- viz2.py -------------------------------------------------------------
+POSITIONS = """
+    SELECT position, COUNT(*) AS n
+    FROM nodes
+    GROUP BY position
+    ORDER BY n DESC
+"""
+
+NODES_FOR_POSITION = """
+    SELECT id, action_sequence AS seq, folder_name
+    FROM nodes
+    WHERE position = ?
+    ORDER BY seq
+"""
+
+NODE_ACTIONS = """
+    SELECT action, combos AS freq, share
+    FROM node_actions
+    WHERE node_id = ?
+    ORDER BY freq DESC
+"""
+
+NODE_ACTIONS_FROM_RANGES = """
+    SELECT action, SUM(frequency) AS freq
+    FROM ranges
+    WHERE node_id = ?
+    GROUP BY action
+    ORDER BY freq DESC
+"""
+
+NODE_STATS = "SELECT combos, vpip, pfr FROM node_stats WHERE node_id = ?"
+
+TOP_COMBOS = (
+    "SELECT combo, frequency "
+    "FROM ranges WHERE node_id = ? AND action = ? "
+    "ORDER BY frequency DESC"
+)
+
+# --- range_pack.py -------------------------------------------------------
+NODE_RANGES = "SELECT action, combo, frequency FROM ranges WHERE node_id = ?"
+
+# namn → (sql, hel-tabell-läsning tillåten)
+#   True bara för frågor som per definition läser hela tabellen (trädet vid
+#   start, GROUP BY över alla noder) – de får skanna.
+QUERIES: dict[str, tuple[str, bool]] = {
+    "canon_pos":                (CANON_POS, False),
+    "nodes_all":                (NODES_ALL, True),
+    "node_actions_all":         (NODE_ACTIONS_ALL, True),
+    "ranges_for_combos":        (RANGES_FOR_COMBOS.format(qs="?,?,?,?"), False),
+    "class_strategy":           (CLASS_STRATEGY, False),
+    "positions":                (POSITIONS, True),
+    "nodes_for_position":       (NODES_FOR_POSITION, False),
+    "node_actions":             (NODE_ACTIONS, False),
+    "node_actions_from_ranges": (NODE_ACTIONS_FROM_RANGES, False),
+    "node_stats":               (NODE_STATS, False),
+    "top_combos":               (TOP_COMBOS, False),
+    "top_combos_limit":         (TOP_COMBOS + " LIMIT 20", False),
+    "node_ranges":              (NODE_RANGES, False),
+}
@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+"""
+range_pack.py – kompilerad, mmap-bar "range pack" av poker_ranges.db
+
+• En tät float32-matris per nod:  1326 kombos × antal actions
+• Header (JSON) som indexerar noderna på (position, action_sequence)
+• Filen mappas med mmap → laddning på millisekunder, uppslag = array-slice,
+  och flera processer (chat, server) delar samma sidor i page cache
+
+Filformat
+---------
+    MAGIC (8 byte) | header-längd (uint32 LE) | header JSON | padding | data
+
+Varje nods block ligger 64-byte-justerat på `offset` (räknat från filstart)
+och har formen (N_COMBOS, len(actions)) i C-ordning, så att
+`matrix[combo_idx]` ger frekvensen för varje action (kombo-index enligt
+combos.py).
+
+Bygg:
+    python range_pack.py [poker_ranges.db] [poker_ranges.pack]
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+import queries
+from combos import N_COMBOS, combo_index
+
+# ------------------------------------------------------------
+#  KONFIGURATION
+# ------------------------------------------------------------
+ROOT_DIR  = Path(__file__).resolve().parent
+DB_PATH   = ROOT_DIR / "poker_ranges.db"
+PACK_PATH = ROOT_DIR / "poker_ranges.pack"
+
+MAGIC    = b"RNGPACK1"
+ALIGN    = 64
+DTYPE    = np.float32
+VERSION  = 1
+
+# ------------------------------------------------------------
+#  BYGGE
+# ------------------------------------------------------------
+def _pad(n: int) -> int:
+    return (-n) % ALIGN
+
+
+def node_matrix(conn: sqlite3.Connection,
+                node_id: int) -> tuple[list[str], np.ndarray]:
+    """(sorterade actions, (N_COMBOS, len(actions))-matris) för en nod ur ranges"""
+    rows = conn.execute(queries.NODE_RANGES, (node_id,)).fetchall()
+    actions = sorted({a for a, _, _ in rows})
+    col = {a: j for j, a in enumerate(actions)}
+    mat = np.zeros((N_COMBOS, len(actions)), dtype=DTYPE)
+    for action, combo, freq in rows:
+        mat[combo_index(combo), col[action]] = freq
+    return actions, mat
+
+
+def write_blocks(out_path: Path, magic: bytes, header: dict,
+                 arrays: list[np.ndarray]) -> None:
+    """
+    Skriv MAGIC | header | 64-justerade block. header["nodes"][i]["offset"]
+    sätts till var arrays[i] hamnar. Används även av reach.py.
+    """
+    out_path = Path(out_path)
+    entries = header["nodes"]
+    # header-offsets beror på headerns längd → iterera tills de står still
+    while True:
+        raw = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        pos = len(magic) + 4 + len(raw)
+        pos += _pad(pos)
+        moved = False
+        for e, arr in zip(entries, arrays):
+            moved |= e.get("offset") != pos
+            e["offset"] = pos
+            pos += arr.nbytes
+            pos += _pad(pos)
+        if not moved:
+            break
+
+    tmp = out_path.with_suffix(out_path.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(magic)
+        f.write(struct.pack("<I", len(raw)))
+        f.write(raw)
+        for e, arr in zip(entries, arrays):
+            f.write(b"\0" * (e["offset"] - f.tell()))
+            f.write(np.ascontiguousarray(arr, dtype=DTYPE).tobytes())
+    os.replace(tmp, out_path)          # atomiskt: läsare behåller sin gamla mappning
+
+
+def map_blocks(path: Path, magic: bytes) -> tuple[mmap.mmap, dict]:
+    """mmap:a en fil skriven av write_blocks → (mappning, header)"""
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mm[: len(magic)] != magic:
+        mm.close()
+        raise ValueError(f"Fel filtyp (magic {magic!r}): {path}")
+    (hlen,) = struct.unpack_from("<I", mm, len(magic))
+    start = len(magic) + 4
+    header = json.loads(mm[start : start + hlen].decode("utf-8"))
+    if header.get("n_combos") != N_COMBOS:
+        mm.close()
+        raise ValueError(f"Fel antal kombos: {path}")
+    return mm, header
+
+
+def build_pack(conn: sqlite3.Connection, out_path: Path = PACK_PATH,
+               reuse: set[int] | None = None) -> int:
+    """
+    Läs nodes + ranges och skriv en range pack. Returnerar antal noder.
+
+    reuse = mängd ändrade node_id → övriga noders block kopieras från den
+    befintliga filen i stället för att läsas om ur ranges (inkrementell sync).
+    """
+    out_path = Path(out_path)
+    nodes = conn.execute(
+        "SELECT id, position, action_sequence, folder_name FROM nodes ORDER BY id"
+    ).fetchall()
+
+    old = load_pack(out_path) if reuse is not None else None
+    blocks: dict[int, tuple[list[str], np.ndarray]] = {}
+    for node_id, *_ in nodes:
+        prev = old.by_id(node_id) if old is not None else None
+        if prev is not None and node_id not in reuse:
+            blocks[node_id] = (list(prev.actions), np.array(prev.matrix))
+        else:
+            blocks[node_id] = node_matrix(conn, node_id)
+    prev = None
+    if old is not None:
+        old.close()
+
+    entries = [
+        {
+            "id": node_id,
+            "position": pos,
+            "sequence": seq,
+            "folder": folder,
+            "actions": blocks[node_id][0],
+            "offset": 0,
+        }
+        for node_id, pos, seq, folder in nodes
+    ]
+    write_blocks(out_path, MAGIC,
+                 {"version": VERSION, "n_combos": N_COMBOS, "nodes": entries},
+                 [blocks[e["id"]][1] for e in entries])
+    return len(entries)
+
+
+# ------------------------------------------------------------
+#  LÄSARE
+# ------------------------------------------------------------
+class PackNode(NamedTuple):
+    id: int
+    position: str
+    sequence: str
+    folder: str
+    actions: tuple[str, ...]
+    matrix: np.ndarray            # (N_COMBOS, len(actions)), read-only vy
+
+
+class RangePack:
+    """Read-only vy över en range pack-fil (mmap)."""
+
+    def __init__(self, path: Path = PACK_PATH):
+        self.path = Path(path)
+        self._mm, header = map_blocks(self.path, MAGIC)
+
+        self._nodes: dict[int, PackNode] = {}
+        self._by_key: dict[tuple[str, str], PackNode] = {}
+        for e in header["nodes"]:
+            actions = tuple(e["actions"])
+            mat = np.frombuffer(
+                self._mm, dtype=DTYPE,
+                count=N_COMBOS * len(actions), offset=e["offset"],
+            ).reshape(N_COMBOS, len(actions))
+            node = PackNode(e["id"], e["position"], e["sequence"],
+                            e["folder"], actions, mat)
+            self._nodes[node.id] = node
+            self._by_key[(node.position, node.sequence)] = node
+
+    # --- uppslag --------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __iter__(self):
+        return iter(self._nodes.values())
+
+    def by_id(self, node_id: int) -> PackNode | None:
+        return self._nodes.get(node_id)
+
+    def node(self, position: str, sequence: str) -> PackNode | None:
+        """
+        Exakt uppslag på (position, action_sequence). Generiska/okända
+        raise-storlekar löses först upp via tree_index.ActionTrie.
+        """
+        return self._by_key.get((position, sequence))
+
+    def frequencies(self, node: PackNode, idx: np.ndarray) -> np.ndarray:
+        """(len(idx), len(actions))-array för de givna kombo-indexen"""
+        return node.matrix[idx]
+
+    def close(self) -> None:
+        self._nodes.clear()
+        self._by_key.clear()
+        try:
+            self._mm.close()
+        except BufferError:
+            pass        # vyer lever kvar hos anroparen → mappningen släpps vid GC
+
+
+def load_pack(path: Path = PACK_PATH) -> RangePack | None:
+    """RangePack om filen finns, annars None (anroparen faller tillbaka på SQL)."""
+    return RangePack(path) if Path(path).exists() else None
+
+
+# ------------------------------------------------------------
+#  MAIN
+# ------------------------------------------------------------
+if __name__ == "__main__":
+    db_path  = Path(sys.argv[1]) if len(sys.argv) > 1 else DB_PATH
+    out_path = Path(sys.argv[2]) if len(sys.argv) > 2 else PACK_PATH
+
+    t0 = time.perf_counter()
+    with sqlite3.connect(db_path) as conn:
+        n = build_pack(conn, out_path)
+    t1 = time.perf_counter()
+    pack = RangePack(out_path)
+    t2 = time.perf_counter()
+
+    first = next(iter(pack))
+    n_iter = 10_000
+    t3 = time.perf_counter()
+    for _ in range(n_iter):
+        pack.node(first.position, first.sequence).matrix[:6]
+    t4 = time.perf_counter()
+
+    print(f"✓ {n} noder → {out_path} ({out_path.stat().st_size / 1024:.0f} kB)")
+    print(f"  bygge {t1 - t0:.2f} s, laddning {(t2 - t1) * 1000:.2f} ms, "
+          f"uppslag {(t4 - t3) / n_iter * 1e6:.2f} µs")
+    pack.close()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+"""
+reach.py – förberäknade reach-vikter för hela spelträdet
+
+Varje nod i data/tree lagrar bara strategin för spelaren som agerar. Vilka
+kombos en motståndare fortfarande har i en nod får man genom att
+multiplicera frekvenserna längs vägen dit. Det görs här EN gång för hela
+trädet:
+
+• Dynamisk programmering över tree_index.ActionTrie (förälder före barn)
+• Roten: alla sex spelare har vikt 1 på alla 1326 kombos
+• Kant förälder → barn: den agerande spelarens vektor × förälderns frekvens
+  för actionen; en fold tar spelaren ur handen
+• Saknar en mellannod data behålls spelarens vektor oförändrad och noden
+  märks `partial` (vikterna är då en övre gräns)
+• Resultatet skrivs bredvid range pack:en (poker_ranges.reach) i samma
+  mmap-bara blockformat, ett (spelare, 1326)-block per nod
+
+Inkrementellt: update_reach(changed=…) räknar bara om delträd under noder
+vars strategi ändrats (create_db2.py --sync); övriga block kopieras.
+
+    python reach.py [poker_ranges.pack] [poker_ranges.reach]
+    python reach.py --show BTN PF:F-R2.5-F-R9.0-F-F
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+from combos import N_COMBOS
+from hand_range import Range
+from range_pack import DTYPE, PACK_PATH, RangePack, map_blocks, write_blocks
+from tree_index import POSITION_ORDER, ActionTrie, TrieNode, token_key
+
+# ------------------------------------------------------------
+#  KONFIGURATION
+# ------------------------------------------------------------
+ROOT_DIR   = Path(__file__).resolve().parent
+REACH_PATH = ROOT_DIR / "poker_ranges.reach"
+
+MAGIC   = b"RNGREACH"
+VERSION = 1
+
+Reach = dict[str, np.ndarray]           # position → (N_COMBOS,) vikter
+
+
+# ------------------------------------------------------------
+#  DP
+# ------------------------------------------------------------
+def _step(reach: Reach, parent: TrieNode, child: TrieNode,
+          pack: RangePack) -> tuple[Reach, bool]:
+    """Reach i `child` givet reach i `parent`. Returnerar (reach, exakt?)"""
+    actor = parent.position
+    out = dict(reach)                   # grunda kopior – bara aktören byts ut
+    if child.token == "F":
+        out.pop(actor, None)
+        return out, True
+    pnode = pack.by_id(parent.node_id) if parent.node_id is not None else None
+    key = token_key(child.token)
+    if pnode is None or key not in pnode.actions or actor not in out:
+        return out, False
+    out[actor] = out[actor] * pnode.matrix[:, pnode.actions.index(key)]
+    return out, True
+
+
+def compute_reach(pack: RangePack, trie: ActionTrie | None = None,
+                  old: ReachTable | None = None,
+                  changed: set[int] | None = None,
+                  ) -> tuple[dict[int, tuple[Reach, bool]], int]:
+    """
+    Reach för varje datanod: {node_id: (reach, partial)} + antal omräknade.
+
+    old/changed → inkrementellt: en nod räknas om om den själv eller någon
+    förfader finns i changed, eller om den saknas i old. sync_tree lägger
+    nya noder i changed, så ett gammalt block används aldrig för en ny nod.
+    """
+    trie = trie or ActionTrie.from_pack(pack)
+    root = {p: np.ones(N_COMBOS, dtype=DTYPE) for p in POSITION_ORDER}
+    out: dict[int, tuple[Reach, bool]] = {}
+    recomputed = 0
+
+    # (trie-nod, reach, partial, omräknad, delträdet inaktuellt)
+    full = changed is None or old is None
+    stack = [(trie.root, root, False, full, False)]
+    while stack:
+        n, reach, partial, fresh, stale = stack.pop()
+        if n.node_id is not None:
+            out[n.node_id] = (reach, partial)
+            recomputed += fresh
+        # mellannod utan data (t.ex. borttagen vid sync) → räkna om under den
+        stale_below = full or stale or n.node_id is None or n.node_id in changed
+        for child in n.children.values():
+            if (stale_below or child.node_id is None or child.node_id in changed
+                    or old.players(child.node_id) is None):
+                r, exact = _step(reach, n, child, pack)
+                stack.append((child, r, partial or not exact, True, stale_below))
+            else:
+                stack.append((child, old.copy_reach(child.node_id),
+                              old.partial(child.node_id), False, False))
+    return out, recomputed
+
+
+def write_reach(reach: dict[int, tuple[Reach, bool]],
+                out_path: Path = REACH_PATH) -> int:
+    entries, arrays = [], []
+    for node_id in sorted(reach):
+        r, partial = reach[node_id]
+        players = [p for p in POSITION_ORDER if p in r]
+        entries.append({"id": node_id, "players": players,
+                        "partial": partial, "offset": 0})
+        arrays.append(np.stack([r[p] for p in players]) if players
+                      else np.zeros((0, N_COMBOS), dtype=DTYPE))
+    write_blocks(out_path, MAGIC,
+                 {"version": VERSION, "n_combos": N_COMBOS, "nodes": entries},
+                 arrays)
+    return len(entries)
+
+
+def update_reach(pack_path: Path = PACK_PATH, out_path: Path = REACH_PATH,
+                 changed: set[int] | None = None) -> tuple[int, int]:
+    """
+    Bygg/uppdatera reach-filen från range pack:en. changed=None → allt räknas
+    om; annars bara delträden under de ändrade noderna (saknas filen görs
+    en full körning). Returnerar (antal noder, antal omräknade).
+    """
+    pack_path, out_path = Path(pack_path), Path(out_path)
+    pack = RangePack(pack_path)
+    old = load_reach(out_path) if changed is not None else None
+    reach, recomputed = compute_reach(pack, old=old, changed=changed)
+    if old is not None:
+        old.close()
+    n = write_reach(reach, out_path)
+    pack.close()
+    return n, recomputed
+
+
+# ------------------------------------------------------------
+#  LÄSARE
+# ------------------------------------------------------------
+class ReachNode(NamedTuple):
+    id: int
+    players: tuple[str, ...]      # spelare kvar i handen, preflop-ordning
+    partial: bool
+    weights: np.ndarray           # (len(players), N_COMBOS), read-only vy
+
+
+class ReachTable:
+    """Read-only vy över poker_ranges.reach (mmap)."""
+
+    def __init__(self, path: Path = REACH_PATH):
+        self.path = Path(path)
+        self._mm, header = map_blocks(self.path, MAGIC)
+        self._nodes: dict[int, ReachNode] = {}
+        for e in header["nodes"]:
+            players = tuple(e["players"])
+            w = np.frombuffer(
+                self._mm, dtype=DTYPE,
+                count=N_COMBOS * len(players), offset=e["offset"],
+            ).reshape(len(players), N_COMBOS)
+            self._nodes[e["id"]] = ReachNode(e["id"], players, e["partial"], w)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __iter__(self):
+        return iter(self._nodes.values())
+
+    def node(self, node_id: int) -> ReachNode | None:
+        return self._nodes.get(node_id)
+
+    def players(self, node_id: int) -> tuple[str, ...] | None:
+        n = self._nodes.get(node_id)
+        return n.players if n else None
+
+    def partial(self, node_id: int) -> bool:
+        n = self._nodes.get(node_id)
+        return bool(n and n.partial)
+
+    def weights(self, node_id: int, position: str) -> np.ndarray | None:
+        """(N_COMBOS,) reach för en spelare i noden, None om hen foldat"""
+        n = self._nodes.get(node_id)
+        if n is None or position not in n.players:
+            return None
+        return n.weights[n.players.index(position)]
+
+    def range(self, node_id: int, position: str) -> Range | None:
+        """Spelarens range när noden nås, som hand_range.Range"""
+        w = self.weights(node_id, position)
+        return Range(w) if w is not None else None
+
+    def copy_reach(self, node_id: int) -> Reach:
+        """Egna kopior (överlever att filen ersätts)"""
+        n = self._nodes[node_id]
+        return {p: np.array(n.weights[i]) for i, p in enumerate(n.players)}
+
+    def close(self) -> None:
+        self._nodes.clear()
+        try:
+            self._mm.close()
+        except BufferError:
+            pass        # vyer lever kvar hos anroparen → mappningen släpps vid GC
+
+
+def load_reach(path: Path = REACH_PATH) -> ReachTable | None:
+    """ReachTable om filen finns, annars None."""
+    return ReachTable(path) if Path(path).exists() else None
+
+
+# ------------------------------------------------------------
+#  MAIN
+# ------------------------------------------------------------
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args[:1] == ["--show"]:
+        pos = args[1] if len(args) > 1 else "BTN"
+        seq = args[2] if len(args) > 2 else "PF:F-F-F"
+        if not (PACK_PATH.exists() and REACH_PATH.exists()):
+            sys.exit("Build the pack and reach file first: python reach.py")
+        pack  = RangePack(PACK_PATH)
+        table = ReachTable(REACH_PATH)
+        hit = ActionTrie.from_pack(pack).snap(pos, seq).node
+        if hit is None:
+            sys.exit(f"No node for {pos} {seq}")
+        rn = table.node(hit.node_id)
+        note = " (partial)" if rn.partial else ""
+        print(f"{pos} {hit.sequence}{note}")
+        for p in rn.players:
+            r = table.range(hit.node_id, p)
+            top = ", ".join(f"{h} {w * 100:.0f}%" for h, w in r.top(8))
+            print(f"  {p:<4} {r.combos():7.1f} combos  {top}")
+        sys.exit(0)
+
+    pack_path = Path(args[0]) if len(args) > 0 else PACK_PATH
+    out_path  = Path(args[1]) if len(args) > 1 else REACH_PATH
+    t0 = time.perf_counter()
+    n, _ = update_reach(pack_path, out_path)
+    t1 = time.perf_counter()
+    table = ReachTable(out_path)
+    t2 = time.perf_counter()
+    print(f"✓ {n} noder → {out_path}  ({out_path.stat().st_size / 1e6:.1f} MB)")
+    print(f"  bygge {t1 - t0:.3f} s, laddning {(t2 - t1) * 1e3:.2f} ms")
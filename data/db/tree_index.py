@@ -0,0 +1,294 @@
+#!/usr/bin/env python
+"""
+tree_index.py – spelträdet i minnet som en trie över action-tokens
+
+• En trie-nod per action-historik ('PF:F-R2.5' → F → R2.5) med parent/child-
+  länkar, djup och positionen som agerar i noden
+• node_id / folder sätts på de noder som har data (nodes-tabellen)
+• Byggs en gång vid start från nodes, från en range pack eller direkt från
+  mappnamnen (decode_folder_name) och delas av alla uppslag
+• Uppslag är O(djup); en generisk 'R' utan belopp ger ALLA raise-barn
+• snap(): raise-storlekar som inte finns i trädet (R3.0 när bara R2.5
+  finns) knäpps till närmaste syskonstorlek via ett sorterat storleksindex
+  per förälder; en generisk 'R' blir den mest spelade storleken
+"""
+
+from __future__ import annotations
+
+import bisect
+import re
+import sqlite3
+from typing import Iterable, Iterator, NamedTuple
+
+import queries
+
+POSITION_ORDER = ["UTG", "HJ", "CO", "BTN", "SB", "BB"]  # 6-handed
+
+_RAISE_RE = re.compile(r"R(\d+(?:\.\d+)?)$")
+
+
+# ------------------------------------------------------------
+#  TOKENS
+# ------------------------------------------------------------
+def seq_tokens(sequence: str) -> list[str]:
+    """'PF:F-R2.5' → ['F', 'R2.5'],  'PF:' → []"""
+    body = sequence.split(":", 1)[-1]
+    return [t for t in body.split("-") if t]
+
+
+def tokens_seq(tokens: Iterable[str]) -> str:
+    return "PF:" + "-".join(tokens)
+
+
+def raise_size(token: str) -> float | None:
+    """'R2.5' → 2.5, 'R' / 'F' → None"""
+    m = _RAISE_RE.match(token)
+    return float(m.group(1)) if m else None
+
+
+def is_raise(token: str) -> bool:
+    return token.startswith("R")
+
+
+def token_key(token: str) -> str:
+    """Trädtoken → action-nyckel i all_expanded.json: 'R2.5' → 'r25', 'R' → 'rai'"""
+    if token == "R":
+        return "rai"
+    if is_raise(token):
+        return "r" + token[1:].replace(".", "")
+    return token.lower()
+
+
+def key_token(key: str) -> str:
+    """Action-nyckel → trädtoken (samma kodning som decode_folder_name)"""
+    m = re.fullmatch(r"r(\d+)", key)
+    if m:
+        digits = m.group(1)
+        return f"R{digits}" if len(digits) == 1 else f"R{digits[:-1]}.{digits[-1]}"
+    if key.startswith("r"):
+        return "R"                               # rai / all-in
+    return key.upper()
+
+
+def actors(tokens: list[str]) -> list[str]:
+    """
+    Positionen som utför varje token + den som agerar härnäst (sist i listan).
+    Följer preflop-ordningen UTG → BB och hoppar över spelare som foldat.
+    """
+    folded: set[str] = set()
+    out: list[str] = []
+    i = 0
+    for tok in tokens:
+        while POSITION_ORDER[i % 6] in folded:
+            i += 1
+        pos = POSITION_ORDER[i % 6]
+        out.append(pos)
+        if tok == "F":
+            folded.add(pos)
+        i += 1
+    while len(folded) < 6 and POSITION_ORDER[i % 6] in folded:
+        i += 1
+    out.append(POSITION_ORDER[i % 6])
+    return out
+
+
+# ------------------------------------------------------------
+#  TRIE
+# ------------------------------------------------------------
+class TrieNode:
+    __slots__ = ("token", "parent", "children", "depth",
+                 "position", "node_id", "folder", "share", "sizes")
+
+    def __init__(self, token: str, parent: TrieNode | None, position: str):
+        self.token    = token
+        self.parent   = parent
+        self.children: dict[str, TrieNode] = {}
+        self.depth    = parent.depth + 1 if parent else 0
+        self.position = position          # spelaren som agerar i noden
+        self.node_id: int | None = None    # satt om noden har data
+        self.folder:  str | None = None
+        self.share:   float | None = None  # andel kombos hos föräldern som tar token
+        self.sizes:   list[tuple[float, str]] = []   # sorterade (storlek, raise-token)
+
+    @property
+    def tokens(self) -> list[str]:
+        out, n = [], self
+        while n.parent is not None:
+            out.append(n.token)
+            n = n.parent
+        return out[::-1]
+
+    @property
+    def sequence(self) -> str:
+        return tokens_seq(self.tokens)
+
+    def raise_children(self) -> list[TrieNode]:
+        """Alla raise-barn, sorterade på storlek (all-in sist)"""
+        kids = [c for c in self.children.values() if is_raise(c.token)]
+        return sorted(kids, key=lambda c: raise_size(c.token) or float("inf"))
+
+    def nearest_raise(self, size: float) -> TrieNode | None:
+        """Raise-barnet vars storlek ligger närmast `size` (lika nära → mindre)"""
+        if not self.sizes:
+            return None
+        i = bisect.bisect_left(self.sizes, (size, ""))
+        cands = self.sizes[max(i - 1, 0) : i + 1]
+        best = min(cands, key=lambda st: (abs(st[0] - size), st[0]))
+        return self.children[best[1]]
+
+    def main_raise(self) -> TrieNode | None:
+        """Mest spelade raise-barnet (minsta storleken om andelar saknas)"""
+        kids = self.raise_children()
+        if not kids:
+            return None
+        return max(kids, key=lambda c: (c.share or 0.0, -(raise_size(c.token) or 1e9)))
+
+    def walk(self) -> Iterator[TrieNode]:
+        """Noden + alla ättlingar (förälder före barn)"""
+        stack = [self]
+        while stack:
+            n = stack.pop()
+            yield n
+            stack.extend(n.children.values())
+
+    def __repr__(self) -> str:
+        return f"<TrieNode {self.position} {self.sequence} id={self.node_id}>"
+
+
+class Resolution(NamedTuple):
+    node: TrieNode | None
+    mapping: list[tuple[str, str]]      # (begärd token, använd token)
+
+
+class ActionTrie:
+    def __init__(self):
+        self.root = TrieNode("", None, POSITION_ORDER[0])
+        self.by_id: dict[int, TrieNode] = {}
+
+    # --- bygge ----------------------------------------------------------
+    def insert(self, sequence: str, position: str,
+               node_id: int | None = None, folder: str | None = None) -> TrieNode:
+        tokens = seq_tokens(sequence)
+        who = actors(tokens)
+        n = self.root
+        for depth, tok in enumerate(tokens, start=1):
+            child = n.children.get(tok)
+            if child is None:
+                child = TrieNode(tok, n, who[depth])
+                n.children[tok] = child
+                if (size := raise_size(tok)) is not None:
+                    bisect.insort(n.sizes, (size, tok))
+            n = child
+        n.position = position               # datan vinner över härledd position
+        if node_id is not None:
+            n.node_id = node_id
+            n.folder  = folder
+            self.by_id[node_id] = n
+        return n
+
+    def attach_shares(self, shares: Iterable[tuple[int, str, float]]) -> None:
+        """(node_id, action-nyckel, andel) → TrieNode.share på motsvarande barn"""
+        for node_id, action, share in shares:
+            parent = self.by_id.get(node_id)
+            child = parent.children.get(key_token(action)) if parent else None
+            if child is not None:
+                child.share = share
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple[int, str, str, str]]) -> ActionTrie:
+        """rows = (id, position, action_sequence, folder_name)"""
+        trie = cls()
+        for node_id, pos, seq, folder in rows:
+            trie.insert(seq, pos, node_id, folder)
+        return trie
+
+    @classmethod
+    def from_db(cls, conn: sqlite3.Connection) -> ActionTrie:
+        trie = cls.from_rows(conn.execute(queries.NODES_ALL))
+        try:
+            trie.attach_shares(conn.execute(queries.NODE_ACTIONS_ALL))
+        except sqlite3.OperationalError:
+            pass                            # äldre DB utan node_actions
+        return trie
+
+    @classmethod
+    def from_pack(cls, pack) -> ActionTrie:
+        trie = cls.from_rows((n.id, n.position, n.sequence, n.folder) for n in pack)
+        for n in pack:
+            live = max(int((n.matrix.sum(axis=1) > 0).sum()), 1)
+            totals = n.matrix.sum(axis=0) / live
+            trie.attach_shares((n.id, a, float(t)) for a, t in zip(n.actions, totals))
+        return trie
+
+    @classmethod
+    def from_folders(cls, folders: Iterable[str]) -> ActionTrie:
+        """Direkt från mappnamnen (utan databas); node_id = löpnummer"""
+        from create_db2 import canonize_pos, decode_folder_name
+        trie = cls()
+        for i, folder in enumerate(sorted(folders), start=1):
+            try:
+                seq, raw_pos = decode_folder_name(folder)
+            except ValueError:
+                continue
+            pos = canonize_pos(raw_pos)
+            if pos in POSITION_ORDER:          # hoppa t.ex. '.DS_Store'
+                trie.insert(seq, pos, i, folder)
+        return trie
+
+    # --- uppslag --------------------------------------------------------
+    def find(self, sequence: str) -> TrieNode | None:
+        """Exakt uppslag, O(djup)"""
+        n = self.root
+        for tok in seq_tokens(sequence):
+            n = n.children.get(tok)
+            if n is None:
+                return None
+        return n
+
+    def resolve(self, position: str | None, sequence: str) -> list[TrieNode]:
+        """
+        Alla datanoder som matchar sekvensen. En generisk 'R' utan belopp
+        förgrenar sig till varje raise-barn på det djupet. position=None →
+        ingen filtrering på position.
+        """
+        frontier = [self.root]
+        for tok in seq_tokens(sequence):
+            nxt: list[TrieNode] = []
+            for n in frontier:
+                if tok == "R" and "R" not in n.children:
+                    nxt.extend(n.raise_children())
+                elif tok in n.children:
+                    nxt.append(n.children[tok])
+            frontier = nxt
+            if not frontier:
+                return []
+        return [n for n in frontier
+                if n.node_id is not None and (position is None or n.position == position)]
+
+    def snap(self, position: str | None, sequence: str) -> Resolution:
+        """
+        En enda väg genom trädet: exakt token om den finns, annars närmaste
+        raise-storlek hos syskonen (generisk 'R' → mest spelade storleken).
+        Resolution.mapping listar varje token som byttes ut.
+        """
+        n = self.root
+        mapping: list[tuple[str, str]] = []
+        for tok in seq_tokens(sequence):
+            child = n.children.get(tok)
+            if child is None and is_raise(tok):
+                size  = raise_size(tok)
+                child = n.main_raise() if size is None else n.nearest_raise(size)
+                if child is not None:
+                    mapping.append((tok, child.token))
+            if child is None:
+                return Resolution(None, mapping)
+            n = child
+        if n.node_id is None or (position is not None and n.position != position):
+            return Resolution(None, mapping)
+        return Resolution(n, mapping)
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def __iter__(self) -> Iterator[TrieNode]:
+        return iter(self.by_id.values())
@@ -8,6 +8,8 @@ import pandas as pd
 import matplotlib.pyplot as plt
 from tabulate import tabulate
 
+import queries
+
 
 # -------------------------------------------------------------------
 #  KONFIGURATION
@@ -26,55 +28,37 @@ def open_db(path: Path) -> sqlite3.Connection:
 
 def get_positions(conn) -> pd.DataFrame:
     """Returnerar tabell: position | noder"""
-    return pd.read_sql_query(
-        """
-        SELECT position, COUNT(*) AS n
-        FROM nodes
-        GROUP BY position
-        ORDER BY n DESC
-        """,
-        conn,
-    )
+    return pd.read_sql_query(queries.POSITIONS, conn)
 
 
 def get_nodes_for_position(conn, pos: str) -> pd.DataFrame:
     """Alla noder (id, seq, folder_name) för given position"""
-    return pd.read_sql_query(
-        """
-        SELECT id, action_sequence AS seq, folder_name
-        FROM nodes
-        WHERE position = ?
-        ORDER BY seq
-        """,
-        conn,
-        params=(pos,),
-    )
+    return pd.read_sql_query(queries.NODES_FOR_POSITION, conn, params=(pos,))
 
 
 def summary_for_node(conn, node_id: int) -> pd.DataFrame:
-    """Summa frekvens per action för vald nod"""
-    return pd.read_sql_query(
-        """
-        SELECT action, SUM(frequency) AS freq
-        FROM ranges
-        WHERE node_id = ?
-        GROUP BY action
-        ORDER BY freq DESC
-        """,
-        conn,
-        params=(node_id,),
-    )
+    """Summa frekvens per action för vald nod (förberäknad i node_actions)"""
+    try:
+        return pd.read_sql_query(queries.NODE_ACTIONS, conn, params=(node_id,))
+    except (sqlite3.OperationalError, pd.errors.DatabaseError):
+        # äldre DB utan aggregat → summera ranges direkt
+        return pd.read_sql_query(queries.NODE_ACTIONS_FROM_RANGES, conn,
+                                 params=(node_id,))
+
+
+def stats_for_node(conn, node_id: int) -> tuple[int, float, float] | None:
+    """(kombos, VPIP, PFR) för noden, None om aggregat saknas"""
+    try:
+        return conn.execute(queries.NODE_STATS, (node_id,)).fetchone()
+    except sqlite3.OperationalError:
+        return None
 
 
 def top_combos(
     conn, node_id: int, action: str, limit: int | None = 20
 ) -> pd.DataFrame:
     """Hand-lista för nod + action (limit=None → inga gränser)"""
-    sql = (
-        "SELECT combo, frequency "
-        "FROM ranges WHERE node_id = ? AND action = ? "
-        "ORDER BY frequency DESC"
-    )
+    sql = queries.TOP_COMBOS
     if limit:
         sql += f" LIMIT {limit}"
     return pd.read_sql_query(sql, conn, params=(node_id, action))
@@ -120,7 +104,11 @@ def main() -> None:
         # ---------------- Nivå 3: statistik för nod ----------
         summ = summary_for_node(conn, node_id)
         print(f"\n=== Action-frekvenser – node {node_id} ===")
-        print(tabulate(summ, headers=["Action", "Total frekvens"], tablefmt="psql"))
+        print(tabulate(summ[["action", "freq"]],
+                       headers=["Action", "Total frekvens"], tablefmt="psql"))
+        if (stats := stats_for_node(conn, node_id)):
+            n, vpip, pfr = stats
+            print(f"{n} kombos  ·  VPIP {vpip*100:.1f} %  ·  PFR {pfr*100:.1f} %")
 
         for act in summ["action"]:
             ans = input(
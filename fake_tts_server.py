@@ -0,0 +1,81 @@
+"""
+fake_tts_server.py – lokal ersättare för ElevenLabs text-to-speech
+
+Svarar på POST /v1/text-to-speech/{voice_id} som ElevenLabs, men med
+påhittat "ljud" (deterministiska bytes ur röst + modell + text) efter en
+fördröjning som växer med textens längd. Bara röst-id:n i VOICES godtas
+(404 annars, som ElevenLabs); GET /v1/voices listar dem med namn. GET
+/stats visar antal anrop – bra för att se att cachen i tts_stream fungerar.
+
+    python fake_tts_server.py --port 8766
+    TTS_BASE_URL=http://127.0.0.1:8766 uvicorn make_episode:app
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+
+from aiohttp import web
+
+LATENCY_S = 0.3                 # fast del per anrop
+PER_CHAR_S = 0.004              # + per tecken (ungefär som riktig syntes)
+BYTES_PER_CHAR = 400            # ≈ 64 kb/s mp3 vid normal taltakt
+
+# röst-id → namn (ElevenLabs förinställda röster)
+VOICES = {
+    "pNInz6obpgDQGcFmaJgB": "Adam",
+    "21m00Tcm4TlvDq8ikWAM": "Rachel",
+}
+
+
+def fake_audio(voice: str, model: str, text: str) -> bytes:
+    seed = hashlib.sha256(f"{voice}|{model}|{text}".encode("utf-8")).digest()
+    n = max(len(text), 1) * BYTES_PER_CHAR
+    return b"ID3\x04\x00\x00" + (seed * (n // len(seed) + 1))[:n]
+
+
+def make_app(latency: float = LATENCY_S, per_char: float = PER_CHAR_S) -> web.Application:
+    stats = {"requests": 0, "chars": 0, "concurrent": 0, "max_concurrent": 0}
+
+    async def tts(request: web.Request) -> web.Response:
+        if request.match_info["voice_id"] not in VOICES:
+            return web.json_response({"detail": {"status": "voice_not_found"}}, status=404)
+        body = await request.json()
+        text = body.get("text", "")
+        if not text:
+            return web.json_response({"detail": "text is required"}, status=422)
+        stats["requests"] += 1
+        stats["chars"] += len(text)
+        stats["concurrent"] += 1
+        stats["max_concurrent"] = max(stats["max_concurrent"], stats["concurrent"])
+        try:
+            await asyncio.sleep(latency + per_char * len(text))
+        finally:
+            stats["concurrent"] -= 1
+        audio = fake_audio(request.match_info["voice_id"], body.get("model_id", ""), text)
+        return web.Response(body=audio, content_type="audio/mpeg")
+
+    async def voices(request: web.Request) -> web.Response:
+        return web.json_response({"voices": [{"voice_id": k, "name": v} for k, v in VOICES.items()]})
+
+    async def get_stats(request: web.Request) -> web.Response:
+        return web.json_response(stats)
+
+    app = web.Application()
+    app["stats"] = stats
+    app.router.add_post("/v1/text-to-speech/{voice_id}", tts)
+    app.router.add_get("/v1/voices", voices)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Fejkad ElevenLabs TTS-server")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8766)
+    ap.add_argument("--latency", type=float, default=LATENCY_S)
+    ap.add_argument("--per-char", type=float, default=PER_CHAR_S)
+    args = ap.parse_args()
+    web.run_app(make_app(args.latency, args.per_char), host=args.host, port=args.port)
@@ -0,0 +1,212 @@
+"""
+llm_client.py – icke-blockerande klient mot OpenAI:s HTTP-API (aiohttp)
+
+openai==0.28 är synkron: varje ChatCompletion.create / Audio.transcribe i
+en async-endpoint fryser uvicorns event-loop tills svaret kommit. Den här
+klienten gör samma anrop med aiohttp:
+
+• En delad ClientSession med keep-alive-pool (TCPConnector) per event-loop
+• Tak för samtidiga anrop (semafor, LLM_MAX_CONCURRENCY) – övriga köar
+• Timeout per anrop (total + connect)
+• Avbrytbar: cancel på tasken avbryter HTTP-anropet; with_disconnect()
+  avbryter när klienten kopplat ner
+• chat(), chat_stream() (SSE från API:t, text-bitar) och transcribe()
+
+Bas-URL:en (OPENAI_BASE_URL) kan pekas mot en fejkad upstream, se
+bench_llm_client.py.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+import aiohttp
+
+BASE_URL = "https://api.openai.com/v1"
+MODEL = "gpt-4-turbo"
+MAX_CONCURRENCY = 32
+TIMEOUT_S = 60.0
+CONNECT_TIMEOUT_S = 10.0
+DISCONNECT_POLL_S = 0.25
+
+
+class LLMError(Exception):
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+class LLMClient:
+    def __init__(self, api_key: Optional[str], base_url: str = BASE_URL,
+                 max_concurrency: int = MAX_CONCURRENCY, timeout: float = TIMEOUT_S):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._loop = None
+        self.counters = {"calls": 0, "errors": 0, "cancelled": 0, "in_flight": 0,
+                         "waiting": 0, "latency_s_total": 0.0}
+
+    # --- session ------------------------------------------------------------
+    def _ensure(self) -> aiohttp.ClientSession:
+        """Session + semafor hör till event-loopen de skapades i"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={"Authorization": f"Bearer {self.api_key}"} if self.api_key else None,
+            )
+            self._sem = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _timeout(self, timeout: Optional[float]) -> aiohttp.ClientTimeout:
+        return aiohttp.ClientTimeout(total=timeout or self.timeout, connect=CONNECT_TIMEOUT_S)
+
+    @asynccontextmanager
+    async def _slot(self, timeout: Optional[float] = None):
+        """
+        Plats under samtidighetstaket; räknar kö, pågående och avbrutna
+        anrop. timeout är anropets faktiska tidsgräns (för felmeddelandet).
+        """
+        c = self.counters
+        c["waiting"] += 1
+        try:
+            await self._sem.acquire()
+        except asyncio.CancelledError:
+            c["cancelled"] += 1
+            raise
+        finally:
+            c["waiting"] -= 1
+        c["in_flight"] += 1
+        t0 = time.perf_counter()
+        try:
+            yield
+            c["calls"] += 1
+            c["latency_s_total"] += time.perf_counter() - t0
+        except (asyncio.CancelledError, GeneratorExit):
+            c["cancelled"] += 1
+            raise
+        except asyncio.TimeoutError as e:
+            c["errors"] += 1
+            raise LLMError(f"Upstream timeout after {timeout or self.timeout:g} s") from e
+        except aiohttp.ClientError as e:
+            c["errors"] += 1
+            raise LLMError(f"Upstream error: {e}") from e
+        except Exception:
+            c["errors"] += 1
+            raise
+        finally:
+            c["in_flight"] -= 1
+            self._sem.release()
+
+    async def _post(self, path: str, timeout: Optional[float], **kwargs) -> Dict:
+        session = self._ensure()
+        async with self._slot(timeout):
+            async with session.post(self.base_url + path, timeout=self._timeout(timeout),
+                                    **kwargs) as resp:
+                body = await resp.text()
+                if resp.status >= 400:
+                    raise LLMError(f"Upstream {resp.status}: {body[:300]}", resp.status)
+                return json.loads(body)
+
+    # --- API ----------------------------------------------------------------
+    async def chat(self, messages: List[Dict], model: str = MODEL, max_tokens: int = 256,
+                   temperature: float = 0.7, timeout: Optional[float] = None) -> str:
+        """Svarstexten från /chat/completions"""
+        data = await self._post("/chat/completions", timeout, json={
+            "model": model, "messages": messages,
+            "max_tokens": max_tokens, "temperature": temperature,
+        })
+        return data["choices"][0]["message"]["content"]
+
+    async def chat_stream(self, messages: List[Dict], model: str = MODEL,
+                          max_tokens: int = 256, temperature: float = 0.7,
+                          timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Text-bitar allt eftersom de kommer (stream=True)"""
+        session = self._ensure()
+        async with self._slot(timeout):
+            async with session.post(self.base_url + "/chat/completions",
+                                    timeout=self._timeout(timeout), json={
+                                        "model": model, "messages": messages,
+                                        "max_tokens": max_tokens, "temperature": temperature,
+                                        "stream": True,
+                                    }) as resp:
+                if resp.status >= 400:
+                    raise LLMError(f"Upstream {resp.status}: {(await resp.text())[:300]}", resp.status)
+                async for raw in resp.content:
+                    line = raw.decode("utf-8").strip()
+                    if not line.startswith("data:"):
+                        continue
+                    payload = line[5:].strip()
+                    if payload == "[DONE]":
+                        break
+                    delta = json.loads(payload)["choices"][0].get("delta", {}).get("content")
+                    if delta:
+                        yield delta
+
+    async def transcribe(self, audio: bytes, filename: str = "audio.wav",
+                         model: str = "whisper-1", timeout: Optional[float] = None) -> str:
+        """Text från /audio/transcriptions"""
+        form = aiohttp.FormData()
+        form.add_field("model", model)
+        form.add_field("file", audio, filename=filename)
+        data = await self._post("/audio/transcriptions", timeout, data=form)
+        return data["text"]
+
+    def stats(self) -> Dict:
+        c = self.counters
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": c["in_flight"],
+            "waiting": c["waiting"],
+            "calls": c["calls"],
+            "errors": c["errors"],
+            "cancelled": c["cancelled"],
+            "avg_latency_s": round(c["latency_s_total"] / c["calls"], 3) if c["calls"] else None,
+        }
+
+
+async def with_disconnect(request, coro):
+    """
+    Kör coro men avbryt den om HTTP-klienten kopplar ner innan svaret är
+    klart (Starlette-request). Kastar ClientDisconnected i så fall.
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_S)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+def client_from_env() -> LLMClient:
+    return LLMClient(
+        os.getenv("OPENAI_API_KEY"),
+        base_url=os.getenv("OPENAI_BASE_URL", BASE_URL),
+        max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", MAX_CONCURRENCY)),
+        timeout=float(os.getenv("LLM_TIMEOUT_S", TIMEOUT_S)),
+    )
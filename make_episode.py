@@ -1,15 +1,26 @@
-from fastapi import FastAPI, Form, File, UploadFile, Request
+from fastapi import FastAPI, Form, File, UploadFile, Request, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import openai
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 import base64
-import tempfile
 import os
-import subprocess
 from typing import Dict, List
 from dotenv import load_dotenv
 import traceback
-import random
+import time
+from contextlib import aclosing
+
+from quiz_gen import QuizGenerator, closing_comment, quiz_id
+from quiz_bank import MIN_PER_LEVEL, QuizBank, fill as fill_bank
+from quiz_pool import BUCKETS, POOL_SIZE, LOW_WATER, QuizPool, quiz_bucket, valid_quiz
+from audio_pipeline import AudioError, metrics as audio_metrics, prepare_audio
+from llm_client import ClientDisconnected, LLMError, client_from_env, with_disconnect
+from quiz_feedback import FeedbackCache, answer_pattern
+from quiz_fanout import SHARD_TIMEOUT_S, fan_out
+from quiz_stream import QuizStreamParser, sse
+from quiz_verify import verify_question, verify_quiz
+from tts_stream import speak_stream, tts_from_env
+from range_drills import DrillGenerator
 
 # Ladda miljövariabler från .env
 load_dotenv()
@@ -19,8 +30,15 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 ELEVEN_API_KEY = os.getenv("ELEVEN_API_KEY")
 VOICE_ID = os.getenv("VOICE_ID", "Adam")
 
-# Sätt OpenAI-nyckeln för gamla API:t
-openai.api_key = OPENAI_API_KEY
+# Asynkron OpenAI-klient (aiohttp) med delad keep-alive-pool och tak för
+# samtidiga anrop – blockerar inte event-loopen medan GPT/Whisper svarar.
+# Styrs med OPENAI_BASE_URL, LLM_MAX_CONCURRENCY och LLM_TIMEOUT_S
+llm = client_from_env()
+
+# ElevenLabs-röst för /ask_voice: mening för mening, cachad på disk.
+# Styrs med ELEVEN_API_KEY, VOICE_ID, TTS_BASE_URL, TTS_MODEL,
+# TTS_MAX_CONCURRENCY och TTS_CACHE_DIR
+tts = tts_from_env()
 
 # Skapa FastAPI-app
 app = FastAPI()
@@ -42,170 +60,305 @@ app.add_middleware(
 # Konversationshistorik per session
 conversation_history: Dict[str, List[dict]] = {}
 
-# --- Static quiz data grouped by level ---
-QUIZ_QUESTIONS = {
-    "1-2": [
-        {"question": "Which hand wins at showdown: A♣ K♦ 8♠ 8♥ 3♣ or K♣ Q♠ Q♥ 10♦ 4♣?", "choices": ["A♣ K♦ 8♠ 8♥ 3♣", "K♣ Q♠ Q♥ 10♦ 4♣"], "answer": "K♣ Q♠ Q♥ 10♦ 4♣"},
-        # ... (lägg till fler frågor här)
-    ],
-    "3-4": [
-        {"question": "You face a half-pot bet of 50 $ into 100 $. How often must you win to break even on a call?", "choices": ["25 %", "33 %", "40 %", "50 %"], "answer": "25 %"},
-        # ... (lägg till fler frågor här)
-    ],
-    # ... (lägg till övriga nivåer på samma sätt)
+# Lokal quizgenerator för nivå 1-4 (showdown + pot odds, ingen LLM)
+quiz_generator = QuizGenerator()
+
+# Range-drills för nivå 5-10 ur solverträdet; laddas vid första anropet
+drill_generator = None
+
+
+def get_drill_generator():
+    """DrillGenerator (pack + reach i minnet) eller None om range-datat saknas"""
+    global drill_generator
+    if drill_generator is None:
+        try:
+            drill_generator = DrillGenerator.load()
+        except Exception:
+            traceback.print_exc()
+            return None
+    return drill_generator
+
+# --- LLM-quiz per nivågrupp (samma grupper som quiz_pool.BUCKETS), {n} = antal frågor ---
+QUIZ_PROMPTS = {
+    "1-2": (
+        "Create {n} multiple-choice questions that test absolute hand strength in Texas Hold'em. "
+        "For each, show two 5-card showdown hands, ask which one wins, and explain the answer in one sentence for learners. "
+        "After the quiz, give a personal comment on what the player should practice next. "
+        "Return as a JSON array: [{question, choices, correct, explanation}], and a final comment."
+    ),
+    "3-4": (
+        "Write {n} one-sentence scenarios that force the player to use basic pot odds or position. "
+        "For each, give four answer choices (fold / call / min-raise / shove) and briefly state the correct choice with a short pot-odds calculation. "
+        "After the quiz, give a personal comment on what the player should practice next. "
+        "Return as a JSON array: [{question, choices, correct, explanation}], and a final comment."
+    ),
+    "5-6": (
+        "Generate {n} quiz spots from the turn in a cash game (100 bb effective) where villain's range is described in words. "
+        "For each, ask which bet-sizing or line maximises EV, include board texture, and reveal solver-approximate equities in the explanation. "
+        "After the quiz, give a personal comment on what the player should practice next. "
+        "Return as a JSON array: [{question, choices, correct, explanation}], and a final comment."
+    ),
+    "7-8": (
+        "Pose {n} tournament hands (40 bb, 9-max, ICM in play) that test range construction and blocker logic. "
+        "For each, give four nuanced options (e.g., small-bet, over-bet, check-call, check-fold) and in the answer justify with range vs. range equity and blocker effects. "
+        "After the quiz, give a personal comment on what the player should practice next. "
+        "Return as a JSON array: [{question, choices, correct, explanation}], and a final comment."
+    ),
+    "9-10": (
+        "Create {n} solver-style quizzes: 200 bb deep, H2H on the river after a polarising 3-barrel in a 4-bet pot. "
+        "For each, present exact hand ranges in notation, node-lock villain to a 25% over-fold, and ask for the optimal mixed strategy (bet sizes + frequencies) with GTO EV figures. "
+        "Return the solver breakdown in the explanation. "
+        "After the quiz, give a personal comment on what the player should practice next. "
+        "Return as a JSON array: [{question, choices, correct, explanation}], and a final comment."
+    ),
 }
 
+
+QUIZ_SYSTEM = "You are a world-class poker coach and quizmaster. Always answer in English and return only valid JSON."
+
+
+async def quiz_completion(prompt: str, n: int) -> str:
+    """En quiz-shard från GPT med n frågor; max_tokens skalas med n"""
+    return await llm.chat(
+        [{"role": "system", "content": QUIZ_SYSTEM},
+         {"role": "user", "content": prompt}],
+        max_tokens=180 * n + 200,
+        temperature=0.7,
+        timeout=SHARD_TIMEOUT_S,
+    )
+
+
+async def llm_quiz(bucket: str):
+    """
+    Ett quiz från GPT för nivågruppen, genererat som parallella shards
+    (quiz_fanout) och kontrollerat med quiz_verify → (quiz eller None, rått
+    svar). Quizet kan ha färre än 10 frågor om någon shard fallerat
+    (partial) eller frågor med fel facit tagits bort.
+    """
+    result = await fan_out(quiz_completion, QUIZ_PROMPTS[bucket])
+    questions, checks = verify_quiz(result["questions"])
+    quiz = {"questions": questions, "final_comment": result["final_comment"],
+            "partial": result["partial"] or checks["wrong"] > 0,
+            "shards": result["shards"], "checks": checks}
+    return (quiz if valid_quiz(quiz) else None), result["raw"]
+
+
+def local_quiz(data: dict, skill_level: int):
+    """
+    Quiz utan LLM om det går: nivå 1-4 ur quiz_gen, nivå 5-10 ur
+    range-drills. None om requesten ber om LLM ("source": "llm") eller om
+    range-datat saknas.
+    """
+    if data.get("source") == "llm":
+        return None
+
+    # Nivå 1-4 är ren mekanik (vilken hand vinner, pot odds) -> genereras
+    # lokalt med handutvärderare och exakt aritmetik, svarar direkt
+    if skill_level <= 4:
+        generator = QuizGenerator(int(data["seed"])) if "seed" in data else quiz_generator
+        return {
+            "questions": generator.generate(skill_level, 10),
+            "final_comment": closing_comment(skill_level),
+            "source": "generated",
+        }
+
+    # Nivå 5-10: range-drills med solverns exakta frekvenser som facit
+    drills = get_drill_generator()
+    if drills is None:
+        return None
+    if "seed" in data:
+        drills = drills.with_seed(int(data["seed"]))
+    questions = drills.generate(skill_level, 10)
+    if not questions:
+        return None
+    return {
+        "questions": questions,
+        "final_comment": drills.closing_comment(questions),
+        "source": "solver",
+    }
+
+
+async def pool_quiz(bucket: str):
+    return (await llm_quiz(bucket))[0]
+
+
+# Varm pool av färdiga LLM-quiz; fylls på i bakgrunden och sparas mellan omstarter
+quiz_pool = QuizPool(
+    pool_quiz,
+    size=int(os.getenv("QUIZ_POOL_SIZE", POOL_SIZE)),
+    low_water=int(os.getenv("QUIZ_POOL_LOW_WATER", LOW_WATER)),
+    buckets=BUCKETS,
+)
+
+
+@app.on_event("startup")
+async def start_quiz_pool():
+    if OPENAI_API_KEY:
+        quiz_pool.start()
+
+
+@app.on_event("shutdown")
+async def stop_quiz_pool():
+    await quiz_pool.stop()
+    await llm.close()
+    await tts.close()
+
+
+# Frågebank (SQLite): alla serverade frågor sparas med stabilt id så att
+# /quiz_feedback kan rätta per id; /quiz_static samplar verifierade frågor
+quiz_bank = QuizBank()
+
+# lokalt räknat facit → verifierat direkt; LLM-frågor bara om quiz_verify
+# kunde kontrollera (och vid behov rätta) dem
+VERIFIED_SOURCES = {"generated", "solver"}
+VERIFIED_CHECKS = {"ok", "repaired"}
+
+
+def bank_quiz(quiz: dict, skill_level: int) -> dict:
+    """Spara quizets frågor i banken (och se till att alla har id)"""
+    for q in quiz["questions"]:
+        q.setdefault("id", quiz_id(q["question"], q["correct"]))
+    source = quiz.get("source", "llm")
+    if source in VERIFIED_SOURCES:
+        quiz_bank.add(quiz["questions"], skill_level, source=source, verified=True)
+        return quiz
+    checked = [q for q in quiz["questions"] if q.get("check") in VERIFIED_CHECKS]
+    unchecked = [q for q in quiz["questions"] if q.get("check") not in VERIFIED_CHECKS]
+    quiz_bank.add(checked, skill_level, source=source, verified=True)
+    quiz_bank.add(unchecked, skill_level, source=source, verified=False)
+    return quiz
+
 @app.get("/")
 def root():
     return {"message": "API is running!"}
 
+def ask_skill_level(request: Request) -> int:
+    skill_level = request.headers.get("X-Skill-Level", "1")  # Default to beginner if not specified
+    try:
+        return int(skill_level)
+    except Exception:
+        return 1
+
+
+async def ask_question(request: Request, audio) -> str:
+    """Frågan som text: transkriberad från uppladdat ljud eller ur JSON-kroppen"""
+    # Om det är en multipart/form-data med audio: audio_pipeline kontrollerar
+    # storlek/längd, klipper bort tystnad och komprimerar (ffmpeg över pipes)
+    if audio is not None:
+        audio_bytes, filename, info = await prepare_audio(audio)
+        # 2. Transkribera ljud med Whisper
+        t0 = time.perf_counter()
+        question = await with_disconnect(request, llm.transcribe(audio_bytes, filename))
+        info["transcribe_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        audio_metrics.record(info)
+        return question
+
+    # Om det är JSON med text
+    data = await request.json()
+    return data.get("text", "").strip()
+
+
+def coach_system_message(skill_level: int) -> str:
+    """Systemmeddelande baserat på skicklighetsnivå"""
+    if skill_level <= 2:
+        return (
+            "You are Adam, a friendly and encouraging poker coach for complete beginners. "
+            "Focus on explaining basic concepts like hand rankings, betting order, and simple odds. "
+            "Use simple language and avoid poker slang. "
+            "Be very patient and encouraging. "
+            "Always explain everything step by step. "
+            "Never use markdown or bold, only plain text. "
+            "Always be brief and concise. Never give long or rambling answers. "
+            "Always answer in English, regardless of the user's language."
+        )
+    elif skill_level <= 4:
+        return (
+            "You are Adam, a supportive poker coach for comfortable beginners. "
+            "Focus on position, pot odds, and basic pre-flop strategies. "
+            "Introduce basic poker terminology like 'tight/loose' and 'pot control'. "
+            "Keep explanations clear but slightly more technical. "
+            "Never use markdown or bold, only plain text. "
+            "Always be brief and concise. Never give long or rambling answers. "
+            "Always answer in English, regardless of the user's language."
+        )
+    elif skill_level <= 6:
+        return (
+            "You are Adam, a strategic poker coach for intermediate players. "
+            "Focus on range analysis, continuation betting, and implied odds. "
+            "Use moderate poker slang and include brief mathematical examples. "
+            "Discuss stack-to-pot ratios and basic GTO concepts. "
+            "Never use markdown or bold, only plain text. "
+            "Always be brief and concise. Never give long or rambling answers. "
+            "Always answer in English, regardless of the user's language."
+        )
+    elif skill_level <= 8:
+        return (
+            "You are Adam, an advanced poker coach for experienced players. "
+            "Focus on GTO deviations, blocker effects, and bet sizing trees. "
+            "Use advanced terminology and discuss equity realization. "
+            "Include detailed mathematical analysis and range visualization concepts. "
+            "Never use markdown or bold, only plain text. "
+            "Always be brief and concise. Never give long or rambling answers. "
+            "Always answer in English, regardless of the user's language."
+        )
+    else:
+        return (
+            "You are Adam, a high-stakes poker coach for professional players. "
+            "Focus on solver-based strategies, node locking, and mixed strategy frequencies. "
+            "Use advanced poker terminology and discuss complex game theory. "
+            "Include detailed mathematical analysis and solver interpretations. "
+            "Never use markdown or bold, only plain text. "
+            "Always be brief and concise. Never give long or rambling answers. "
+            "Always answer in English, regardless of the user's language."
+        )
+
+
+def ask_messages(session_id: str, question: str, skill_level: int) -> List[dict]:
+    """
+    Systemmeddelande + konversationshistorik (max 10 senaste meddelanden,
+    inklusive den nya frågan). Historiken ändras inte här – se remember().
+    """
+    history = conversation_history.get(session_id, [])
+    turns = history + [{"role": "user", "content": question}]
+    return [{"role": "system", "content": coach_system_message(skill_level)}] + turns[-10:]
+
+
+def remember(session_id: str, question: str, answer: str) -> None:
+    """Spara fråga och svar i sessionens historik (först när svaret är klart)"""
+    conversation_history.setdefault(session_id, []).extend([
+        {"role": "user", "content": question},
+        {"role": "assistant", "content": answer},
+    ])
+
+
 @app.post("/ask")
 async def ask_gpt(request: Request, audio: UploadFile = File(None)):
     try:
-        question = None
         session_id = request.headers.get("X-Session-ID", "default")
-        skill_level = request.headers.get("X-Skill-Level", "1")  # Default to beginner if not specified
-        try:
-            skill_level = int(skill_level)
-        except Exception:
-            skill_level = 1
-        
-        # Om det är en multipart/form-data med audio
-        if audio is not None:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as temp_audio:
-                content = await audio.read()
-                temp_audio.write(content)
-                temp_audio_path = temp_audio.name
-
-            # Konvertera till .wav med ffmpeg
-            temp_wav_path = temp_audio_path.replace('.mp4', '.wav')
-            try:
-                subprocess.run([
-                    "ffmpeg", "-y", "-i", temp_audio_path, temp_wav_path
-                ], check=True)
-            except Exception as e:
-                return JSONResponse(status_code=500, content={"error": f"FFmpeg error: {str(e)}"})
-
-            try:
-                # 2. Transkribera ljud med Whisper
-                with open(temp_wav_path, "rb") as audio_file:
-                    transcription = openai.Audio.transcribe(
-                        model="whisper-1",
-                        file=audio_file
-                    )
-                question = transcription["text"]
-            finally:
-                if os.path.exists(temp_audio_path):
-                    os.unlink(temp_audio_path)
-                if os.path.exists(temp_wav_path):
-                    os.unlink(temp_wav_path)
-        else:
-            # Om det är JSON med text
-            data = await request.json()
-            question = data.get("text", "").strip()
-
-        # Hämta eller skapa konversationshistorik för denna session
-        if session_id not in conversation_history:
-            conversation_history[session_id] = []
-
-        # Lägg till användarens fråga i historiken
-        conversation_history[session_id].append({"role": "user", "content": question})
-
-        # Skapa systemmeddelande baserat på skicklighetsnivå
-        if skill_level <= 2:
-            system_message = (
-                "You are Adam, a friendly and encouraging poker coach for complete beginners. "
-                "Focus on explaining basic concepts like hand rankings, betting order, and simple odds. "
-                "Use simple language and avoid poker slang. "
-                "Be very patient and encouraging. "
-                "Always explain everything step by step. "
-                "Never use markdown or bold, only plain text. "
-                "Always be brief and concise. Never give long or rambling answers. "
-                "Always answer in English, regardless of the user's language."
-            )
-        elif skill_level <= 4:
-            system_message = (
-                "You are Adam, a supportive poker coach for comfortable beginners. "
-                "Focus on position, pot odds, and basic pre-flop strategies. "
-                "Introduce basic poker terminology like 'tight/loose' and 'pot control'. "
-                "Keep explanations clear but slightly more technical. "
-                "Never use markdown or bold, only plain text. "
-                "Always be brief and concise. Never give long or rambling answers. "
-                "Always answer in English, regardless of the user's language."
-            )
-        elif skill_level <= 6:
-            system_message = (
-                "You are Adam, a strategic poker coach for intermediate players. "
-                "Focus on range analysis, continuation betting, and implied odds. "
-                "Use moderate poker slang and include brief mathematical examples. "
-                "Discuss stack-to-pot ratios and basic GTO concepts. "
-                "Never use markdown or bold, only plain text. "
-                "Always be brief and concise. Never give long or rambling answers. "
-                "Always answer in English, regardless of the user's language."
-            )
-        elif skill_level <= 8:
-            system_message = (
-                "You are Adam, an advanced poker coach for experienced players. "
-                "Focus on GTO deviations, blocker effects, and bet sizing trees. "
-                "Use advanced terminology and discuss equity realization. "
-                "Include detailed mathematical analysis and range visualization concepts. "
-                "Never use markdown or bold, only plain text. "
-                "Always be brief and concise. Never give long or rambling answers. "
-                "Always answer in English, regardless of the user's language."
-            )
-        else:
-            system_message = (
-                "You are Adam, a high-stakes poker coach for professional players. "
-                "Focus on solver-based strategies, node locking, and mixed strategy frequencies. "
-                "Use advanced poker terminology and discuss complex game theory. "
-                "Include detailed mathematical analysis and solver interpretations. "
-                "Never use markdown or bold, only plain text. "
-                "Always be brief and concise. Never give long or rambling answers. "
-                "Always answer in English, regardless of the user's language."
-            )
-
-        # Skapa systemmeddelande och inkludera konversationshistorik
-        messages = [
-            {
-                "role": "system",
-                "content": system_message
-            }
-        ]
-        
-        # Lägg till konversationshistorik (max 10 senaste meddelanden)
-        messages.extend(conversation_history[session_id][-10:])
-
-        # 3. Skicka fråga till GPT-4.1 med konversationshistorik
-        response = openai.ChatCompletion.create(
-            model="gpt-4-turbo",
-            messages=messages,
-            max_tokens=150,
-            temperature=0.9,
-        )
-        answer = response["choices"][0]["message"]["content"].strip()
-
-        # Lägg till svaret i konversationshistoriken
-        conversation_history[session_id].append({"role": "assistant", "content": answer})
-
-        # 4. (Valfritt) Skicka GPT-svar till ElevenLabs för audio
-        # Här behöver du anpassa beroende på ditt elevenlabs-paket och version
-        # Om du inte använder ElevenLabs, kommentera bort nedan
-        # from elevenlabs import ElevenLabs
-        # client = ElevenLabs(api_key=ELEVEN_API_KEY)
-        # audio_gen = client.generate(
-        #     text=answer,
-        #     voice=VOICE_ID,
-        #     model="eleven_multilingual_v2"
-        # )
-        # audio_bytes = b"".join(audio_gen)
-        # audio_b64 = base64.b64encode(audio_bytes).decode('utf-8')
-
-        # 5. Returnera bara text (eller lägg till audio_b64 om du använder ElevenLabs)
+        skill_level = ask_skill_level(request)
+        question = await ask_question(request, audio)
+        messages = ask_messages(session_id, question, skill_level)
+
+        # 3. Skicka fråga till GPT-4.1 med konversationshistorik; avbryts
+        # om klienten kopplar ner innan svaret kommit
+        answer = (await with_disconnect(
+            request, llm.chat(messages, max_tokens=150, temperature=0.9))).strip()
+
+        # Lägg till frågan och svaret i konversationshistoriken
+        remember(session_id, question, answer)
+
+        # 4. Returnera text; röstsvar (ElevenLabs) finns som ström i /ask_voice
         return JSONResponse(content={
             "question": question, 
             "answer": answer
-            # "audio_b64": audio_b64
         })
+    except ClientDisconnected:
+        # klienten är borta; ingen läser svaret
+        return JSONResponse(status_code=499, content={"error": "Client disconnected."})
+    except AudioError as e:
+        return JSONResponse(status_code=e.status, content={"error": str(e)})
+    except LLMError as e:
+        return JSONResponse(status_code=502, content={"error": str(e)})
     except Exception as e:
         traceback.print_exc()
         return JSONResponse(
@@ -213,7 +366,140 @@ async def ask_gpt(request: Request, audio: UploadFile = File(None)):
             content={"error": str(e)}
         )
 
-# --- Quiz endpoints (oförändrade, men byt openai_client mot openai.ChatCompletion.create) ---
+@app.post("/ask_stream")
+async def ask_stream(request: Request, audio: UploadFile = File(None)):
+    """
+    Som /ask men som Server-Sent Events: 'question' med frågetexten,
+    'token' per textbit från GPT allt eftersom den kommer, sist 'done' med
+    hela svaret och tider ('error' om något gick fel). Historiken uppdateras
+    först när strömmen är klar; avbryts den blir frågan inte sparad.
+    """
+    t0 = time.perf_counter()
+    session_id = request.headers.get("X-Session-ID", "default")
+    skill_level = ask_skill_level(request)
+    try:
+        question = await ask_question(request, audio)
+    except ClientDisconnected:
+        return JSONResponse(status_code=499, content={"error": "Client disconnected."})
+    except AudioError as e:
+        return JSONResponse(status_code=e.status, content={"error": str(e)})
+    except Exception as e:
+        traceback.print_exc()
+        return JSONResponse(status_code=500, content={"error": str(e)})
+    transcribe_s = time.perf_counter() - t0
+    messages = ask_messages(session_id, question, skill_level)
+
+    async def events():
+        yield sse("question", {"question": question})
+        t1 = time.perf_counter()
+        first = None
+        parts = []
+        try:
+            # kopplar klienten ner stängs generatorn, och aclosing stänger då
+            # upstream-anropet direkt (inte först vid skräpsamling)
+            async with aclosing(llm.chat_stream(messages, max_tokens=150,
+                                                temperature=0.9)) as deltas:
+                async for delta in deltas:
+                    if first is None:
+                        first = time.perf_counter() - t1
+                    parts.append(delta)
+                    yield sse("token", {"text": delta})
+        except Exception as e:
+            traceback.print_exc()
+            yield sse("error", {"error": str(e)})
+            return
+        answer = "".join(parts).strip()
+        remember(session_id, question, answer)
+        yield sse("done", {
+            "question": question,
+            "answer": answer,
+            "transcribe_s": round(transcribe_s, 3),
+            "first_token_s": None if first is None else round(first, 3),
+            "answer_s": round(time.perf_counter() - t1, 3),
+            "total_s": round(time.perf_counter() - t0, 3),
+        })
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/ask_voice")
+async def ask_voice(request: Request, audio: UploadFile = File(None)):
+    """
+    Som /ask_stream men med röst: svaret delas i meningar som syntetiseras
+    samtidigt (i ordning) medan GPT skriver. Events: 'question', 'token'
+    per textbit, 'audio' per mening ({index, text, audio_b64, format,
+    cached}), sist 'done' med hela svaret och tider. Klipp cachas på disk
+    per röst + modell + text.
+    """
+    t0 = time.perf_counter()
+    session_id = request.headers.get("X-Session-ID", "default")
+    skill_level = ask_skill_level(request)
+    try:
+        question = await ask_question(request, audio)
+    except ClientDisconnected:
+        return JSONResponse(status_code=499, content={"error": "Client disconnected."})
+    except AudioError as e:
+        return JSONResponse(status_code=e.status, content={"error": str(e)})
+    except Exception as e:
+        traceback.print_exc()
+        return JSONResponse(status_code=500, content={"error": str(e)})
+    transcribe_s = time.perf_counter() - t0
+    messages = ask_messages(session_id, question, skill_level)
+    audio_format = tts.output_format.split("_")[0]
+
+    async def events():
+        yield sse("question", {"question": question})
+        t1 = time.perf_counter()
+        first_token = first_audio = None
+        parts = []
+        sentences = cached = failed = 0
+        try:
+            deltas = llm.chat_stream(messages, max_tokens=150, temperature=0.9)
+            # aclosing: kopplar klienten ner stängs GPT-strömmen och köade synteser avbryts
+            async with aclosing(speak_stream(deltas, tts)) as stream:
+                async for kind, item in stream:
+                    if kind == "token":
+                        if first_token is None:
+                            first_token = time.perf_counter() - t1
+                        parts.append(item)
+                        yield sse("token", {"text": item})
+                        continue
+                    if first_audio is None and item["audio"] is not None:
+                        first_audio = time.perf_counter() - t1
+                    sentences += 1
+                    cached += item["cached"]
+                    failed += item["audio"] is None
+                    yield sse("audio", {
+                        "index": item["index"],
+                        "text": item["text"],
+                        "audio_b64": (base64.b64encode(item["audio"]).decode("ascii")
+                                      if item["audio"] is not None else None),
+                        "format": audio_format,
+                        "cached": item["cached"],
+                        **({"error": item["error"]} if "error" in item else {}),
+                    })
+        except Exception as e:
+            traceback.print_exc()
+            yield sse("error", {"error": str(e)})
+            return
+        answer = "".join(parts).strip()
+        remember(session_id, question, answer)
+        yield sse("done", {
+            "question": question,
+            "answer": answer,
+            "sentences": sentences,
+            "cached": cached,
+            "failed": failed,
+            "transcribe_s": round(transcribe_s, 3),
+            "first_token_s": None if first_token is None else round(first_token, 3),
+            "first_audio_s": None if first_audio is None else round(first_audio, 3),
+            "total_s": round(time.perf_counter() - t0, 3),
+        })
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# --- Quiz endpoints ---
 
 @app.post("/quiz")
 async def generate_quiz(request: Request):
@@ -221,115 +507,241 @@ async def generate_quiz(request: Request):
         data = await request.json()
         skill_level = int(data.get("skill_level", 1))
 
-        # Välj rätt prompt baserat på nivå
-        if skill_level <= 2:
-            prompt = (
-                "Create 10 multiple-choice questions that test absolute hand strength in Texas Hold'em. "
-                "For each, show two 5-card showdown hands, ask which one wins, and explain the answer in one sentence for learners. "
-                "After the quiz, give a personal comment on what the player should practice next. "
-                "Return as a JSON array: [{question, choices, correct, explanation}], and a final comment."
-            )
-        elif skill_level <= 4:
-            prompt = (
-                "Write 10 one-sentence scenarios that force the player to use basic pot odds or position. "
-                "For each, give four answer choices (fold / call / min-raise / shove) and briefly state the correct choice with a short pot-odds calculation. "
-                "After the quiz, give a personal comment on what the player should practice next. "
-                "Return as a JSON array: [{question, choices, correct, explanation}], and a final comment."
-            )
-        elif skill_level <= 6:
-            prompt = (
-                "Generate 10 quiz spots from the turn in a cash game (100 bb effective) where villain's range is described in words. "
-                "For each, ask which bet-sizing or line maximises EV, include board texture, and reveal solver-approximate equities in the explanation. "
-                "After the quiz, give a personal comment on what the player should practice next. "
-                "Return as a JSON array: [{question, choices, correct, explanation}], and a final comment."
-            )
-        elif skill_level <= 8:
-            prompt = (
-                "Pose 10 tournament hands (40 bb, 9-max, ICM in play) that test range construction and blocker logic. "
-                "For each, give four nuanced options (e.g., small-bet, over-bet, check-call, check-fold) and in the answer justify with range vs. range equity and blocker effects. "
-                "After the quiz, give a personal comment on what the player should practice next. "
-                "Return as a JSON array: [{question, choices, correct, explanation}], and a final comment."
-            )
-        else:
-            prompt = (
-                "Create 10 solver-style quizzes: 200 bb deep, H2H on the river after a polarising 3-barrel in a 4-bet pot. "
-                "For each, present exact hand ranges in notation, node-lock villain to a 25% over-fold, and ask for the optimal mixed strategy (bet sizes + frequencies) with GTO EV figures. "
-                "Return the solver breakdown in the explanation. "
-                "After the quiz, give a personal comment on what the player should practice next. "
-                "Return as a JSON array: [{question, choices, correct, explanation}], and a final comment."
-            )
-
-        # Skicka prompt till GPT
-        response = openai.ChatCompletion.create(
-            model="gpt-4-turbo",
-            messages=[{"role": "system", "content": "You are a world-class poker coach and quizmaster. Always answer in English and return only valid JSON."},
-                      {"role": "user", "content": prompt}],
+        quiz = local_quiz(data, skill_level)
+        if quiz is not None:
+            return JSONResponse(content=bank_quiz(quiz, skill_level))
+
+        # LLM-quiz: ta en färdig sats ur den varma poolen, generera live
+        # bara om poolen är tom
+        bucket = quiz_bucket(skill_level)
+        quiz = quiz_pool.pop(bucket)
+        if quiz is not None:
+            return JSONResponse(content=bank_quiz({**quiz, "source": "pool"}, skill_level))
+        quiz, raw = await with_disconnect(request, llm_quiz(bucket))
+        if quiz is None:
+            return JSONResponse(content={"error": "Could not parse quiz JSON.", "raw": raw})
+        return JSONResponse(content=bank_quiz({**quiz, "source": "llm"}, skill_level))
+    except ClientDisconnected:
+        return JSONResponse(status_code=499, content={"error": "Client disconnected."})
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+async def stream_llm_quiz(bucket: str, skill_level: int):
+    """SSE från en strömmad completion: varje fråga skickas när dess '}' kommit"""
+    t0 = time.perf_counter()
+    first = None
+    parser = QuizStreamParser()
+    questions = []
+    checks = {"ok": 0, "repaired": 0, "wrong": 0, "unchecked": 0}
+    try:
+        # kopplar klienten ner stängs generatorn, och aclosing stänger då
+        # upstream-anropet direkt
+        deltas = llm.chat_stream(
+            [{"role": "system", "content": QUIZ_SYSTEM},
+             {"role": "user", "content": QUIZ_PROMPTS[bucket].replace("{n}", "10")}],
             max_tokens=1800,
             temperature=0.7,
         )
-        # Försök att hitta JSON i svaret
-        import re, json
-        raw = response["choices"][0]["message"]["content"]
-        try:
-            match = re.search(r'(\[.*\])', raw, re.DOTALL)
-            questions = json.loads(match.group(1)) if match else []
-            comment_match = re.search(r'"final_comment"\s*:\s*"([^"]+)"', raw)
-            final_comment = comment_match.group(1) if comment_match else "Great job!"
-        except Exception:
-            return JSONResponse(content={"error": "Could not parse quiz JSON.", "raw": raw})
-
-        return JSONResponse(content={"questions": questions, "final_comment": final_comment})
+        async with aclosing(deltas):
+            async for delta in deltas:
+                for q in parser.feed(delta):
+                    status, q = verify_question(q)
+                    checks[status] += 1
+                    if q is None:
+                        continue                    # fel facit som inte gick att rätta
+                    q = {**q, "check": status}
+                    questions.append(q)
+                    if first is None:
+                        first = time.perf_counter() - t0
+                    yield sse("question", q)
     except Exception as e:
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        traceback.print_exc()
+        yield sse("error", {"error": str(e)})
+    if not questions:
+        yield sse("error", {"error": "Could not parse quiz JSON."})
+    else:
+        bank_quiz({"questions": questions, "source": "llm"}, skill_level)
+    yield sse("done", {
+        "count": len(questions),
+        "skipped": parser.skipped,
+        "checks": checks,
+        "final_comment": parser.final_comment(),
+        "source": "llm",
+        "first_question_s": None if first is None else round(first, 3),
+        "total_s": round(time.perf_counter() - t0, 3),
+    })
+
+
+def stream_ready_quiz(quiz: dict):
+    """SSE för ett quiz som redan finns (lokalt genererat eller ur poolen)"""
+    for q in quiz["questions"]:
+        yield sse("question", q)
+    yield sse("done", {
+        "count": len(quiz["questions"]),
+        "skipped": 0,
+        "final_comment": quiz.get("final_comment", ""),
+        "source": quiz.get("source", "pool"),
+        "first_question_s": 0.0,
+        "total_s": 0.0,
+    })
+
+
+@app.post("/quiz_stream")
+async def quiz_stream(request: Request):
+    """
+    Samma quiz som /quiz men som Server-Sent Events: 'question' per fråga,
+    sist 'done' med final_comment och tider ('error' om något gick fel).
+    """
+    try:
+        data = await request.json()
+        skill_level = int(data.get("skill_level", 1))
+        quiz = local_quiz(data, skill_level)
+    except (ValueError, TypeError, AttributeError) as e:
+        # ogiltig JSON eller skill_level/seed som inte är heltal
+        return JSONResponse(status_code=400, content={"error": f"Invalid request: {e}"})
+    bucket = quiz_bucket(skill_level)
+    if quiz is None:
+        quiz = quiz_pool.pop(bucket)
+        if quiz is not None:
+            quiz = {**quiz, "source": "pool"}
+    if quiz is not None:
+        events = stream_ready_quiz(bank_quiz(quiz, skill_level))
+    else:
+        events = stream_llm_quiz(bucket, skill_level)
+    return StreamingResponse(events, media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.get("/quiz_pool_stats")
+def quiz_pool_stats():
+    """Pooldjup, påfyllnadstid och träff/miss per nivågrupp"""
+    return JSONResponse(content=quiz_pool.stats())
+
+
+@app.get("/llm_stats")
+def llm_stats():
+    """Pågående, köade och avbrutna upstream-anrop samt snittlatens"""
+    return JSONResponse(content=llm.stats())
+
+
+@app.get("/tts_stats")
+def tts_stats():
+    """TTS-anrop, delade anrop och cacheträffar"""
+    return JSONResponse(content=tts.stats())
+
+
+@app.get("/audio_metrics")
+def audio_metrics_stats():
+    """Röstfrågor: sparade bytes, bortklippt tystnad, avvisade och latens per request"""
+    return JSONResponse(content=audio_metrics.stats())
 
 @app.post("/quiz_static")
 async def quiz_static(request: Request):
+    """
+    Verifierade frågor ur banken för alla nivåer, utan återläggning per
+    session (X-Session-ID eller "session_id"). Fyller på nivån lokalt om
+    banken är tunn.
+    """
     data = await request.json()
-    skill_level = int(data.get("skill_level", 1))
-    if skill_level <= 2:
-        level_key = "1-2"
-    elif skill_level <= 4:
-        level_key = "3-4"
-    else:
-        level_key = "1-2"  # fallback
-    questions = QUIZ_QUESTIONS.get(level_key, [])
-    questions = random.sample(questions, min(10, len(questions)))
+    skill_level = min(max(int(data.get("skill_level", 1)), 1), 10)
+    session_id = data.get("session_id") or request.headers.get("X-Session-ID", "default")
+    n = min(int(data.get("n", 10)), 50)
+    if quiz_bank.count(skill_level, verified=True) < MIN_PER_LEVEL:
+        try:
+            # CPU-tungt (handutvärdering/solverträd) → i en tråd
+            await run_in_threadpool(fill_bank, quiz_bank, skill_level, MIN_PER_LEVEL,
+                                    get_drill_generator())
+        except Exception:
+            traceback.print_exc()
+    questions = quiz_bank.sample(skill_level, n, session_id, topic=data.get("topic"))
     questions_with_answer = [
-        {"question": q["question"], "choices": q["choices"], "answer": q.get("answer"), "explanation": q.get("explanation", "")}
+        {"id": q["id"], "question": q["question"], "choices": q["choices"], "answer": q["correct"],
+         "explanation": q["explanation"], "topic": q["topic"]}
         for q in questions
     ]
     return JSONResponse(content={"questions": questions_with_answer})
 
-@app.post("/quiz_feedback")
-async def quiz_feedback(request: Request):
-    data = await request.json()
-    user_answers = data.get("answers", [])
-    skill_level = int(data.get("skill_level", 1))
-    if skill_level <= 2:
-        level_key = "1-2"
-    elif skill_level <= 4:
-        level_key = "3-4"
-    else:
-        level_key = "1-2"  # fallback
-    correct_questions = QUIZ_QUESTIONS.get(level_key, [])
-    correct_dict = {q["question"]: q["answer"] for q in correct_questions}
-    score = 0
-    for ans in user_answers:
-        q = ans.get("question")
-        user_a = ans.get("user_answer")
-        if q in correct_dict and user_a == correct_dict[q]:
-            score += 1
-    prompt = (
-        "A poker player just completed a quiz. Here are the questions, their answers, and which were correct or incorrect. "
-        "Give a concise, personal feedback (max 3-4 sentences, max 200 tokens). Do NOT use bold text. Use clear paragraph breaks (\n\n) for each new thought or topic. Focus on the most important improvement points.\n" +
-        str(user_answers)
-    )
-    response = openai.ChatCompletion.create(
-        model="gpt-4-turbo",
-        messages=[{"role": "system", "content": "You are a world-class poker coach. Always answer in English."},
-                  {"role": "user", "content": prompt}],
+async def feedback_completion(prompt: str) -> str:
+    answer = await llm.chat(
+        [{"role": "system", "content": "You are a world-class poker coach. Always answer in English."},
+         {"role": "user", "content": prompt}],
         max_tokens=200,
         temperature=0.7,
     )
-    feedback = response["choices"][0]["message"]["content"].strip()
-    return JSONResponse(content={"feedback": feedback, "score": score})
\ No newline at end of file
+    return answer.strip()
+
+
+# Kommentarer cachas per svarsmönster och genereras i bakgrunden
+feedback_cache = FeedbackCache(feedback_completion)
+
+
+@app.post("/quiz_feedback")
+async def quiz_feedback(request: Request, background_tasks: BackgroundTasks):
+    """
+    Poäng och rätt/fel per fråga direkt, plus feedback_id. Kommentaren
+    hämtas med GET /quiz_feedback/{id} eller /quiz_feedback/{id}/stream
+    (finns den redan i cachen kommer den direkt i svaret).
+    """
+    data = await request.json()
+    user_answers = data.get("answers", [])
+    # rätta per id mot banken; äldre klienter som bara skickar frågetexten slås upp på texten
+    ids = [ans.get("id") or quiz_bank.id_for_text(ans.get("question", "")) for ans in user_answers]
+    answer_key = quiz_bank.answer_key(i for i in ids if i)
+    results = []
+    for qid, ans in zip(ids, user_answers):
+        correct = answer_key.get(qid)
+        results.append({
+            "id": qid,
+            "question": ans.get("question", ""),
+            "user_answer": ans.get("user_answer"),
+            "correct_answer": correct,
+            "correct": None if correct is None else ans.get("user_answer") == correct,
+        })
+    score = sum(1 for r in results if r["correct"])
+
+    pattern = answer_pattern([(r["id"] or r["question"], r["correct"]) for r in results])
+    feedback_id, feedback, start = feedback_cache.submit(pattern)
+    if start:
+        # prompten byggs bara ur mönstret (fråga, facit, rätt/fel) så att den kan delas
+        lines = [
+            f"- {r['question']} (correct answer: {r['correct_answer']}) -> "
+            + {True: "answered correctly", False: "answered incorrectly", None: "not scored"}[r["correct"]]
+            for r in results
+        ]
+        prompt = (
+            "A poker player just completed a quiz. Here are the questions, their answers, and which were correct or incorrect. "
+            "Give a concise, personal feedback (max 3-4 sentences, max 200 tokens). Do NOT use bold text. Use clear paragraph breaks (\n\n) for each new thought or topic. Focus on the most important improvement points.\n" +
+            "\n".join(lines)
+        )
+        background_tasks.add_task(feedback_cache.run, pattern, prompt)
+    return JSONResponse(content={
+        "score": score,
+        "total": len(results),
+        "results": [{k: r[k] for k in ("id", "user_answer", "correct_answer", "correct")} for r in results],
+        "feedback_id": feedback_id,
+        "feedback": feedback,
+        "status": "ready" if feedback is not None else "pending",
+    })
+
+
+@app.get("/quiz_feedback/{feedback_id}")
+def quiz_feedback_status(feedback_id: str):
+    state = feedback_cache.get(feedback_id)
+    if state is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown feedback_id."})
+    return JSONResponse(content={"feedback_id": feedback_id, **state})
+
+
+@app.get("/quiz_feedback/{feedback_id}/stream")
+async def quiz_feedback_stream(feedback_id: str):
+    """SSE: ett 'feedback'-event när kommentaren är klar (eller 'error')"""
+    async def events():
+        state = await feedback_cache.wait(feedback_id)
+        if state is None:
+            yield sse("error", {"error": "Unknown feedback_id."})
+        elif state["status"] == "ready":
+            yield sse("feedback", {"feedback_id": feedback_id, "feedback": state["feedback"]})
+        else:
+            yield sse("error", {"feedback_id": feedback_id, "error": state.get("error", "Timed out.")})
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
\ No newline at end of file
@@ -0,0 +1,307 @@
+"""
+quiz_bank.py – SQLite-frågebank för quiz (ersätter QUIZ_QUESTIONS)
+
+• En rad per fråga med stabilt id (quiz_gen.quiz_id: hash av fråga + svar),
+  nivå, ämne, källa och verified-flagga
+• Index (level, verified, rnd) resp. (level, verified, topic, rnd) →
+  slumpurval per nivå (/quiz_static) eller nivå + ämne utan ORDER BY
+  random(): börja på ett slumpat rnd och läs framåt i indexet (med
+  wrap-around); check_plans() kontrollerar att ingen av dem sorterar
+• served-tabellen håller vilka frågor en session redan sett → urval utan
+  återläggning; när nivån är slut för sessionen börjar den om
+• Rättning är en primärnyckel-uppslagning per id
+• fill() fyller nivå 1–4 ur quiz_gen och 5–10 ur range_drills (facit
+  räknat lokalt → verified=1); LLM-frågor sparas med verified=0 och
+  serveras inte av /quiz_static
+
+    python quiz_bank.py --fill 2000        # frågor per nivå
+    python quiz_bank.py                    # statistik
+    python quiz_bank.py --plans            # frågeplanerna för urvalet
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from quiz_gen import QuizGenerator, quiz_id
+
+BANK_PATH = Path(__file__).resolve().parent / "data" / "quiz_bank.db"
+
+MIN_PER_LEVEL = 200         # /quiz_static fyller på nivån lokalt under detta
+RND_SPACE = 1 << 31
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    id          TEXT PRIMARY KEY,
+    level       INTEGER NOT NULL,
+    topic       TEXT NOT NULL,
+    question    TEXT NOT NULL,
+    choices     TEXT NOT NULL,          -- JSON-lista
+    correct     TEXT NOT NULL,
+    explanation TEXT NOT NULL DEFAULT '',
+    source      TEXT NOT NULL,
+    verified    INTEGER NOT NULL DEFAULT 0,
+    rnd         INTEGER NOT NULL,
+    created     REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_questions_sample ON questions(level, verified, topic, rnd);
+CREATE INDEX IF NOT EXISTS idx_questions_level ON questions(level, verified, rnd);
+CREATE INDEX IF NOT EXISTS idx_questions_text ON questions(question);
+
+CREATE TABLE IF NOT EXISTS served (
+    session     TEXT NOT NULL,
+    question_id TEXT NOT NULL,
+    level       INTEGER NOT NULL,
+    PRIMARY KEY (session, question_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_served_level ON served(session, level);
+"""
+
+# de gamla hårdkodade QUIZ_QUESTIONS, nu startinnehåll i banken
+STARTER_QUESTIONS = [
+    (1, "showdown", {
+        "question": "Which hand wins at showdown: A♣ K♦ 8♠ 8♥ 3♣ or K♣ Q♠ Q♥ 10♦ 4♣?",
+        "choices": ["A♣ K♦ 8♠ 8♥ 3♣", "K♣ Q♠ Q♥ 10♦ 4♣"],
+        "correct": "K♣ Q♠ Q♥ 10♦ 4♣",
+        "explanation": "A pair of queens beats a pair of eights.",
+    }),
+    (3, "pot_odds", {
+        "question": "You face a half-pot bet of 50 $ into 100 $. How often must you win to break even on a call?",
+        "choices": ["25 %", "33 %", "40 %", "50 %"],
+        "correct": "25 %",
+        "explanation": "You call 50 $ to win 150 $, so you need 50 / 200 = 25 %.",
+    }),
+]
+
+
+def sample_sql(topic: bool, wrap: bool) -> str:
+    """Urvalsfrågan: från ett slumpat rnd och framåt (wrap: från början dit)"""
+    cond = "level = ? AND verified = 1" + (" AND topic = ?" if topic else "")
+    cond += " AND rnd < ?" if wrap else " AND rnd >= ?"
+    return f"""SELECT id, topic, question, choices, correct, explanation FROM questions
+                WHERE {cond} AND NOT EXISTS (
+                    SELECT 1 FROM served s WHERE s.session = ? AND s.question_id = questions.id)
+                ORDER BY rnd LIMIT ?"""
+
+
+class QuizBank:
+    def __init__(self, path: Path = BANK_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.rng = random.Random()
+        if self.count() == 0:
+            for level, topic, q in STARTER_QUESTIONS:
+                self.add([q], level, topic=topic, source="static", verified=True)
+
+    # --- skriva ---------------------------------------------------------------
+    def add(self, questions: Iterable[Dict], level: int, topic: Optional[str] = None,
+            source: str = "generated", verified: bool = False) -> int:
+        """Lägg in frågor (id = quiz_id om det saknas); befintliga id lämnas orörda"""
+        now = time.time()
+        rows = []
+        for q in questions:
+            qid = q.get("id") or quiz_id(q["question"], q["correct"])
+            rows.append((qid, level, q.get("topic") or topic or "general", q["question"],
+                         json.dumps(q["choices"], ensure_ascii=False), q["correct"],
+                         q.get("explanation", ""), source, int(verified),
+                         self.rng.randrange(RND_SPACE), now))
+        with self.lock:
+            before = self.conn.total_changes
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO questions VALUES (?,?,?,?,?,?,?,?,?,?,?)", rows)
+            self.conn.execute("COMMIT")
+            return self.conn.total_changes - before
+
+    def set_verified(self, ids: Iterable[str], verified: bool = True) -> None:
+        with self.lock:
+            self.conn.executemany("UPDATE questions SET verified = ? WHERE id = ?",
+                                  [(int(verified), i) for i in ids])
+
+    # --- läsa -----------------------------------------------------------------
+    def count(self, level: Optional[int] = None, verified: Optional[bool] = None) -> int:
+        sql, args = "SELECT COUNT(*) FROM questions WHERE 1", []
+        if level is not None:
+            sql += " AND level = ?"
+            args.append(level)
+        if verified is not None:
+            sql += " AND verified = ?"
+            args.append(int(verified))
+        with self.lock:
+            return self.conn.execute(sql, args).fetchone()[0]
+
+    def _pick_from(self, level: int, topic: Optional[str], session: str,
+                   start: int, n: int, wrap: bool) -> List[tuple]:
+        args: list = [level] + ([topic] if topic is not None else []) + [start, session, n]
+        return self.conn.execute(sample_sql(topic is not None, wrap), args).fetchall()
+
+    def sample(self, level: int, n: int = 10, session: str = "default",
+               topic: Optional[str] = None) -> List[Dict]:
+        """n verifierade frågor för nivån som sessionen inte sett (börjar om när slut)"""
+        with self.lock:
+            rows = self._pick(level, topic, session, n)
+            if len(rows) < n:
+                # allt sett → börja om, men utan frågorna som redan valts nu
+                self.conn.execute("DELETE FROM served WHERE session = ? AND level = ?",
+                                  (session, level))
+                self._mark(session, level, rows)
+                rows += self._pick(level, topic, session, n - len(rows))
+            self._mark(session, level, rows)
+        return [{"id": r[0], "topic": r[1], "question": r[2], "choices": json.loads(r[3]),
+                 "correct": r[4], "explanation": r[5]} for r in rows]
+
+    def _pick(self, level: int, topic: Optional[str], session: str, n: int) -> List[tuple]:
+        start = self.rng.randrange(RND_SPACE)
+        rows = self._pick_from(level, topic, session, start, n, wrap=False)
+        if len(rows) < n:
+            rows += self._pick_from(level, topic, session, start, n - len(rows), wrap=True)
+        return rows
+
+    def _mark(self, session: str, level: int, rows: List[tuple]) -> None:
+        self.conn.execute("BEGIN")
+        self.conn.executemany("INSERT OR IGNORE INTO served VALUES (?,?,?)",
+                              [(session, r[0], level) for r in rows])
+        self.conn.execute("COMMIT")
+
+    def answer_key(self, ids: Iterable[str]) -> Dict[str, str]:
+        """id → rätt svar (okända id saknas i resultatet)"""
+        out = {}
+        with self.lock:
+            for qid in ids:
+                row = self.conn.execute("SELECT correct FROM questions WHERE id = ?",
+                                        (qid,)).fetchone()
+                if row is not None:
+                    out[qid] = row[0]
+        return out
+
+    def id_for_text(self, question: str) -> Optional[str]:
+        """Bakåtkompatibelt: id för en fråga som bara skickats som text"""
+        with self.lock:
+            row = self.conn.execute("SELECT id FROM questions WHERE question = ? LIMIT 1",
+                                    (question,)).fetchone()
+        return row[0] if row else None
+
+    def unverified(self, limit: Optional[int] = None) -> List[Dict]:
+        """Overifierade frågor: [{level, source, question: {id, question, …}}]"""
+        sql = ("SELECT id, level, topic, question, choices, correct, explanation, source "
+               "FROM questions WHERE verified = 0")
+        with self.lock:
+            rows = self.conn.execute(sql + (f" LIMIT {int(limit)}" if limit else "")).fetchall()
+        return [{"level": r[1], "source": r[7],
+                 "question": {"id": r[0], "topic": r[2], "question": r[3],
+                              "choices": json.loads(r[4]), "correct": r[5],
+                              "explanation": r[6]}} for r in rows]
+
+    def apply_checks(self, rows: List[Dict], results) -> Dict[str, int]:
+        """
+        Utfall från quiz_verify för rader ur unverified(): ok → verifierad,
+        repaired → ersätts av den rättade frågan, wrong → tas bort.
+        """
+        counts = {"ok": 0, "repaired": 0, "wrong": 0, "unchecked": 0}
+        ok, drop = [], []
+        for row, (status, q) in zip(rows, results):
+            counts[status] += 1
+            if status == "ok":
+                ok.append(row["question"]["id"])
+            elif status in ("repaired", "wrong"):
+                drop.append(row["question"]["id"])
+            if status == "repaired":
+                self.add([q], row["level"], source=row["source"], verified=True)
+        self.set_verified(ok)
+        with self.lock:
+            self.conn.executemany("DELETE FROM questions WHERE id = ?", [(i,) for i in drop])
+        return counts
+
+    def stats(self) -> Dict:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT level, source, verified, COUNT(*) FROM questions "
+                "GROUP BY level, source, verified ORDER BY level").fetchall()
+        out: Dict[int, Dict[str, int]] = {}
+        for level, source, verified, n in rows:
+            key = source if verified else f"{source} (unverified)"
+            out.setdefault(level, {})[key] = n
+        return out
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+# ------------------------------------------------------------
+#  FRÅGEPLANER
+# ------------------------------------------------------------
+def check_plans(conn: sqlite3.Connection) -> List[str]:
+    """
+    EXPLAIN QUERY PLAN för urvalsfrågorna (med/utan ämne, före/efter wrap) →
+    namnen på de som skannar tabellen eller sorterar (tom lista = allt OK)
+    """
+    bad = []
+    for topic in (False, True):
+        for wrap in (False, True):
+            sql = sample_sql(topic, wrap)
+            plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}",
+                                                   [None] * sql.count("?"))]
+            ok = not any(step.startswith("SCAN ") or "TEMP B-TREE" in step for step in plan)
+            name = f"sample{'_topic' if topic else ''}{'_wrap' if wrap else ''}"
+            print(f"{'OK ' if ok else 'FEL'}  {name:<18} {' | '.join(plan)}")
+            if not ok:
+                bad.append(name)
+    return bad
+
+
+# ------------------------------------------------------------
+#  PÅFYLLNING
+# ------------------------------------------------------------
+def fill(bank: QuizBank, level: int, n: int, drills=None) -> int:
+    """Generera n lokala frågor för nivån (quiz_gen / range_drills) → antal nya"""
+    if level <= 4:
+        questions = QuizGenerator().generate(level, n)
+        source = "generated"
+    else:
+        if drills is None:
+            from range_drills import DrillGenerator
+            drills = DrillGenerator.load()
+        questions = drills.generate(level, n)
+        source = "solver"
+    return bank.add(questions, level, source=source, verified=True)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Fyll på eller visa quiz-banken")
+    ap.add_argument("--fill", type=int, default=0, help="frågor att generera per nivå")
+    ap.add_argument("--levels", default="1-10")
+    ap.add_argument("--db", type=Path, default=BANK_PATH)
+    ap.add_argument("--plans", action="store_true", help="kontrollera urvalets frågeplaner")
+    args = ap.parse_args()
+
+    bank = QuizBank(args.db)
+    if args.plans:
+        bad = check_plans(bank.conn)
+        if bad:
+            raise SystemExit(f"{len(bad)} urvalsfråga(or) skannar eller sorterar: {', '.join(bad)}")
+        raise SystemExit(0)
+    if args.fill:
+        lo, hi = (int(x) for x in args.levels.split("-"))
+        drills = None
+        if hi >= 5:
+            from range_drills import DrillGenerator
+            drills = DrillGenerator.load()
+        for level in range(lo, hi + 1):
+            t0 = time.perf_counter()
+            added = fill(bank, level, args.fill, drills)
+            print(f"nivå {level:2d}: +{added} frågor ({time.perf_counter() - t0:.2f} s)")
+    for level, counts in bank.stats().items():
+        print(f"nivå {level:2d}: " + ", ".join(f"{k} {v}" for k, v in counts.items()))
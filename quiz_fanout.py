@@ -0,0 +1,114 @@
+"""
+quiz_fanout.py – ett LLM-quiz genererat som flera små parallella anrop
+
+Svarstiden för en completion växer med antalet utdata-tokens, så ett
+quiz på 10 frågor i ett anrop är den långsammaste formen. fan_out delar
+upp det i SHARDS anrop à QUESTIONS_PER_SHARD frågor som körs samtidigt:
+
+• Varje shard har en egen timeout; shards som inte hunnit klart eller
+  som fallerar hoppas över → delresultat i stället för fel
+• Frågor deduplikeras över shards på normaliserad frågetext
+• Svaren tolkas med quiz_stream.parse_questions (trasiga frågor faller
+  bort, resten behålls)
+• Väggtiden blir ungefär den för den långsammaste klara sharden
+• Shards är asyncio-tasks; de som inte hunnit klart avbryts (HTTP-anropet
+  stängs) i stället för att få löpa ut i bakgrunden
+
+Själva anropet skickas in som en korutin-funktion (prompt, n) → rå text, så
+modulen vet inget om OpenAI.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+import traceback
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from quiz_stream import DEFAULT_COMMENT, parse_questions
+
+SHARDS = 5
+QUESTIONS_PER_SHARD = 2
+SHARD_TIMEOUT_S = 30.0
+
+
+def _norm(text: str) -> str:
+    return re.sub(r"\W+", " ", text.lower()).strip()
+
+
+def shard_prompt(template: str, n: int, shard: int, shards: int) -> str:
+    """Prompt med {n} frågor; varje shard ombeds välja andra situationer"""
+    prompt = template.replace("{n}", str(n))
+    if shards > 1:
+        prompt += (f" This is part {shard + 1} of {shards} of the quiz: cover different "
+                   f"situations than the other parts (vary positions, stack sizes and boards).")
+    return prompt
+
+
+async def fan_out(complete: Callable[[str, int], Awaitable[str]], template: str,
+                  n_questions: int = SHARDS * QUESTIONS_PER_SHARD,
+                  per_shard: int = QUESTIONS_PER_SHARD,
+                  timeout: float = SHARD_TIMEOUT_S) -> Dict:
+    """
+    Kör shards parallellt → {questions, final_comment, partial, shards, raw}.
+    questions kan vara färre än n_questions (och tom) om shards fallerat.
+    """
+    per_shard = max(1, per_shard)
+    shards = -(-n_questions // per_shard)
+    sizes = [min(per_shard, n_questions - i * per_shard) for i in range(shards)]
+
+    t0 = time.perf_counter()
+    tasks = {
+        asyncio.ensure_future(complete(shard_prompt(template, size, i, shards), size)): i
+        for i, size in enumerate(sizes)
+    }
+    results: List[Optional[str]] = [None] * shards
+    status = ["timeout"] * shards
+    latency: List[Optional[float]] = [None] * shards
+    pending = set(tasks)
+    deadline = t0 + timeout
+    try:
+        while pending:
+            left = deadline - time.perf_counter()
+            if left <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=left,
+                                               return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                i = tasks[t]
+                latency[i] = round(time.perf_counter() - t0, 3)
+                try:
+                    results[i] = t.result()
+                    status[i] = "ok"
+                except Exception:
+                    traceback.print_exc()
+                    status[i] = "error"
+    finally:
+        for t in pending:
+            t.cancel()                      # även när anroparen själv avbryts
+
+    questions, seen, comment = [], set(), None
+    for i, raw in enumerate(results):       # shard-ordning, inte klar-ordning
+        if raw is None:
+            continue
+        shard_questions, shard_comment = parse_questions(raw)
+        if not shard_questions:
+            status[i] = "invalid"
+        for q in shard_questions[: sizes[i]]:
+            key = _norm(q["question"])
+            if key not in seen:
+                seen.add(key)
+                questions.append(q)
+        if comment is None and shard_comment != DEFAULT_COMMENT:
+            comment = shard_comment
+
+    return {
+        "questions": questions[:n_questions],
+        "final_comment": comment or DEFAULT_COMMENT,
+        "partial": any(s != "ok" for s in status) or len(questions) < n_questions,
+        "shards": [{"status": s, "questions": sizes[i], "latency_s": latency[i]}
+                   for i, s in enumerate(status)],
+        "raw": "\n\n".join(r for r in results if r),
+        "elapsed_s": round(time.perf_counter() - t0, 3),
+    }
@@ -0,0 +1,127 @@
+"""
+quiz_feedback.py – LLM-kommentar på quizresultat, i bakgrunden och cachad
+
+/quiz_feedback svarar direkt med poäng och rätt/fel per fråga plus ett
+feedback_id; kommentaren genereras efteråt och hämtas med polling eller SSE.
+
+• Nyckeln är svarsmönstret: vilka frågor (id) som var rätt resp. fel.
+  Prompten byggs bara ur mönstret, så samma mönster ger samma kommentar
+  och LLM:en anropas en gång per mönster (många missar samma frågor)
+• Samtidiga förfrågningar med samma mönster delar ett anrop (single-flight)
+• Cachen är en LRU i minnet (CACHE_SIZE mönster, lika många senaste fel);
+  feedback_id lever JOB_TTL_S sekunder. Har mönstrets kommentar hunnit
+  trängas ut ur LRU:n är jobbet expired – klienten skickar in quizet igen
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+CACHE_SIZE = 2000
+JOB_TTL_S = 3600.0
+WAIT_POLL_S = 0.1
+
+PENDING, READY, ERROR, EXPIRED = "pending", "ready", "error", "expired"
+
+
+def answer_pattern(results: List[Tuple[str, Optional[bool]]]) -> str:
+    """[(id, rätt?)] → stabil nyckel oberoende av ordning"""
+    items = sorted(f"{qid}:{'-' if ok is None else int(ok)}" for qid, ok in results)
+    return hashlib.sha1("|".join(items).encode("utf-8")).hexdigest()[:16]
+
+
+class FeedbackCache:
+    def __init__(self, generate: Callable[[str], Awaitable[str]], size: int = CACHE_SIZE):
+        self.generate = generate
+        self.size = size
+        self.cache: "OrderedDict[str, str]" = OrderedDict()   # mönster → kommentar
+        self.pending: Dict[str, float] = {}                   # mönster → starttid
+        self.failed: "OrderedDict[str, str]" = OrderedDict()  # mönster → fel (senaste size)
+        self.jobs: Dict[str, Tuple[str, float]] = {}          # feedback_id → (mönster, skapad)
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def submit(self, pattern: str) -> Tuple[str, Optional[str], bool]:
+        """
+        Registrera en förfrågan → (feedback_id, kommentar om den redan finns,
+        om anroparen ska starta genereringen).
+        """
+        feedback_id = uuid.uuid4().hex[:16]
+        now = time.time()
+        with self.lock:
+            self._expire(now)
+            self.jobs[feedback_id] = (pattern, now)
+            if pattern in self.cache:
+                self.cache.move_to_end(pattern)
+                self.hits += 1
+                return feedback_id, self.cache[pattern], False
+            self.misses += 1
+            if pattern in self.pending:
+                return feedback_id, None, False         # någon annan genererar redan
+            self.pending[pattern] = now
+            self.failed.pop(pattern, None)
+            return feedback_id, None, True
+
+    async def run(self, pattern: str, prompt: str) -> None:
+        """Bakgrundsjobb: generera och cacha kommentaren för mönstret"""
+        try:
+            text = await self.generate(prompt)
+        except Exception as e:
+            traceback.print_exc()
+            with self.lock:
+                self.pending.pop(pattern, None)
+                self.failed[pattern] = str(e)
+                self.failed.move_to_end(pattern)
+                while len(self.failed) > self.size:
+                    self.failed.popitem(last=False)
+            return
+        with self.lock:
+            self.pending.pop(pattern, None)
+            self.cache[pattern] = text
+            self.cache.move_to_end(pattern)
+            while len(self.cache) > self.size:
+                self.cache.popitem(last=False)
+
+    def get(self, feedback_id: str) -> Optional[Dict]:
+        """{status, feedback[, error]} eller None om id:t är okänt/utgånget"""
+        with self.lock:
+            job = self.jobs.get(feedback_id)
+            if job is None:
+                return None
+            pattern = job[0]
+            if pattern in self.cache:
+                return {"status": READY, "feedback": self.cache[pattern]}
+            if pattern in self.failed:
+                return {"status": ERROR, "feedback": None, "error": self.failed[pattern]}
+            if pattern in self.pending:
+                return {"status": PENDING, "feedback": None}
+            # kommentaren har trängts ut ur LRU:n – ingen genererar den längre
+            return {"status": EXPIRED, "feedback": None,
+                    "error": "Feedback expired from the cache; submit the quiz again."}
+
+    async def wait(self, feedback_id: str, timeout: float = 60.0) -> Optional[Dict]:
+        """Vänta (utan att blockera event-loopen) tills kommentaren är klar"""
+        deadline = time.monotonic() + timeout
+        while True:
+            state = self.get(feedback_id)
+            if state is None or state["status"] != PENDING or time.monotonic() >= deadline:
+                return state
+            await asyncio.sleep(WAIT_POLL_S)
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {"cached": len(self.cache), "pending": len(self.pending),
+                    "jobs": len(self.jobs), "hits": self.hits, "misses": self.misses}
+
+    def _expire(self, now: float) -> None:
+        old = [fid for fid, (_, t) in self.jobs.items() if now - t > JOB_TTL_S]
+        for fid in old:
+            del self.jobs[fid]
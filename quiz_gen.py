@@ -0,0 +1,262 @@
+"""
+quiz_gen.py – procedurellt genererade quizfrågor för nivå 1–4 (ingen LLM)
+
+Nivå 1–2: vilken hand vinner vid showdown? Två femkortshänder delas ut och
+rankas med data/db/hand_eval.py (nivå 1: olika handtyper, nivå 2: ofta samma
+handtyp så att kickern avgör, ibland split pot).
+
+Nivå 3–4: pot odds. Break-even-equity för ett call = bet / (pot + 2·bet),
+exakt aritmetik. Nivå 4 blandar in beslut med outs på turn (equity =
+outs / 46).
+
+Generatorn är seedad och deduplicerar på frågans innehåll (stabilt id), och
+gör tusentals frågor per sekund. Format: {id, question, choices, correct,
+explanation} – samma som LLM-prompten i /quiz ber om.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import random
+import sys
+from fractions import Fraction
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "data" / "db"))
+
+from hand_eval import category, rank5  # noqa: E402
+
+RANK_LABELS = "23456789TJQKA"
+SUIT_SYMBOLS = "♣♦♥♠"             # samma ordning som combos.SUITS = "cdhs"
+# hand_eval.CATEGORY_NAMES med artikel, för förklaringstexterna
+CATEGORY_PHRASES = ["high card", "a pair", "two pair", "three of a kind", "a straight",
+                    "a flush", "a full house", "four of a kind", "a straight flush"]
+
+SPLIT_POT = "Split pot"
+OUTS_MARGIN = Fraction(3, 100)   # outs-frågor närmare break-even än så är tvetydiga
+
+# bet-storlekar som andel av potten (nivå 3–4)
+BET_SIZES = [Fraction(1, 4), Fraction(1, 3), Fraction(1, 2), Fraction(2, 3),
+             Fraction(3, 4), Fraction(1), Fraction(3, 2), Fraction(2)]
+
+# (outs, beskrivning) för nivå 4
+DRAWS = [
+    (9, "a flush draw"),
+    (8, "an open-ended straight draw"),
+    (4, "a gutshot straight draw"),
+    (15, "a flush draw plus an open-ended straight draw"),
+    (12, "a flush draw plus a gutshot"),
+    (6, "two overcards"),
+]
+
+# avslutande kommentar per nivå (ersätter LLM:ens "final comment")
+FINAL_COMMENTS = {
+    1: "Nice work! Keep drilling the hand rankings until they are automatic: "
+       "flush beats straight, full house beats flush.",
+    2: "Good job! Next, practice close showdowns where the kicker decides.",
+    3: "Well played! Memorise the common break-even numbers: "
+       "half pot = 25 %, pot = 33 %.",
+    4: "Great! Practice counting outs and comparing your equity with the price "
+       "you are offered.",
+}
+
+
+# ------------------------------------------------------------
+#  FORMATERING
+# ------------------------------------------------------------
+def card_label(card: int) -> str:
+    """Kort-index (2c = 0 … As = 51) → 'A♠', '10♦'"""
+    r = RANK_LABELS[card // 4]
+    return ("10" if r == "T" else r) + SUIT_SYMBOLS[card % 4]
+
+
+def hand_label(cards) -> str:
+    """Femkortshand, högst rank först: 'A♣ K♦ 8♠ 8♥ 3♣'"""
+    return " ".join(card_label(c) for c in sorted(cards, key=lambda c: (-(c // 4), -(c % 4))))
+
+
+def _signature(cards) -> List[int]:
+    """Ranker i avgörande ordning: efter antal, sedan rank (hjulet A-5 → 5 högst)"""
+    ranks = sorted((c // 4 for c in cards), reverse=True)
+    if ranks == [12, 3, 2, 1, 0]:
+        ranks = [3, 2, 1, 0, -1]
+    counts = {r: ranks.count(r) for r in ranks}
+    return sorted(set(ranks), key=lambda r: (counts[r], r), reverse=True)
+
+
+def _decider(cat: int, k: int) -> str:
+    """Vad som avgör när två händer av samma typ skiljer sig på plats k i _signature"""
+    named = {
+        (1, 0): "pair", (2, 0): "top pair", (2, 1): "second pair",
+        (3, 0): "three of a kind", (4, 0): "straight", (6, 0): "three of a kind",
+        (6, 1): "pair", (7, 0): "four of a kind", (8, 0): "straight",
+    }
+    if (cat, k) in named:
+        return named[(cat, k)]
+    return "highest card" if k == 0 else "kicker"
+
+
+def _rank_word(r: int) -> str:
+    return RANK_LABELS[r].replace("T", "10") if r >= 0 else "A"
+
+
+def quiz_id(question: str, correct: str) -> str:
+    return hashlib.sha1(f"{question}\n{correct}".encode("utf-8")).hexdigest()[:12]
+
+
+def quiz_item(question: str, choices: List[str], correct: str,
+              explanation: str, topic: str) -> Dict:
+    return {
+        "id": quiz_id(question, correct),
+        "question": question,
+        "choices": choices,
+        "correct": correct,
+        "explanation": explanation,
+        "topic": topic,
+    }
+
+
+def _pct(x: float) -> str:
+    return f"{round(x * 100)} %"
+
+
+# ------------------------------------------------------------
+#  GENERATOR
+# ------------------------------------------------------------
+class QuizGenerator:
+    def __init__(self, seed: Optional[int] = None):
+        self.rng = random.Random(seed)
+        self.np_rng = np.random.default_rng(seed)
+
+    @staticmethod
+    def _unique(n: int, make, exclude: Optional[set] = None,
+                max_rounds: int = 50) -> List[Dict]:
+        """
+        n frågor med unika id (och inga id ur exclude). Ger upp efter
+        max_rounds satser utan nya frågor → kan returnera färre än n.
+        """
+        seen = set(exclude or ())
+        out: List[Dict] = []
+        stale = 0
+        while len(out) < n and stale < max_rounds:
+            before = len(out)
+            for item in make():
+                if item["id"] not in seen:
+                    seen.add(item["id"])
+                    out.append(item)
+                    if len(out) == n:
+                        break
+            stale = stale + 1 if len(out) == before else 0
+        return out
+
+    # --- nivå 1–2: showdown -------------------------------------------------
+    def _showdown_batch(self, level: int, size: int = 256) -> List[Dict]:
+        deals = np.argsort(self.np_rng.random((size, 52)), axis=1)[:, :10]
+        a, b = deals[:, :5], deals[:, 5:]
+        ra, rb = rank5(a), rank5(b)
+        ca, cb = category(ra), category(rb)
+        if level <= 1:
+            keep = ca != cb
+        else:
+            keep = ca == cb                     # samma handtyp → kickern avgör
+        items = []
+        for i in np.flatnonzero(keep):
+            items.append(self._showdown_item(a[i], b[i], int(ra[i]), int(rb[i]),
+                                             int(ca[i]), int(cb[i])))
+        return items
+
+    def _showdown_item(self, a, b, ra: int, rb: int, ca: int, cb: int) -> Dict:
+        la, lb = hand_label(a), hand_label(b)
+        question = f"Which hand wins at showdown: {la} or {lb}?"
+        choices = [la, lb, SPLIT_POT]
+        if ra == rb:
+            correct = SPLIT_POT
+            explanation = (f"Both hands make {CATEGORY_PHRASES[ca]} with the same "
+                           f"ranks, so the pot is split.")
+        else:
+            (w, lw, cw), (l, ll, cl) = ((a, la, ca), (b, lb, cb)) if ra > rb else ((b, lb, cb), (a, la, ca))
+            correct = lw
+            if cw != cl:
+                explanation = (f"{lw} makes {CATEGORY_PHRASES[cw]}, which beats "
+                               f"{CATEGORY_PHRASES[cl]}.")
+            else:
+                sw, sl = _signature(w), _signature(l)
+                k = next(i for i, (x, y) in enumerate(zip(sw, sl)) if x != y)
+                explanation = (f"Both hands make {CATEGORY_PHRASES[cw]}; {lw} wins on the "
+                               f"{_decider(cw, k)}: {_rank_word(sw[k])} beats "
+                               f"{_rank_word(sl[k])}.")
+        return quiz_item(question, choices, correct, explanation, "showdown")
+
+    # --- nivå 3–4: pot odds -------------------------------------------------
+    def _bet(self, sizes: List[Fraction]) -> tuple:
+        """(pot, bet) i hela dollar"""
+        while True:
+            pot = self.rng.randrange(20, 1001, 10)
+            bet = pot * self.rng.choice(sizes)
+            if bet.denominator == 1:
+                return pot, int(bet)
+
+    def _pot_odds_item(self) -> Dict:
+        pot, bet = self._bet(BET_SIZES)
+        need = Fraction(bet, pot + 2 * bet)
+        wrong = {Fraction(bet, pot + bet), Fraction(bet, pot),
+                 need + Fraction(1, 10), need - Fraction(1, 10)}
+        labels = {_pct(float(need))}
+        for w in sorted(wrong, key=lambda x: abs(x - need)):
+            if 0 < w < 1 and len(labels) < 4:
+                labels.add(_pct(float(w)))
+        if len(labels) < 4:
+            return self._pot_odds_item()                # sällsynt: avrundning krockar
+        choices = sorted(labels, key=lambda s: int(s.split()[0]))
+        question = (f"You face a bet of {bet} $ into a pot of {pot} $. How often must you "
+                    f"win to break even on a call?")
+        explanation = (f"You call {bet} $ to win {pot + bet} $, so you need "
+                       f"{bet} / ({pot} + 2·{bet}) = {bet}/{pot + 2 * bet} ≈ {_pct(float(need))}.")
+        return quiz_item(question, choices, _pct(float(need)), explanation, "pot_odds")
+
+    def _outs_item(self) -> Dict:
+        outs, draw = self.rng.choice(DRAWS)
+        equity = Fraction(outs, 46)
+        pot, bet = self._bet(BET_SIZES[:6])
+        need = Fraction(bet, pot + 2 * bet)
+        if abs(equity - need) < OUTS_MARGIN:               # för nära – tvetydig
+            return self._outs_item()
+        correct = "Call" if equity > need else "Fold"
+        question = (f"On the turn you have {draw} ({outs} outs). Villain bets {bet} $ into "
+                    f"{pot} $ and is all-in. Call or fold?")
+        explanation = (f"With one card to come your equity is {outs}/46 ≈ {_pct(float(equity))}; "
+                       f"the call needs {bet}/{pot + 2 * bet} ≈ {_pct(float(need))}, so "
+                       f"{correct.lower()}.")
+        return quiz_item(question, ["Fold", "Call"], correct, explanation, "outs")
+
+    # --- publikt ------------------------------------------------------------
+    def generate(self, level: int, n: int = 10,
+                 exclude: Optional[set] = None) -> List[Dict]:
+        """n unika frågor för nivå 1–4 (exclude = id:n som redan visats)"""
+        if level <= 2:
+            make = lambda: self._showdown_batch(level)  # noqa: E731
+        elif level == 3:
+            make = lambda: [self._pot_odds_item() for _ in range(64)]  # noqa: E731
+        else:
+            make = lambda: [self._outs_item() if self.rng.random() < 0.5  # noqa: E731
+                            else self._pot_odds_item() for _ in range(64)]
+        return self._unique(n, make, exclude)
+
+
+def closing_comment(level: int) -> str:
+    return FINAL_COMMENTS[max(1, min(level, 4))]
+
+
+if __name__ == "__main__":
+    import json
+    import time
+
+    level = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    gen = QuizGenerator(seed=1)
+    print(json.dumps(gen.generate(level, 3), indent=2, ensure_ascii=False))
+    t0 = time.perf_counter()
+    n = len(QuizGenerator(seed=2).generate(level, 5000))
+    print(f"{n} questions in {time.perf_counter() - t0:.2f} s")
@@ -0,0 +1,197 @@
+"""
+quiz_pool.py – varm pool av förgenererade LLM-quiz per nivågrupp
+
+Ett LLM-quiz (max_tokens=1800) tar många sekunder att generera. Poolen
+håller i stället några färdiga, validerade quizsatser per nivågrupp
+("1-2", "3-4", … – samma grupper som prompterna i /quiz):
+
+• En bakgrundstask i event-loopen fyller på en grupp när djupet går under LOW_WATER,
+  och fortsätter tills gruppen är full (POOL_SIZE) – en sats i taget
+• Misslyckade anrop (nätverk, ogiltig JSON) ger exponentiell backoff
+• Poolen sparas som JSON (atomiskt, tmp + os.replace) efter varje
+  ändring och läses in vid start → överlever omstarter
+• stats() ger djup, påfyllnadstid och träff/miss per grupp
+
+Själva genereringen skickas in som en korutin-funktion bucket → quiz | None,
+så poolen vet inget om prompter eller OpenAI. start() och stop() anropas
+från event-loopen (FastAPI:s startup/shutdown).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+import traceback
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from quiz_stream import valid_question
+
+BUCKETS = ("1-2", "3-4", "5-6", "7-8", "9-10")
+
+POOL_PATH = Path(__file__).resolve().parent / "data" / "quiz_pool.json"
+POOL_SIZE = 4               # quizsatser per grupp; 0 stänger av påfyllningen
+LOW_WATER = 2
+
+RETRY_MIN_S = 5.0
+RETRY_MAX_S = 300.0
+
+
+def quiz_bucket(level: int) -> str:
+    """Skicklighetsnivå 1–10 → nivågrupp"""
+    for bucket in BUCKETS:
+        if level <= int(bucket.split("-")[1]):
+            return bucket
+    return BUCKETS[-1]
+
+
+def valid_quiz(quiz) -> bool:
+    """{questions: [...], final_comment} där varje fråga klarar valid_question"""
+    if not isinstance(quiz, dict):
+        return False
+    questions = quiz.get("questions")
+    if not isinstance(questions, list) or not questions:
+        return False
+    return all(valid_question(q) for q in questions)
+
+
+class QuizPool:
+    def __init__(self, produce: Callable[[str], Awaitable[Optional[Dict]]],
+                 path: Path = POOL_PATH, size: int = POOL_SIZE,
+                 low_water: int = LOW_WATER, buckets=BUCKETS):
+        self.produce = produce
+        self.path = Path(path)
+        self.size = size
+        self.low_water = min(low_water, size)
+        self.buckets = tuple(buckets)
+        self.sets: Dict[str, List[Dict]] = {b: [] for b in self.buckets}
+        self.counters = {b: {"hits": 0, "misses": 0, "refills": 0, "failures": 0,
+                             "last_refill_s": None, "refill_s_total": 0.0}
+                         for b in self.buckets}
+        self._filling = set()               # grupper som fylls upp till size
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._load()
+
+    # --- persistens ---------------------------------------------------------
+    def _load(self) -> None:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        for bucket in self.buckets:
+            sets = [q for q in saved.get(bucket, []) if valid_quiz(q)]
+            self.sets[bucket] = sets[: self.size]
+
+    def _save(self) -> None:
+        tmp = self.path.with_suffix(".tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.sets, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except OSError:
+            traceback.print_exc()
+
+    # --- publikt ------------------------------------------------------------
+    def pop(self, bucket: str) -> Optional[Dict]:
+        """Äldsta färdiga quizet i gruppen, eller None om poolen är tom"""
+        sets = self.sets.get(bucket)
+        if not sets:
+            if bucket in self.counters:
+                self.counters[bucket]["misses"] += 1
+            self._notify()
+            return None
+        quiz = sets.pop(0)
+        self.counters[bucket]["hits"] += 1
+        self._save()
+        self._notify()
+        return quiz
+
+    def stats(self) -> Dict:
+        out = {}
+        for bucket in self.buckets:
+            c = self.counters[bucket]
+            out[bucket] = {
+                "depth": len(self.sets[bucket]),
+                "capacity": self.size,
+                "low_water": self.low_water,
+                "refilling": bucket in self._filling,
+                "hits": c["hits"],
+                "misses": c["misses"],
+                "refills": c["refills"],
+                "failures": c["failures"],
+                "last_refill_s": c["last_refill_s"],
+                "avg_refill_s": (round(c["refill_s_total"] / c["refills"], 3)
+                                 if c["refills"] else None),
+            }
+        return out
+
+    def start(self) -> None:
+        """Starta påfyllningen som en task i den körande event-loopen"""
+        if self.size <= 0 or self._task is not None:
+            return
+        self._wake = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="quiz-pool")
+
+    async def stop(self) -> None:
+        """Avbryt påfyllningen (ett pågående LLM-anrop avbryts också)"""
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def _notify(self) -> None:
+        if self._wake is not None:
+            self._wake.set()
+
+    # --- producent ----------------------------------------------------------
+    def _next_bucket(self) -> Optional[str]:
+        """Grupp att fylla på (minst djup först)"""
+        for bucket in self.buckets:
+            depth = len(self.sets[bucket])
+            if depth < self.low_water:
+                self._filling.add(bucket)
+            elif depth >= self.size:
+                self._filling.discard(bucket)
+        if not self._filling:
+            return None
+        return min(self._filling, key=lambda b: len(self.sets[b]))
+
+    async def _run(self) -> None:
+        delay = RETRY_MIN_S
+        while True:
+            bucket = self._next_bucket()
+            while bucket is None:
+                self._wake.clear()
+                await self._wake.wait()
+                bucket = self._next_bucket()
+
+            t0 = time.perf_counter()
+            try:
+                quiz = await self.produce(bucket)
+            except Exception:
+                traceback.print_exc()
+                quiz = None
+            dt = time.perf_counter() - t0
+
+            c = self.counters[bucket]
+            if valid_quiz(quiz):
+                if len(self.sets[bucket]) < self.size:
+                    self.sets[bucket].append(quiz)
+                    self._save()
+                c["refills"] += 1
+                c["last_refill_s"] = round(dt, 3)
+                c["refill_s_total"] += dt
+                delay = RETRY_MIN_S
+                continue
+            c["failures"] += 1
+            await asyncio.sleep(delay)              # backoff; stop() avbryter
+            delay = min(delay * 2, RETRY_MAX_S)
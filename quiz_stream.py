@@ -0,0 +1,121 @@
+"""
+quiz_stream.py – inkrementell tolkning av LLM-quiz + SSE-format
+
+LLM:en skriver en JSON-array [{question, choices, correct, explanation}, …]
+(ibland inbäddad i ett objekt, ibland med text runt). QuizStreamParser
+matas med text i godtyckliga bitar och ger tillbaka varje frågeobjekt så
+fort dess avslutande '}' kommit:
+
+• En teckenskanner håller reda på strängar/escape och en stack med
+  startpositioner för '{' – ingen omtolkning av hela bufferten per token
+• Stängda objekt som innehåller "question" tolkas med json.loads och
+  valideras mot schemat; trasiga eller ofullständiga frågor hoppas över
+  (räknas i skipped) utan att de andra går förlorade
+• final_comment plockas ur hela texten när strömmen är slut
+
+sse(event, data) formaterar ett Server-Sent Events-meddelande.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Dict, List, Optional
+
+from quiz_gen import quiz_id
+
+FINAL_COMMENT_RE = re.compile(r'"final_comment"\s*:\s*"((?:[^"\\]|\\.)*)"')
+DEFAULT_COMMENT = "Great job!"
+
+
+def valid_question(q) -> bool:
+    """{question, choices, correct, explanation} med rätt svar bland valen"""
+    if not isinstance(q, dict):
+        return False
+    if not isinstance(q.get("question"), str) or not q["question"].strip():
+        return False
+    choices = q.get("choices")
+    if not isinstance(choices, list) or len(choices) < 2:
+        return False
+    if q.get("correct") not in choices:
+        return False
+    return isinstance(q.get("explanation", ""), str)
+
+
+class QuizStreamParser:
+    def __init__(self):
+        self.text = ""
+        self.pos = 0                    # nästa tecken att skanna
+        self.in_string = False
+        self.escape = False
+        self.starts: List[int] = []     # öppna '{'
+        self.seen = set()
+        self.count = 0
+        self.skipped = 0
+
+    def feed(self, chunk: str) -> List[Dict]:
+        """Lägg till text → nya, giltiga frågor (med id) i ordning"""
+        self.text += chunk
+        out = []
+        text = self.text
+        for i in range(self.pos, len(text)):
+            ch = text[i]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch == "{":
+                self.starts.append(i)
+            elif ch == "}" and self.starts:
+                start = self.starts.pop()
+                q = self._question(text[start:i + 1])
+                if q is not None:
+                    out.append(q)
+        self.pos = len(text)
+        return out
+
+    def _question(self, obj: str) -> Optional[Dict]:
+        if '"question"' not in obj:
+            return None
+        try:
+            q = json.loads(obj)
+        except ValueError:
+            self.skipped += 1
+            return None
+        if not isinstance(q, dict) or "question" not in q:
+            return None                 # omslutande objekt, t.ex. {"questions": [...]}
+        if not valid_question(q):
+            self.skipped += 1
+            return None
+        q.setdefault("explanation", "")
+        q.setdefault("id", quiz_id(q["question"], q["correct"]))
+        if q["id"] in self.seen:
+            return None
+        self.seen.add(q["id"])
+        self.count += 1
+        return q
+
+    def final_comment(self) -> str:
+        match = FINAL_COMMENT_RE.search(self.text)
+        if not match:
+            return DEFAULT_COMMENT
+        try:
+            return json.loads(f'"{match.group(1)}"')
+        except ValueError:
+            return match.group(1)
+
+
+def parse_questions(raw: str) -> tuple[List[Dict], str]:
+    """Hela LLM-svaret på en gång → (giltiga frågor, final_comment)"""
+    parser = QuizStreamParser()
+    questions = parser.feed(raw)
+    return questions, parser.final_comment()
+
+
+def sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
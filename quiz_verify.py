@@ -0,0 +1,401 @@
+"""
+quiz_verify.py – kontroll av LLM-genererade quizfrågor mot lokala beräkningar
+
+Varje fråga körs genom de kontroller som känner igen den:
+
+• showdown   – två femkortshänder i frågan ('A♣ K♦ 8♠ 8♥ 3♣' / 'Ac Kd 8s 8h 3c')
+               rankas med hand_eval; vinnaren (eller split) ska vara facit
+• pot_odds   – 'bet of 50 $ into 100 $' + procentval, formeln efter vad
+               som frågas: call/break-even → bet / (pot + 2·bet), bluff →
+               bet / (pot + bet), MDF → pot / (pot + bet); närmaste val
+               inom POT_ODDS_TOLERANCE. Annan formulering → unchecked
+• outs       – 'N outs' på turn (eller all-in på flop) + Call/Fold:
+               equity ur outs jämförs med priset
+• range      – öppningsspot preflop (position, ingen före har agerat,
+               handklass): solverns RFI-nod ur range pack:en, tydlig
+               majoritet (≥ RANGE_CLEAR) fold resp. raise
+
+Utfall per fråga: ok / repaired (facit rättat, förklaringen ersatt) /
+wrong (tas bort) / unchecked (ingen kontroll kände igen frågan).
+
+En fråga tar mikrosekunder, så ett enskilt quiz verifieras direkt i
+anropet; stora satser (t.ex. hela frågebanken) fördelas över en
+processpool med verify_many.
+
+    python quiz_verify.py --bank          # verifiera overifierade frågor i banken
+    python quiz_verify.py --selftest      # regressionsfall för kontrollerna
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "data" / "db"))
+
+from combos import CLASS_COMBOS, CLASS_INDEX, RANKS, class_name  # noqa: E402
+from hand_eval import category, parse_cards, rank5  # noqa: E402
+from quiz_gen import CATEGORY_PHRASES, OUTS_MARGIN, quiz_id  # noqa: E402
+from tree_index import POSITION_ORDER, is_raise, key_token, raise_size  # noqa: E402
+
+POT_ODDS_TOLERANCE = 0.02      # avrundning i LLM:ens procentval
+RANGE_CLEAR = 0.90             # solvern måste välja fold/raise minst så ofta
+BATCH_MIN = 64                 # färre frågor än så verifieras utan processpool
+
+SUIT_CHARS = {"♣": "c", "♦": "d", "♥": "h", "♠": "s",
+              "c": "c", "d": "d", "h": "h", "s": "s"}
+CARD = r"(?:10|[2-9TJQKA])[♣♦♥♠cdhs]"
+HAND5_RE = re.compile(rf"(?<![\w]){CARD}(?:[ ,]+{CARD}){{4}}(?![\w])")
+CARD_RE = re.compile(rf"(10|[2-9TJQKA])([♣♦♥♠cdhs])")
+MONEY = r"\$?\s?(\d+(?:\.\d+)?)\s?(?:\$|bb|chips)?"
+BET_INTO_RE = re.compile(rf"bets?\s+(?:of\s+)?{MONEY}\s+into\s+(?:a\s+pot\s+of\s+)?{MONEY}", re.I)
+PCT_RE = re.compile(r"^\s*~?(\d+(?:\.\d+)?)\s?%\s*$")
+MDF_RE = re.compile(r"minimum defen[cs]e|\bmdf\b|how often must you (?:defend|continue)", re.I)
+BLUFF_RE = re.compile(r"bluff|fold equity|how often must (?:\w+ ){0,3}fold|needs? (?:\w+ ){0,3}to fold", re.I)
+CALL_RE = re.compile(r"\bcall|break[- ]even|how often must you win", re.I)
+OUTS_RE = re.compile(r"\b(\d+)\s+outs\b", re.I)
+POSITION_NAMES = {              # gemener; slås upp med p.lower()
+    "utg": "UTG", "under the gun": "UTG", "hj": "HJ", "hijack": "HJ", "co": "CO",
+    "cutoff": "CO", "cut-off": "CO", "btn": "BTN", "button": "BTN", "sb": "SB",
+    "small blind": "SB",
+}
+POSITION_RE = re.compile(r"\b(" + "|".join(re.escape(k) for k in POSITION_NAMES) + r")\b", re.I)
+UNOPENED_RE = re.compile(r"folds? to you|first to act|first in|unopened|everyone folds", re.I)
+POSTFLOP_RE = re.compile(r"\b(flop|turn|river|board)\b", re.I)
+CLASS_RE = re.compile(r"\b([2-9TJQKA]{2}[so]?)\b")
+
+Result = Tuple[str, Optional[Dict]]        # (utfall, fråga – rättad om repaired)
+
+
+# ------------------------------------------------------------
+#  HJÄLP
+# ------------------------------------------------------------
+def _cards(text: str) -> List[int]:
+    """'A♣ 10♦' / 'Ac Td' → kort-index (ValueError vid dubletter)"""
+    return parse_cards("".join(r.replace("10", "T") + SUIT_CHARS[s]
+                               for r, s in CARD_RE.findall(text)))
+
+
+def _repair(q: Dict, correct: str, explanation: str) -> Dict:
+    fixed = {**q, "correct": correct, "explanation": explanation}
+    fixed["id"] = quiz_id(fixed["question"], correct)
+    return fixed
+
+
+def _judge(q: Dict, expected: Optional[str], explanation: str) -> Result:
+    """Jämför facit med förväntat val: ok / repaired / wrong"""
+    if expected is None:
+        return "wrong", None
+    if q["correct"] == expected:
+        return "ok", q
+    return "repaired", _repair(q, expected, explanation)
+
+
+def _pct(x: float) -> str:
+    return f"{round(x * 100)} %"
+
+
+# ------------------------------------------------------------
+#  KONTROLLER (None = känner inte igen frågan)
+# ------------------------------------------------------------
+def check_showdown(q: Dict) -> Optional[Result]:
+    hands = HAND5_RE.findall(q["question"])
+    if len(hands) != 2:
+        return None
+    try:
+        a, b = _cards(hands[0]), _cards(hands[1])
+    except ValueError:
+        return "wrong", None                     # samma kort två gånger i en hand
+    if set(a) & set(b):
+        return "wrong", None
+    label = {}
+    for choice in q["choices"]:
+        if re.search(r"split|tie|chop", str(choice), re.I):
+            label["split"] = choice
+            continue
+        try:
+            cards = set(_cards(str(choice)))
+        except ValueError:
+            continue
+        if cards == set(a):
+            label["a"] = choice
+        elif cards == set(b):
+            label["b"] = choice
+    if "a" not in label or "b" not in label:
+        return None
+    ra, rb = (int(r) for r in rank5(np.array([a, b])))
+    ca, cb = int(category(ra)), int(category(rb))
+    if ra == rb:
+        return _judge(q, label.get("split"),
+                      f"Both hands make {CATEGORY_PHRASES[ca]} with the same ranks, so the pot is split.")
+    (w, cw), (l, cl) = (("a", ca), ("b", cb)) if ra > rb else (("b", cb), ("a", ca))
+    if cw != cl:
+        why = f"{label[w]} makes {CATEGORY_PHRASES[cw]}, which beats {CATEGORY_PHRASES[cl]}."
+    else:
+        why = f"Both hands make {CATEGORY_PHRASES[cw]}; {label[w]} wins on the higher cards."
+    return _judge(q, label[w], why)
+
+
+def check_pot_odds(q: Dict) -> Optional[Result]:
+    m = BET_INTO_RE.search(q["question"])
+    pcts = [PCT_RE.match(str(c)) for c in q["choices"]]
+    if m is None or not all(pcts):
+        return None
+    bet, pot = Fraction(m.group(1)), Fraction(m.group(2))
+    if bet <= 0 or pot <= 0:
+        return None
+    b, p, text = m.group(1), m.group(2), q["question"]
+    # bluff/MDF först: de frågorna nämner ofta också "call" eller "break even"
+    if MDF_RE.search(text):
+        need = float(pot / (pot + bet))
+        why = (f"Facing {b} into {p} you must defend {p} / ({p} + {b}) ≈ {_pct(need)} "
+               f"so that a bluff with any two cards does not profit.")
+    elif BLUFF_RE.search(text):
+        need = float(bet / (pot + bet))
+        why = (f"The bluff risks {b} to win {p}, so it must work "
+               f"{b} / ({p} + {b}) ≈ {_pct(need)} of the time.")
+    elif CALL_RE.search(text):
+        need = float(bet / (pot + 2 * bet))
+        why = (f"You call {b} to win {float(pot + bet):g}, so you need "
+               f"{b} / ({p} + 2·{b}) ≈ {_pct(need)}.")
+    else:
+        return None
+    values = [float(p.group(1)) / 100 for p in pcts]
+    best = min(range(len(values)), key=lambda i: abs(values[i] - need))
+    if abs(values[best] - need) > POT_ODDS_TOLERANCE:
+        return "wrong", None
+    return _judge(q, q["choices"][best], why)
+
+
+def check_outs(q: Dict) -> Optional[Result]:
+    text = q["question"]
+    outs_m, bet_m = OUTS_RE.search(text), BET_INTO_RE.search(text)
+    fam = {_family(c): c for c in q["choices"]}
+    if outs_m is None or bet_m is None or set(fam) != {"call", "fold"}:
+        return None
+    outs = int(outs_m.group(1))
+    if re.search(r"\bturn\b", text, re.I):
+        equity = outs / 46
+    elif re.search(r"\bflop\b", text, re.I) and re.search(r"all[- ]in", text, re.I):
+        equity = 1 - (47 - outs) / 47 * (46 - outs) / 46
+    else:
+        return None
+    bet, pot = float(bet_m.group(1)), float(bet_m.group(2))
+    need = bet / (pot + 2 * bet)
+    if abs(equity - need) < OUTS_MARGIN:          # samma marginal som quiz_gen
+        return None
+    decision = "call" if equity > need else "fold"
+    return _judge(q, fam[decision],
+                  f"With {outs} outs your equity is about {_pct(equity)}; the call needs "
+                  f"{_pct(need)}, so {decision}.")
+
+
+def _family(choice) -> Optional[str]:
+    c = str(choice).lower()
+    if "fold" in c:
+        return "fold"
+    if re.search(r"shove|all[- ]in|jam", c):
+        return "shove"
+    if re.search(r"raise|open|bet", c):
+        return "raise"
+    if re.search(r"call|limp|check", c):
+        return "call"
+    return None
+
+
+_pack = None
+
+
+def _range_pack():
+    """RangePack (laddas en gång per process), None om range-datat saknas"""
+    global _pack
+    if _pack is None:
+        try:
+            from range_drills import PACK_PATH, ensure_files
+            from range_pack import RangePack
+            ensure_files()
+            _pack = RangePack(PACK_PATH)
+        except Exception:
+            _pack = False
+    return _pack or None
+
+
+def _hand_class(text: str) -> Optional[str]:
+    try:
+        cards = _cards(text)
+    except ValueError:
+        cards = []
+    if len(cards) == 2:
+        hi, lo = sorted(cards, reverse=True)
+        suffix = "" if hi // 4 == lo // 4 else "s" if hi % 4 == lo % 4 else "o"
+        return class_name(RANKS[hi // 4] + RANKS[lo // 4] + suffix)
+    for code in CLASS_RE.findall(text):
+        name = class_name(code)
+        if name is not None and (len(code) == 3 or name[0] == name[1]):
+            return name
+    return None
+
+
+def check_range(q: Dict) -> Optional[Result]:
+    text = q["question"]
+    if not UNOPENED_RE.search(text) or POSTFLOP_RE.search(text):
+        return None
+    positions = {POSITION_NAMES[p.lower()] for p in POSITION_RE.findall(text)}
+    hand = _hand_class(text)
+    if len(positions) != 1 or hand is None:
+        return None
+    fam = {}
+    for c in q["choices"]:
+        fam.setdefault(_family(c), []).append(c)
+    if not fam.get("fold") or not (fam.get("raise") or fam.get("shove")):
+        return None
+    pack = _range_pack()
+    if pack is None:
+        return None
+    pos = positions.pop()
+    node = pack.node(pos, "PF:" + "-".join(["F"] * POSITION_ORDER.index(pos)))
+    if node is None:
+        return None
+    mix = node.matrix[CLASS_COMBOS[CLASS_INDEX[hand]]].mean(axis=0)
+    if mix.sum() <= 0:
+        return None
+    mix = mix / mix.sum()
+    tokens = [key_token(a) for a in node.actions]
+    raise_f = float(sum(f for t, f in zip(tokens, mix) if is_raise(t)))
+    fold_f = float(sum(f for t, f in zip(tokens, mix) if t == "F"))
+    if raise_f >= RANGE_CLEAR:
+        main = max((f, t) for t, f in zip(tokens, mix) if is_raise(t))[1]
+        want, freq = ("shove" if raise_size(main) is None else "raise"), raise_f
+    elif fold_f >= RANGE_CLEAR:
+        want, freq = "fold", fold_f
+    else:
+        return None                              # blandad strategi – inget entydigt facit
+    if _family(q["correct"]) == want:
+        return "ok", q
+    options = fam.get(want, [])
+    verb = {"raise": "raises", "shove": "goes all-in", "fold": "folds"}[want]
+    why = f"With {hand} in {pos} when it folds to you, the solver {verb} {_pct(freq)} of the time."
+    return _judge(q, options[0] if len(options) == 1 else None, why)
+
+
+CHECKS = (check_showdown, check_pot_odds, check_outs, check_range)
+
+
+# ------------------------------------------------------------
+#  PUBLIKT
+# ------------------------------------------------------------
+def verify_question(q: Dict) -> Result:
+    """Första kontrollen som känner igen frågan avgör utfallet"""
+    for check in CHECKS:
+        try:
+            result = check(q)
+        except Exception:
+            result = None
+        if result is not None:
+            return result
+    return "unchecked", q
+
+
+def verify_quiz(questions: List[Dict]) -> Tuple[List[Dict], Dict[str, int]]:
+    """
+    → (frågor att servera, antal per utfall). Felaktiga tas bort, rättade
+    ersätts; varje kvarvarande fråga får "check" = utfallet.
+    """
+    kept, counts = [], {"ok": 0, "repaired": 0, "wrong": 0, "unchecked": 0}
+    for status, q in verify_many(questions):
+        counts[status] += 1
+        if q is not None:
+            kept.append({**q, "check": status})
+    return kept, counts
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def verify_many(questions: List[Dict], workers: Optional[int] = None) -> List[Result]:
+    """verify_question för en sats; stora satser fördelas över en processpool"""
+    global _executor
+    if len(questions) < BATCH_MIN:
+        return [verify_question(q) for q in questions]
+    workers = workers or os.cpu_count() or 1
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=workers)
+    chunk = max(16, len(questions) // (4 * workers))
+    return list(_executor.map(verify_question, questions, chunksize=chunk))
+
+
+# ------------------------------------------------------------
+#  REGRESSIONSFALL (--selftest)
+# ------------------------------------------------------------
+PCT_CHOICES = ["25 %", "33 %", "50 %", "67 %"]
+
+# (fråga, val, facit, förväntat utfall, förväntat facit efter kontrollen)
+SELFTEST_CASES = [
+    ("You face a bet of 50 $ into a pot of 100 $. How often must you win to break even on a call?",
+     PCT_CHOICES, "25 %", "ok", "25 %"),
+    ("Villain bets 50 $ into 100 $. What equity do you need to call?",
+     PCT_CHOICES, "33 %", "repaired", "25 %"),
+    ("You bet 50 $ into 100 $ as a bluff. How often must it work to break even?",
+     PCT_CHOICES, "33 %", "ok", "33 %"),
+    ("You bet 100 $ into 100 $. How much fold equity do you need?",
+     PCT_CHOICES, "50 %", "ok", "50 %"),
+    ("You shove and bet 100 $ into 100 $. How often must villain fold for you to profit?",
+     PCT_CHOICES, "50 %", "ok", "50 %"),
+    ("Villain bets 50 $ into 100 $. What is your minimum defense frequency?",
+     PCT_CHOICES, "67 %", "ok", "67 %"),
+    ("Villain bets 100 $ into 100 $. What is your MDF if you want to call or raise enough?",
+     PCT_CHOICES, "50 %", "ok", "50 %"),
+    ("Villain bets 50 $ into 100 $. What share of the final pot is your bet?",
+     PCT_CHOICES, "25 %", "unchecked", "25 %"),
+]
+
+
+def selftest() -> List[str]:
+    """Kör SELFTEST_CASES → beskrivning av fallen som inte gav väntat utfall"""
+    bad = []
+    for text, choices, correct, want_status, want_correct in SELFTEST_CASES:
+        q = {"question": text, "choices": choices, "correct": correct, "explanation": ""}
+        status, out = verify_question(q)
+        got = out["correct"] if out is not None else None
+        if status != want_status or got != want_correct:
+            bad.append(f"{text!r}: {status} {got!r}, väntat {want_status} {want_correct!r}")
+    return bad
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from quiz_bank import BANK_PATH, QuizBank
+
+    ap = argparse.ArgumentParser(description="Verifiera overifierade frågor i quiz-banken")
+    ap.add_argument("--bank", action="store_true")
+    ap.add_argument("--selftest", action="store_true")
+    ap.add_argument("--db", default=str(BANK_PATH))
+    ap.add_argument("--workers", type=int, default=None)
+    args = ap.parse_args()
+    if args.selftest:
+        failed = selftest()
+        for line in failed:
+            print(f"FEL  {line}")
+        if failed:
+            sys.exit(f"{len(failed)} av {len(SELFTEST_CASES)} fall fel")
+        print(f"✓ Alla {len(SELFTEST_CASES)} fall OK")
+        sys.exit(0)
+    if not args.bank:
+        ap.error("ange --bank eller --selftest")
+
+    bank = QuizBank(args.db)
+    rows = bank.unverified()
+    t0 = time.perf_counter()
+    results = verify_many([r["question"] for r in rows], args.workers)
+    counts = bank.apply_checks(rows, results)
+    print(f"{len(rows)} frågor på {time.perf_counter() - t0:.2f} s: "
+          + ", ".join(f"{k} {v}" for k, v in counts.items()))
@@ -0,0 +1,271 @@
+"""
+range_drills.py – range-träning ur solverträdet (nivå 5–10, ingen LLM)
+
+Frågorna byggs direkt ur range pack:en (data/db/poker_ranges.pack) och
+reach-vikterna (poker_ranges.reach), så facit är solverns exakta frekvenser:
+
+• best_action – vad gör solvern oftast med handen här?
+• frequency   – hur ofta tar solvern en viss action med handen?
+• range_share – hur stor del av sina händer spelar positionen på ett visst sätt?
+
+Spots (nod, handklass) samplas viktat på reach – hur ofta den agerande
+spelaren faktiskt har handen i noden – och på svårighet: normerad entropi
+i solverns mix (ren strategi = lätt, jämn mix = svår). Nivå 5 lutar mot
+rena spots, nivå 10 mot blandade.
+
+Saknas pack/reach-filerna byggs de från poker_ranges.db vid första
+anropet (under en sekund för det medföljande trädet).
+"""
+
+from __future__ import annotations
+
+import copy
+import random
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+DB_DIR = Path(__file__).resolve().parent / "data" / "db"
+sys.path.insert(0, str(DB_DIR))
+
+from combos import CLASS_COMBOS, HAND_CLASSES  # noqa: E402
+from quiz_gen import quiz_item  # noqa: E402
+from range_pack import RangePack, build_pack  # noqa: E402
+from reach import ReachTable, update_reach  # noqa: E402
+from tree_index import actors, key_token, raise_size, seq_tokens  # noqa: E402
+
+DB_PATH    = DB_DIR / "poker_ranges.db"
+PACK_PATH  = DB_DIR / "poker_ranges.pack"
+REACH_PATH = DB_DIR / "poker_ranges.reach"
+
+MIN_REACH = 0.05            # handklasser som nästan aldrig når noden hoppas över
+DIFFICULTY_WIDTH = 0.25     # hur skarpt nivån styr mot sin svårighetsgrad
+
+FREQ_BINS = [
+    (0.00, 0.05, "Never (0-5 %)"),
+    (0.05, 0.50, "Sometimes (5-50 %)"),
+    (0.50, 0.95, "Mostly (50-95 %)"),
+    (0.95, 1.01, "Always (95-100 %)"),
+]
+
+CLOSING = {
+    "best_action": "Compare your instincts with the solver's most frequent play.",
+    "frequency": "Mixed strategies matter: learn which hands are played at partial frequencies.",
+    "range_share": "Know how wide each position plays in the most common spots.",
+}
+
+
+# ------------------------------------------------------------
+#  TEXT
+# ------------------------------------------------------------
+def action_label(key: str) -> str:
+    """Action-nyckel i pack:en → 'Fold', 'Raise to 2.5 bb', 'All-in'"""
+    tok = key_token(key)
+    if tok == "F":
+        return "Fold"
+    if tok == "C":
+        return "Call"
+    if tok == "X":
+        return "Check"
+    size = raise_size(tok)
+    return "All-in" if size is None else f"Raise to {size:g} bb"
+
+
+def _verb(token: str, you: bool = False) -> str:
+    size = raise_size(token)
+    verb = {"F": "fold", "C": "call", "X": "check"}.get(
+        token, "go all-in" if size is None else f"raise to {size:g} bb")
+    if you:
+        return verb
+    return verb.replace("go ", "goes ", 1) if verb.startswith("go ") \
+        else verb.replace(" ", "s ", 1) if " " in verb else verb + "s"
+
+
+def describe_spot(position: str, sequence: str) -> str:
+    """'BTN', 'PF:F-F-F' → 'You are BTN. UTG folds, HJ folds, CO folds.'"""
+    tokens = seq_tokens(sequence)
+    if not tokens:
+        return f"You are {position} and first to act preflop."
+    who = actors(tokens)
+    history = ", ".join(
+        f"you {_verb(t, you=True)}" if who[i] == position else f"{who[i]} {_verb(t)}"
+        for i, t in enumerate(tokens))
+    return f"You are {position}. {history[0].upper()}{history[1:]}."
+
+
+def _pct(x: float) -> str:
+    return f"{round(x * 100)} %"
+
+
+def _freq_bin(f: float) -> str:
+    return next(label for lo, hi, label in FREQ_BINS if lo <= f < hi)
+
+
+# ------------------------------------------------------------
+#  SPOTS
+# ------------------------------------------------------------
+def ensure_files(db_path: Path = DB_PATH, pack_path: Path = PACK_PATH,
+                 reach_path: Path = REACH_PATH) -> None:
+    """Bygg pack + reach från databasen om de saknas"""
+    pack_path, reach_path = Path(pack_path), Path(reach_path)
+    if not pack_path.exists():
+        conn = sqlite3.connect(db_path)
+        try:
+            build_pack(conn, pack_path)
+        finally:
+            conn.close()
+    if not reach_path.exists():
+        update_reach(pack_path, reach_path)
+
+
+class DrillGenerator:
+    """
+    Alla (nod, handklass)-spots med klassens strategi, reach och svårighet
+    förberäknas vid start; en frågesats är sedan bara viktad sampling.
+    """
+
+    def __init__(self, pack: RangePack, reach: ReachTable, seed: Optional[int] = None):
+        self.pack = pack
+        self.reach_table = reach
+        self.rng = random.Random(seed)
+        spots, strat, reach_w, diff = [], [], [], []
+        for node in pack:
+            r = reach.weights(node.id, node.position)
+            if r is None or not node.actions:
+                continue
+            for k, idx in enumerate(CLASS_COMBOS):
+                w = float(r[idx].mean())
+                live = node.matrix[idx].sum(axis=1) > 0
+                if w < MIN_REACH or not live.any():
+                    continue
+                mix = node.matrix[idx][live].mean(axis=0).astype(np.float64)
+                mix /= mix.sum()
+                p = mix[mix > 0]
+                entropy = float(-(p * np.log(p)).sum() / np.log(len(mix))) if len(mix) > 1 else 0.0
+                spots.append((node.id, k))
+                strat.append(mix)
+                reach_w.append(w)
+                diff.append(entropy)
+        self.spots = spots
+        self.strategy = strat
+        self.reach = np.array(reach_w)
+        self.difficulty = np.array(diff)
+
+    @classmethod
+    def load(cls, seed: Optional[int] = None) -> "DrillGenerator":
+        ensure_files()
+        return cls(RangePack(PACK_PATH), ReachTable(REACH_PATH), seed)
+
+    def with_seed(self, seed: int) -> "DrillGenerator":
+        """Samma förberäknade spots, egen seedad slump (reproducerbara frågesatser)"""
+        other = copy.copy(self)
+        other.rng = random.Random(seed)
+        return other
+
+    def weights(self, level: int) -> np.ndarray:
+        """Samplingvikt per spot: reach × närhet till nivåns svårighet"""
+        target = min(max((level - 5) / 5, 0.0), 1.0)
+        fit = np.exp(-((self.difficulty - target) ** 2) / (2 * DIFFICULTY_WIDTH ** 2))
+        return self.reach * fit
+
+    # --- frågetyper ---------------------------------------------------------
+    def _best_action(self, i: int) -> Optional[Dict]:
+        node = self.pack.by_id(self.spots[i][0])
+        hand = HAND_CLASSES[self.spots[i][1]]
+        mix = self.strategy[i]
+        order = np.argsort(-mix)
+        if len(mix) < 2 or mix[order[0]] - mix[order[1]] < 0.10:
+            return None                                 # för jämnt – inget entydigt svar
+        labels = [action_label(a) for a in node.actions]
+        spot = describe_spot(node.position, node.sequence)
+        question = f"{spot} You hold {hand}. What does the solver do most often?"
+        explanation = "Solver mix: " + ", ".join(
+            f"{labels[j]} {_pct(mix[j])}" for j in order if mix[j] >= 0.005) + "."
+        return quiz_item(question, labels, labels[order[0]], explanation, "best_action")
+
+    def _frequency(self, i: int) -> Optional[Dict]:
+        node = self.pack.by_id(self.spots[i][0])
+        hand = HAND_CLASSES[self.spots[i][1]]
+        mix = self.strategy[i]
+        j = self.rng.randrange(len(mix))
+        if node.actions[j] == "f" and len(mix) > 1:
+            j = int(np.argmax(mix))                    # fråga hellre om en aktiv action
+        label = action_label(node.actions[j])
+        spot = describe_spot(node.position, node.sequence)
+        question = f"{spot} You hold {hand}. How often does the solver choose: {label}?"
+        explanation = f"The solver chooses {label} with {hand} {_pct(mix[j])} of the time."
+        return quiz_item(question, [b[2] for b in FREQ_BINS], _freq_bin(float(mix[j])),
+                         explanation, "frequency")
+
+    def _range_share(self, i: int) -> Optional[Dict]:
+        node = self.pack.by_id(self.spots[i][0])
+        r = self.reach_table.weights(node.id, node.position)
+        if len(node.actions) < 2 or r is None:
+            return None
+        # andel av händerna som når noden: kombon viktas med sin reach
+        w = r.astype(np.float64) * (node.matrix.sum(axis=1) > 0)
+        if w.sum() <= 0:
+            return None
+        shares = w @ node.matrix.astype(np.float64) / w.sum()
+        j = int(np.argmax([s if a != "f" else -1 for a, s in zip(node.actions, shares)]))
+        share = float(shares[j])
+        if share < 0.02:
+            return None
+        label = action_label(node.actions[j])
+        options = {_pct(share)}
+        for f in (0.5, 0.7, 1.4, 2.0, 0.35, 2.8):
+            if len(options) == 4:
+                break
+            if 0 < share * f < 1:
+                options.add(_pct(share * f))
+        if len(options) < 4:
+            return None
+        spot = describe_spot(node.position, node.sequence)
+        question = (f"{spot} What share of the hands that reach this spot does the "
+                    f"solver play as: {label}?")
+        choices = sorted(options, key=lambda s: int(s.split()[0]))
+        explanation = (f"The solver chooses {label} with {_pct(share)} of the hands "
+                       f"that reach this spot (weighted by how often each combo gets here).")
+        return quiz_item(question, choices, _pct(share), explanation, "range_share")
+
+    # --- publikt ------------------------------------------------------------
+    def generate(self, level: int, n: int = 10,
+                 exclude: Optional[set] = None) -> List[Dict]:
+        """n unika frågor, viktade på reach och nivåns svårighet"""
+        w = self.weights(level)
+        if not len(self.spots) or w.sum() <= 0:
+            return []
+        kinds = [self._best_action, self._frequency] + ([self._range_share] if level >= 7 else [])
+        seen = set(exclude or ())
+        out: List[Dict] = []
+        for _ in range(n * 20):
+            if len(out) == n:
+                break
+            i = self.rng.choices(range(len(self.spots)), weights=w)[0]
+            item = self.rng.choice(kinds)(i)
+            if item is not None and item["id"] not in seen:
+                seen.add(item["id"])
+                out.append(item)
+        return out
+
+    def closing_comment(self, questions: List[Dict]) -> str:
+        topics = [q["topic"] for q in questions]
+        return CLOSING[max(set(topics), key=topics.count)] if topics else CLOSING["best_action"]
+
+
+if __name__ == "__main__":
+    import json
+    import time
+
+    level = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    t0 = time.perf_counter()
+    gen = DrillGenerator.load(seed=1)
+    t1 = time.perf_counter()
+    qs = gen.generate(level, 10)
+    t2 = time.perf_counter()
+    print(json.dumps(qs[:3], indent=2, ensure_ascii=False))
+    print(f"{len(gen.spots)} spots loaded in {t1 - t0:.2f} s, "
+          f"{len(qs)} questions in {(t2 - t1) * 1e3:.1f} ms")
@@ -0,0 +1,366 @@
+"""
+tts_stream.py – röstsvar mening för mening medan GPT fortfarande skriver
+
+Att vänta på hela svaret och sedan syntetisera allt i ett anrop lägger
+flera sekunder före första ljudet. Här:
+
+• SentenceSplitter delar den strömmade texten i meningar allt eftersom
+  (slutar på . ! ? eller radbrytning; förkortningar och decimaltal delas
+  inte; korta fragment slås ihop med nästa mening)
+• Varje mening syntetiseras direkt när den är klar – flera samtidigt
+  (TTS_MAX_CONCURRENCY) – men levereras i ordning
+• AudioCache: innehållsadresserad diskcache, nyckel = sha256 av röst +
+  modell + format + normaliserad text. Vanliga coachfraser syntetiseras
+  aldrig två gånger; samtidiga förfrågningar om samma klipp delar anrop
+• TTSClient pratar ElevenLabs HTTP-API (aiohttp, delad keep-alive-pool);
+  TTS_BASE_URL kan pekas mot fake_tts_server.py. VOICE_ID får vara ett
+  röstnamn ("Adam") – det slås upp mot GET /v1/voices en gång
+
+speak_stream() tar en ström av textbitar och ger ("token", text) och
+("audio", {...}) i uppspelningsordning; make_episode gör SSE av det
+(/ask_voice).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import re
+import time
+from collections import deque
+from contextlib import aclosing
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import aiohttp
+
+BASE_URL = "https://api.elevenlabs.io"
+MODEL = "eleven_multilingual_v2"
+OUTPUT_FORMAT = "mp3_44100_64"
+MAX_CONCURRENCY = 4
+TIMEOUT_S = 30.0
+
+CACHE_DIR = Path(__file__).resolve().parent / "data" / "tts_cache"
+
+MIN_SENTENCE_CHARS = 12                 # kortare slås ihop med nästa mening
+MAX_SENTENCE_CHARS = 240                # längre delas vid komma/mellanslag
+
+ABBREVIATIONS = {"e.g.", "i.e.", "vs.", "etc.", "approx.", "mr.", "mrs.", "dr."}
+NUMBER_ABBREVIATION = re.compile(r"no\.\s+\d", re.IGNORECASE)   # "No. 1" men inte "no. Fold"
+
+VOICE_ID_RE = re.compile(r"[A-Za-z0-9]{20}")   # ElevenLabs röst-id; annat är ett namn
+
+SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*(?=\s)|\n+")
+
+
+class TTSError(Exception):
+    pass
+
+
+# ------------------------------------------------------------
+#  MENINGAR
+# ------------------------------------------------------------
+class SentenceSplitter:
+    def __init__(self, min_chars: int = MIN_SENTENCE_CHARS, max_chars: int = MAX_SENTENCE_CHARS):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.buf = ""
+
+    def feed(self, text: str) -> List[str]:
+        """Lägg till en textbit → meningar som blivit klara"""
+        self.buf += text
+        out = []
+        pos = 0
+        for m in SENTENCE_END.finditer(self.buf):
+            candidate = self.buf[pos:m.end()].strip()
+            last_word = candidate.rsplit(None, 1)[-1].lower() if candidate else ""
+            if last_word in ABBREVIATIONS or len(candidate) < self.min_chars:
+                continue
+            if last_word == "no." and (not self.buf[m.end():].strip()
+                                       or NUMBER_ABBREVIATION.match(self.buf, m.end() - 3)):
+                continue                    # vänta på nästa ord / "No. 1" delas inte
+            out.append(candidate)
+            pos = m.end()
+        self.buf = self.buf[pos:]
+        while len(self.buf) > self.max_chars:
+            cut = self.buf.rfind(", ", 0, self.max_chars)
+            if cut < self.min_chars:
+                cut = self.buf.rfind(" ", 0, self.max_chars)
+            if cut < self.min_chars:
+                cut = self.max_chars
+            out.append(self.buf[:cut + 1].strip())
+            self.buf = self.buf[cut + 1:]
+        return out
+
+    def flush(self) -> List[str]:
+        """Resten när strömmen är slut"""
+        rest, self.buf = self.buf.strip(), ""
+        return [rest] if rest else []
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+# ------------------------------------------------------------
+#  CACHE
+# ------------------------------------------------------------
+class AudioCache:
+    def __init__(self, path: Path = CACHE_DIR):
+        self.path = Path(path)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(voice: str, model: str, output_format: str, text: str) -> str:
+        raw = "\x1f".join((voice, model, output_format, normalize_text(text)))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _file(self, key: str) -> Path:
+        return self.path / key[:2] / f"{key}.audio"
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            data = self._file(key).read_bytes()
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Atomiskt (tmp + os.replace) så att en halv fil aldrig läses"""
+        f = self._file(key)
+        tmp = f.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            f.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_bytes(data)
+            os.replace(tmp, f)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+
+    def stats(self) -> Dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+# ------------------------------------------------------------
+#  TTS-KLIENT
+# ------------------------------------------------------------
+class TTSClient:
+    def __init__(self, api_key: Optional[str], voice: str, base_url: str = BASE_URL,
+                 model: str = MODEL, output_format: str = OUTPUT_FORMAT,
+                 max_concurrency: int = MAX_CONCURRENCY, timeout: float = TIMEOUT_S,
+                 cache: Optional[AudioCache] = None):
+        self.api_key = api_key
+        self.voice = voice
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.output_format = output_format
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.cache = cache if cache is not None else AudioCache()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._loop = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._voice_id: Optional[str] = voice if VOICE_ID_RE.fullmatch(voice) else None
+        self._voice_lock: Optional[asyncio.Lock] = None
+        self.counters = {"calls": 0, "errors": 0, "shared": 0, "latency_s_total": 0.0}
+
+    def _ensure(self) -> aiohttp.ClientSession:
+        """Session + semafor hör till event-loopen de skapades i"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=60),
+                headers={"xi-api-key": self.api_key} if self.api_key else None,
+            )
+            self._sem = asyncio.Semaphore(self.max_concurrency)
+            self._voice_lock = asyncio.Lock()
+            self._inflight = {}
+            self._loop = loop
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def voice_id(self) -> str:
+        """Röst-id för URL:en; ett röstnamn slås upp i /v1/voices första gången"""
+        if self._voice_id is not None:
+            return self._voice_id
+        session = self._ensure()
+        async with self._voice_lock:
+            if self._voice_id is None:
+                try:
+                    async with session.get(f"{self.base_url}/v1/voices",
+                                           timeout=aiohttp.ClientTimeout(total=self.timeout)) as resp:
+                        if resp.status >= 400:
+                            raise TTSError(f"TTS voices {resp.status}: {(await resp.text())[:300]}")
+                        voices = (await resp.json()).get("voices", [])
+                except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                    raise TTSError(f"TTS voices error: {e or type(e).__name__}") from e
+                found = [v["voice_id"] for v in voices
+                         if v.get("name", "").lower() == self.voice.lower()]
+                if not found:
+                    raise TTSError(f"TTS voice {self.voice!r} not found")
+                self._voice_id = found[0]
+        return self._voice_id
+
+    async def _synthesize(self, text: str) -> bytes:
+        try:
+            voice_id = await self.voice_id()
+        except TTSError:
+            self.counters["errors"] += 1
+            raise
+        session = self._ensure()
+        async with self._sem:
+            t0 = time.perf_counter()
+            try:
+                async with session.post(
+                        f"{self.base_url}/v1/text-to-speech/{voice_id}",
+                        params={"output_format": self.output_format},
+                        json={"text": text, "model_id": self.model},
+                        timeout=aiohttp.ClientTimeout(total=self.timeout)) as resp:
+                    data = await resp.read()
+                    if resp.status >= 400:
+                        raise TTSError(f"TTS {resp.status}: {data[:300].decode('utf-8', 'replace')}")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.counters["errors"] += 1
+                raise TTSError(f"TTS error: {e or type(e).__name__}") from e
+            except TTSError:
+                self.counters["errors"] += 1
+                raise
+            self.counters["calls"] += 1
+            self.counters["latency_s_total"] += time.perf_counter() - t0
+            return data
+
+    async def speak(self, text: str) -> Tuple[bytes, bool]:
+        """
+        Ljud för texten → (bytes, ur cachen?). Syntesen skyddas mot cancel:
+        kopplar lyssnaren ner blir ett påbörjat klipp ändå klart och cachat.
+        """
+        key = AudioCache.key(self.voice, self.model, self.output_format, text)
+        data = self.cache.get(key)
+        if data is not None:
+            return data, True
+        self._ensure()
+        future = self._inflight.get(key)
+        if future is not None:
+            self.counters["shared"] += 1
+        else:
+            future = asyncio.ensure_future(self._synthesize(normalize_text(text)))
+            self._inflight[key] = future
+
+            def finished(f: asyncio.Future) -> None:
+                self._inflight.pop(key, None)
+                if not f.cancelled() and f.exception() is None:
+                    self.cache.put(key, f.result())
+
+            future.add_done_callback(finished)
+        return await asyncio.shield(future), False
+
+    def stats(self) -> Dict:
+        c = self.counters
+        return {
+            "voice": self.voice,
+            "voice_id": self._voice_id,
+            "model": self.model,
+            "max_concurrency": self.max_concurrency,
+            "calls": c["calls"],
+            "errors": c["errors"],
+            "shared": c["shared"],
+            "avg_latency_s": round(c["latency_s_total"] / c["calls"], 3) if c["calls"] else None,
+            "cache": self.cache.stats(),
+        }
+
+
+def tts_from_env() -> TTSClient:
+    return TTSClient(
+        os.getenv("ELEVEN_API_KEY"),
+        voice=os.getenv("VOICE_ID", "Adam"),
+        base_url=os.getenv("TTS_BASE_URL", BASE_URL),
+        model=os.getenv("TTS_MODEL", MODEL),
+        max_concurrency=int(os.getenv("TTS_MAX_CONCURRENCY", MAX_CONCURRENCY)),
+        cache=AudioCache(Path(os.getenv("TTS_CACHE_DIR", CACHE_DIR))),
+    )
+
+
+# ------------------------------------------------------------
+#  STRÖM
+# ------------------------------------------------------------
+async def speak_stream(deltas: AsyncIterator[str], tts: TTSClient,
+                       splitter: Optional[SentenceSplitter] = None
+                       ) -> AsyncIterator[Tuple[str, object]]:
+    """
+    Textbitar → ("token", text) direkt och ("audio", {index, text, audio,
+    cached, ready_s[, error]}) i meningsordning så snart meningen och alla
+    före den är syntetiserade. Syntesen av senare meningar pågår under
+    tiden. En mening vars syntes fallerar får audio None och error.
+    """
+    splitter = splitter or SentenceSplitter()
+    t0 = time.perf_counter()
+    queue: asyncio.Queue = asyncio.Queue()
+    pending: deque = deque()                # (index, text, task) i uppspelningsordning
+    spoken = [0]
+
+    async def pump():
+        try:
+            async with aclosing(deltas) as source:
+                async for delta in source:
+                    await queue.put(("token", delta))
+            await queue.put(("end", None))
+        except Exception as e:
+            await queue.put(("error", e))
+
+    def start(sentence: str) -> None:
+        pending.append((len(pending) + spoken[0], sentence,
+                        asyncio.ensure_future(tts.speak(sentence))))
+
+    def ready(index: int, text: str, task: asyncio.Task) -> Dict:
+        item = {"index": index, "text": text, "audio": None, "cached": False,
+                "ready_s": round(time.perf_counter() - t0, 3)}
+        try:
+            item["audio"], item["cached"] = task.result()
+        except TTSError as e:
+            item["error"] = str(e)
+        return item
+
+    producer = asyncio.ensure_future(pump())
+    text_done = False
+    next_item = None
+    try:
+        while not text_done or pending:
+            if not text_done and next_item is None:
+                next_item = asyncio.ensure_future(queue.get())
+            waits = {next_item} if next_item is not None else set()
+            if pending:
+                waits.add(pending[0][2])
+            await asyncio.wait(waits, return_when=asyncio.FIRST_COMPLETED)
+
+            while pending and pending[0][2].done():
+                index, text, task = pending.popleft()
+                spoken[0] += 1
+                yield "audio", ready(index, text, task)
+
+            if next_item is not None and next_item.done():
+                kind, payload = next_item.result()
+                next_item = None
+                if kind == "error":
+                    raise payload
+                if kind == "end":
+                    text_done = True
+                    for sentence in splitter.flush():
+                        start(sentence)
+                    continue
+                yield "token", payload
+                for sentence in splitter.feed(payload):
+                    start(sentence)
+    finally:
+        producer.cancel()
+        if next_item is not None:
+            next_item.cancel()
+        for _, _, task in pending:
+            task.cancel()